@@ -12,7 +12,22 @@ class CMDB(PluginConfig):
     author_email = "network-team@criteo.com"
     base_url = "cmdb"
     required_settings = []
-    default_settings = {}
+    default_settings = {
+        # number of objects written per transaction by background jobs
+        "background_job_chunk_size": 500,
+        # seconds during which a response is replayed for a retried Idempotency-Key
+        "idempotency_key_ttl": 24 * 60 * 60,
+        # seconds during which device change notifications are merged into one event
+        "notification_coalescing_window": 0.5,
+        # seconds after which a change notification stream is closed, clients then reconnect
+        "notification_stream_timeout": 300,
+        # number of compiled route policies kept in memory by each process
+        "route_policy_cache_size": 256,
+        # number of compiled BGP community lists kept in memory by each process
+        "community_list_cache_size": 1024,
+        # number of orphan objects deleted per transaction by the garbage collection
+        "orphans_batch_size": 1000,
+    }
 
     def ready(self):
         super().ready()
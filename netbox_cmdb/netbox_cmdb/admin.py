@@ -145,11 +145,12 @@ class PrefixListAdmin(BaseAdmin):
     """Admin class to manage PrefixList objects."""
 
     search_fields = ("name", "device__name")
-    autocomplete_fields = ("device",)
+    autocomplete_fields = ("device", "definition")
     inlines = [PrefixListTermInline]
     list_display = (
         "name",
         "device",
+        "definition",
     )
 
 
@@ -165,11 +166,12 @@ class BGPCommunityListAdmin(BaseAdmin):
     """Admin class to manage BGPCommunityList objects."""
 
     search_fields = ("name", "device__name")
-    autocomplete_fields = ("device",)
+    autocomplete_fields = ("device", "definition")
     inlines = [BGPCommunityListTermInline]
     list_display = (
         "name",
         "device",
+        "definition",
     )
 
 
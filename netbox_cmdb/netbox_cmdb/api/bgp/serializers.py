@@ -8,6 +8,7 @@ from tenancy.api.nested_serializers import NestedTenantSerializer
 from netbox_cmdb.choices import AssetMonitoringStateChoices
 
 from netbox_cmdb.api.common_serializers import CommonDeviceSerializer
+from netbox_cmdb.api.plan import Plan, apply_changes, apply_terms, diff_terms
 from netbox_cmdb.constants import BGP_MAX_ASN, BGP_MIN_ASN
 from netbox_cmdb.models.bgp import (
     ASN,
@@ -21,6 +22,21 @@ from netbox_cmdb.models.bgp import (
 from netbox_cmdb.models.circuit import Circuit
 from netbox_cmdb.models.route_policy import RoutePolicy
 
+BGP_SESSION_FIELDS = ("state", "monitoring_state", "password", "circuit", "tenant")
+DEVICE_BGP_SESSION_FIELDS = (
+    "device",
+    "enabled",
+    "local_address",
+    "peer_group",
+    "local_asn",
+    "description",
+    "maximum_prefixes",
+    "enforce_first_as",
+    "route_policy_in",
+    "route_policy_out",
+)
+AFI_SAFI_FIELDS = ("route_policy_in", "route_policy_out")
+
 
 class AsnSerializer(WritableNestedSerializer):
     class Meta:
@@ -142,6 +158,32 @@ class BGPSessionSerializer(ModelSerializer):
     peer_b = DeviceBGPSessionSerializer(many=False)
     tenant = NestedTenantSerializer(required=False, many=False)
 
+    def get_plan(self, instance, validated_data):
+        """Return the changes that saving `validated_data` would apply, without writing."""
+        plan = Plan()
+        plan.add_object(BGPSession, instance, validated_data, fields=BGP_SESSION_FIELDS)
+
+        for peer in ["peer_a", "peer_b"]:
+            peer_data = validated_data[peer]
+            peer_instance = getattr(instance, peer) if instance else None
+            plan.add_object(
+                DeviceBGPSession, peer_instance, peer_data, fields=DEVICE_BGP_SESSION_FIELDS
+            )
+
+            current_afi_safis = peer_instance.afi_safis.all() if peer_instance else []
+            plan.add_terms(
+                AfiSafi,
+                diff_terms(
+                    current_afi_safis,
+                    peer_data.get("afi_safis", []),
+                    AFI_SAFI_FIELDS,
+                    key="afi_safi_name",
+                ),
+                {"device_bgp_session": peer_instance},
+            )
+
+        return plan
+
     def create(self, validated_data):
         peers_data = {}
         for peer in ["a", "b"]:
@@ -171,80 +213,34 @@ class BGPSessionSerializer(ModelSerializer):
 
     def update(self, instance, validated_data):
         peers_data = {}
-        afi_safis_data = {}
         for peer in ["a", "b"]:
             peers_data[f"peer_{peer}"] = validated_data.pop(f"peer_{peer}")
 
-        instance.state = validated_data.get("state", instance.state)
-        instance.monitoring_state = validated_data.get(
-            "monitoring_state", instance.monitoring_state
-        )
-        instance.password = validated_data.get("password", instance.password)
-        instance.circuit = validated_data.get("circuit", instance.circuit)
-        instance.tenant = validated_data.get("tenant", instance.tenant)
-        instance.save()
+        self.changed = apply_changes(instance, validated_data, BGP_SESSION_FIELDS)
+
         # get peers
         bgp_peers = {}
         bgp_peers["peer_a"] = DeviceBGPSession.objects.get(peer_a=instance)
         bgp_peers["peer_b"] = DeviceBGPSession.objects.get(peer_b=instance)
         for peer, peer_instance in bgp_peers.items():
             # pop afi safi data for later creation/update
-            afi_safis_data[peer] = peers_data[peer].pop("afi_safis", {})
+            afi_safis_data = peers_data[peer].pop("afi_safis", [])
 
-            # update peer instance with provided data
-            peer_instance.device = peers_data[peer].get("device", peer_instance.device)
-            peer_instance.enabled = peers_data[peer].get("enabled", peer_instance.enabled)
-            peer_instance.local_address = peers_data[peer].get(
-                "local_address", peer_instance.local_address
-            )
-            peer_instance.peer_group = peers_data[peer].get("peer_group", peer_instance.peer_group)
-            peer_instance.local_asn = peers_data[peer].get("local_asn", peer_instance.local_asn)
-            peer_instance.description = peers_data[peer].get(
-                "description", peer_instance.description
-            )
-            peer_instance.maximum_prefixes = peers_data[peer].get(
-                "maximum_prefixes", peer_instance.maximum_prefixes
-            )
-            peer_instance.enforce_first_as = peers_data[peer].get(
-                "enforce_first_as", peer_instance.enforce_first_as
-            )
-            peer_instance.route_policy_in = peers_data[peer].get(
-                "route_policy_in", peer_instance.route_policy_in
+            self.changed |= apply_changes(
+                peer_instance, peers_data[peer], DEVICE_BGP_SESSION_FIELDS
             )
-            peer_instance.route_policy_out = peers_data[peer].get(
-                "route_policy_out", peer_instance.route_policy_out
-            )
-            peer_instance.save()
-
-            # get current list of afi safi
-            current_afi_safis = list(AfiSafi.objects.filter(device_bgp_session=peer_instance))
-            current_afi_safi_mapping = {
-                afi_safi.afi_safi_name: afi_safi for afi_safi in current_afi_safis
-            }
-            target_afi_safi_mapping = {
-                afi_safi["afi_safi_name"]: afi_safi for afi_safi in afi_safis_data[peer]
-            }
-            for afi_safi_data in afi_safis_data[peer]:
-                afi_safi, created = AfiSafi.objects.get_or_create(
-                    device_bgp_session=peer_instance,
-                    afi_safi_name=afi_safi_data["afi_safi_name"],
-                    defaults=afi_safi_data,
-                )
-                if not created:
-                    # if object is already existing, we only modify the remaining attributes and save the object
-                    afi_safi.route_policy_in = afi_safi_data.get(
-                        "route_policy_in", afi_safi.route_policy_in
-                    )
-                    afi_safi.route_policy_out = afi_safi_data.get(
-                        "route_policy_out", afi_safi.route_policy_out
-                    )
-                    afi_safi.save()
 
-            # removing extra afi safi
-            for name, afi_safi in current_afi_safi_mapping.items():
-                # if existing afi safi is not present in provided data, we remove it
-                if name not in target_afi_safi_mapping:
-                    afi_safi.delete()
+            # afi safis are matched on their name, extra ones are removed
+            self.changed |= apply_terms(
+                AfiSafi,
+                diff_terms(
+                    AfiSafi.objects.filter(device_bgp_session=peer_instance),
+                    afi_safis_data,
+                    AFI_SAFI_FIELDS,
+                    key="afi_safi_name",
+                ),
+                {"device_bgp_session": peer_instance},
+            )
 
         return instance
 
@@ -2,9 +2,12 @@ from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
 from django.db import transaction
 from django_pglocks import advisory_lock
 from drf_yasg.utils import swagger_auto_schema
+from netbox.api.pagination import OptionalLimitOffsetPagination
 from netbox.api.viewsets.mixins import ObjectValidationMixin
 from rest_framework import status
+from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
@@ -16,18 +19,22 @@ from netbox_cmdb.api.bgp.serializers import (
     BGPPeerGroupSerializer,
     BGPSessionSerializer,
 )
+from netbox_cmdb.api.idempotency import IdempotencyMixin
 from netbox_cmdb.api.viewsets import CustomNetBoxModelViewSet
+from netbox_cmdb.api.where_used import WhereUsedMixin
+from netbox_cmdb.bgp.audit import CHECKS, audit_sessions
+from netbox_cmdb.bgp.effective import effective_rows, to_config
 from netbox_cmdb.filtersets import ASNFilterSet, BGPSessionFilterSet
-from netbox_cmdb.models.bgp import ASN, BGPGlobal, BGPPeerGroup, BGPSession
+from netbox_cmdb.models.bgp import ASN, BGPGlobal, BGPPeerGroup, BGPSession, DeviceBGPSession
 
 
-class ASNViewSet(CustomNetBoxModelViewSet):
+class ASNViewSet(WhereUsedMixin, CustomNetBoxModelViewSet):
     queryset = ASN.objects.all()
     serializer_class = BGPASNSerializer
     filterset_class = ASNFilterSet
 
 
-class AvailableASNsView(ObjectValidationMixin, APIView):
+class AvailableASNsView(IdempotencyMixin, ObjectValidationMixin, APIView):
     queryset = ASN.objects.all()
 
     @swagger_auto_schema(
@@ -94,6 +101,32 @@ class BGPSessionsViewSet(CustomNetBoxModelViewSet):
     queryset = BGPSession.objects.all()
     serializer_class = BGPSessionSerializer
     filterset_class = BGPSessionFilterSet
+    plan_prefetch_fields = ["peer_a__afi_safis", "peer_b__afi_safis"]
+    etag_related_fields = ["peer_a", "peer_b", "peer_a__afi_safis", "peer_b__afi_safis"]
+
+    def get_delete_plan(self, objects):
+        # device BGP sessions are deleted along with their BGP session (see signals)
+        objects = list(objects)
+        peers = [
+            peer for bgp_session in objects for peer in (bgp_session.peer_a, bgp_session.peer_b)
+        ]
+        return super().get_delete_plan(objects + peers)
+
+    @action(detail=False, methods=["get"], url_path="audit")
+    def audit(self, request):
+        """Report the BGP sessions matching the filters whose two sides are inconsistent.
+
+        ?check= restricts the audit to some checks. Findings are paginated with limit and offset.
+        """
+        checks = request.query_params.getlist("check")
+        unknown = set(checks) - set(CHECKS)
+        if unknown:
+            raise ValidationError({"check": f"unknown checks: {', '.join(sorted(unknown))}"})
+
+        findings = audit_sessions(self.filter_queryset(self.get_queryset()), checks)
+        paginator = OptionalLimitOffsetPagination()
+        page = paginator.paginate_queryset(findings, request, view=self)
+        return paginator.get_paginated_response([finding._asdict() for finding in page])
 
 
 class BGPPeerGroupViewSet(CustomNetBoxModelViewSet):
@@ -105,3 +138,32 @@ class BGPPeerGroupViewSet(CustomNetBoxModelViewSet):
         "device__id",
         "device__name",
     ] + filtersets.device_location_filterset
+
+
+class DeviceBGPSessionEffectiveView(APIView):
+    """Effective configuration of device BGP sessions, inherited from peer groups and BGP globals.
+
+    Each value comes with the level it is defined at: session, peer_group or global. Sessions can
+    be selected by id, device (name), device_id and peer_group_id, and are paginated with limit
+    and offset.
+    """
+
+    permission_classes = [IsAuthenticated]
+    filters = {
+        "id": "pk__in",
+        "device": "device__name__in",
+        "device_id": "device_id__in",
+        "peer_group_id": "peer_group_id__in",
+    }
+
+    def get(self, request):
+        queryset = DeviceBGPSession.objects.restrict(request.user, "view")
+        for param, lookup in self.filters.items():
+            if values := request.query_params.getlist(param):
+                queryset = queryset.filter(**{lookup: values})
+
+        paginator = OptionalLimitOffsetPagination()
+        rows = paginator.paginate_queryset(
+            effective_rows(queryset.order_by("pk")), request, view=self
+        )
+        return paginator.get_paginated_response([to_config(row) for row in rows])
@@ -1,8 +1,22 @@
 """Route Policy serializers."""
 
+from django.core.exceptions import ValidationError as DjangoValidationError
+from netbox.api.serializers import WritableNestedSerializer
 from netbox_cmdb.api.common_serializers import CommonDeviceSerializer
+from netbox_cmdb.api.plan import Plan, apply_changes, apply_terms, diff_terms
+from netbox_cmdb.bgp_community_list.matcher import parse_expression
 from netbox_cmdb.models.bgp_community_list import BGPCommunityList, BGPCommunityListTerm
-from rest_framework.serializers import ModelSerializer, ValidationError
+from rest_framework.serializers import (
+    CharField,
+    IntegerField,
+    ListField,
+    ModelSerializer,
+    Serializer,
+    ValidationError,
+)
+
+BGP_COMMUNITY_LIST_FIELDS = ("name", "device", "definition")
+BGP_COMMUNITY_LIST_TERM_FIELDS = ("community",)
 
 
 class BGPCommunityListTermSerializer(ModelSerializer):
@@ -10,26 +24,102 @@ class BGPCommunityListTermSerializer(ModelSerializer):
         model = BGPCommunityListTerm
         fields = ["sequence", "community"]
 
+    def validate_community(self, value):
+        try:
+            parse_expression(value)
+        except ValueError as error:
+            raise ValidationError(f"{value} is not a valid community expression: {error}")
+        return value
+
+
+class NestedSharedBGPCommunityListSerializer(WritableNestedSerializer):
+    class Meta:
+        model = BGPCommunityList
+        fields = ["id", "name"]
+
+    def get_unique_together_validators(self):
+        """Overriding method to disable unique together checks.
+        This is needed as we only accept an ID on creation/update and obviously don't need to validate uniqueness.
+        """
+        return []
+
 
 class BGPCommunityListSerializer(ModelSerializer):
-    device = CommonDeviceSerializer()
-    terms = BGPCommunityListTermSerializer(many=True, source="bgp_community_list_term")
+    """BGP community list serializer.
+
+    A community list with a null device is shared. A device community list with a definition can
+    have no terms, the terms of its definition then apply.
+    """
+
+    device = CommonDeviceSerializer(allow_null=True)
+    definition = NestedSharedBGPCommunityListSerializer(required=False, allow_null=True)
+    terms = BGPCommunityListTermSerializer(
+        many=True, source="bgp_community_list_term", required=False
+    )
 
     class Meta:
         model = BGPCommunityList
         fields = "__all__"
 
-    def _validate_terms(self, terms_data):
-        if len(terms_data) < 1:
+    def _validate_terms(self, terms_data, definition=None):
+        if len(terms_data) < 1 and definition is None:
             raise ValidationError(
                 {
                     "detail": "input is not valid, you must have at least one term in your bgp-community-list."
                 }
             )
 
+    def _get_bgp_community_list(self, instance, validated_data):
+        """Return the community list as it would be saved, without its terms."""
+        values = {
+            field: validated_data.get(field, getattr(instance, field, None))
+            for field in BGP_COMMUNITY_LIST_FIELDS
+        }
+        return BGPCommunityList(
+            pk=getattr(instance, "pk", None),
+            **{field: value for field, value in values.items() if value is not None},
+        )
+
+    def validate(self, attrs):
+        bgp_community_list = self._get_bgp_community_list(self.instance, attrs)
+        try:
+            bgp_community_list.clean()
+        except DjangoValidationError as error:
+            raise ValidationError(error.message_dict)
+
+        # only the terms of a list with a definition are optional
+        if (
+            "bgp_community_list_term" not in attrs
+            and not self.partial
+            and not bgp_community_list.definition_id
+        ):
+            raise ValidationError({"terms": "This field is required."})
+        return super().validate(attrs)
+
+    def get_plan(self, instance, validated_data):
+        """Return the changes that saving `validated_data` would apply, without writing."""
+        plan = Plan()
+        plan.add_object(
+            BGPCommunityList, instance, validated_data, fields=BGP_COMMUNITY_LIST_FIELDS
+        )
+        if "bgp_community_list_term" not in validated_data and self.partial:
+            return plan
+
+        terms_data = validated_data.get("bgp_community_list_term", [])
+        bgp_community_list = self._get_bgp_community_list(instance, validated_data)
+        self._validate_terms(terms_data, bgp_community_list.definition_id)
+
+        current_terms = instance.bgp_community_list_term.all() if instance else []
+        plan.add_terms(
+            BGPCommunityListTerm,
+            diff_terms(current_terms, terms_data, BGP_COMMUNITY_LIST_TERM_FIELDS),
+            {"bgp_community_list": instance},
+        )
+        return plan
+
     def create(self, validated_data):
-        terms_data = validated_data.pop("bgp_community_list_term")
-        self._validate_terms(terms_data)
+        terms_data = validated_data.pop("bgp_community_list_term", [])
+        self._validate_terms(terms_data, validated_data.get("definition"))
 
         # we create the bgp community list first
         bgp_community_list = BGPCommunityList.objects.create(**validated_data)
@@ -40,31 +130,30 @@ class BGPCommunityListSerializer(ModelSerializer):
         return bgp_community_list
 
     def update(self, instance, validated_data):
-        terms_data = validated_data.pop("bgp_community_list_term")
-        self._validate_terms(terms_data)
-
-        # get current bgp community list terms
-        bgp_com_list_terms = list(BGPCommunityListTerm.objects.filter(bgp_community_list=instance))
-        term_mapping = {term.sequence: term for term in bgp_com_list_terms}
-        data_mapping = {term["sequence"]: term for term in terms_data}
-
-        instance.name = validated_data.get("name", instance.name)
-        instance.device = validated_data.get("device", instance.device)
-        instance.save()
+        # a partial update without terms leaves them untouched
+        if "bgp_community_list_term" not in validated_data and self.partial:
+            self.changed = apply_changes(instance, validated_data, BGP_COMMUNITY_LIST_FIELDS)
+            return instance
+
+        terms_data = validated_data.pop("bgp_community_list_term", [])
+        self._validate_terms(terms_data, validated_data.get("definition", instance.definition))
+
+        self.changed = apply_changes(instance, validated_data, BGP_COMMUNITY_LIST_FIELDS)
+        self.changed |= apply_terms(
+            BGPCommunityListTerm,
+            diff_terms(
+                BGPCommunityListTerm.objects.filter(bgp_community_list=instance),
+                terms_data,
+                BGP_COMMUNITY_LIST_TERM_FIELDS,
+            ),
+            {"bgp_community_list": instance},
+        )
+        return instance
 
-        for term_data in terms_data:
-            term, created = BGPCommunityListTerm.objects.get_or_create(
-                bgp_community_list=instance,
-                sequence=term_data["sequence"],
-                defaults=term_data,
-            )
-            if not created:
-                term.community = term_data.get("community", term.community)
-                term.save()
 
-        # removing extra terms
-        for term_sequence, term in term_mapping.items():
-            if term_sequence not in data_mapping:
-                term.delete()
+class BGPCommunityListMatchSerializer(Serializer):
+    """Communities to match against the BGP community lists of the fleet, or of a device."""
 
-        return instance
+    communities = ListField(child=CharField(), min_length=1)
+    bgp_community_lists = ListField(child=IntegerField(), required=False)
+    device = IntegerField(required=False)
@@ -1,17 +1,92 @@
 """Route Policy views."""
 
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
 from netbox_cmdb import filtersets
-from netbox_cmdb.api.bgp_community_list.serializers import BGPCommunityListSerializer
+from netbox_cmdb.api.bgp_community_list.serializers import (
+    BGPCommunityListMatchSerializer,
+    BGPCommunityListSerializer,
+)
 from netbox_cmdb.api.viewsets import CustomNetBoxModelViewSet
+from netbox_cmdb.api.where_used import WhereUsedMixin
+from netbox_cmdb.bgp_community_list.matcher import get_community_matchers
 from netbox_cmdb.models.bgp_community_list import BGPCommunityList
 
 
-class BGPCommunityListViewSet(CustomNetBoxModelViewSet):
+class BGPCommunityListViewSet(WhereUsedMixin, CustomNetBoxModelViewSet):
     queryset = BGPCommunityList.objects.all()
     serializer_class = BGPCommunityListSerializer
+    plan_prefetch_fields = ["bgp_community_list_term"]
+    etag_related_fields = ["bgp_community_list_term"]
     filterset_fields = [
         "id",
         "name",
         "device__id",
         "device__name",
+        "definition__id",
     ] + filtersets.device_location_filterset
+
+
+class BGPCommunityListMatchView(APIView):
+    """BGP community lists matching communities, with their compiled and cached matchers.
+
+    GET takes community query parameters, POST a list of communities, for batches. Both can be
+    narrowed to some community lists or to the lists of a device.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        data = {
+            "communities": request.query_params.getlist("community"),
+            "bgp_community_lists": request.query_params.getlist("bgp_community_list"),
+        }
+        if "device" in request.query_params:
+            data["device"] = request.query_params["device"]
+        serializer = BGPCommunityListMatchSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        return Response(self._match(request, serializer.validated_data))
+
+    @swagger_auto_schema(request_body=BGPCommunityListMatchSerializer)
+    def post(self, request):
+        serializer = BGPCommunityListMatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(self._match(request, serializer.validated_data))
+
+    def _match(self, request, data):
+        if not request.user.has_perm("netbox_cmdb.view_bgpcommunitylist"):
+            raise PermissionDenied()
+
+        queryset = BGPCommunityList.objects.restrict(request.user, "view")
+        if data.get("bgp_community_lists"):
+            queryset = queryset.filter(pk__in=data["bgp_community_lists"])
+        if "device" in data:
+            queryset = queryset.filter(device_id=data["device"])
+        bgp_community_lists = list(queryset.select_related("device").order_by("pk"))
+        matchers = get_community_matchers([cl.pk for cl in bgp_community_lists])
+
+        return [
+            {
+                "community": community,
+                "bgp_community_lists": [
+                    {
+                        "id": bgp_community_list.pk,
+                        "name": bgp_community_list.name,
+                        # shared community lists have no device
+                        "device": bgp_community_list.device
+                        and {
+                            "id": bgp_community_list.device_id,
+                            "name": bgp_community_list.device.name,
+                        },
+                    }
+                    for bgp_community_list in bgp_community_lists
+                    if bgp_community_list.pk in matchers
+                    and matchers[bgp_community_list.pk].match(community)
+                ],
+            }
+            for community in data["communities"]
+        ]
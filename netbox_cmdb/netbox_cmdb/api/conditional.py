@@ -0,0 +1,98 @@
+"""Conditional requests: ETag validators, If-Match and If-None-Match."""
+
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+
+from django.db.models import Count, Max
+from django.utils import timezone as django_timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "The object has been modified since it was read, fetch it again."
+
+
+def _aggregate(queryset, related_fields):
+    aggregates = {"count": Count("pk", distinct=True), "last_updated": Max("last_updated")}
+    for field in related_fields:
+        aggregates[f"{field}_count"] = Count(field)
+        aggregates[f"{field}_last_updated"] = Max(f"{field}__last_updated")
+    return queryset.order_by().aggregate(**aggregates)
+
+
+def _hash(values):
+    key = json.dumps(values, default=str)
+    return f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+
+
+def object_etag(instance, related_fields=()):
+    """Return the ETag of an object, derived from its last_updated timestamp.
+
+    With `related_fields`, the ETag is computed from the same aggregate as the one of the lists,
+    restricted to the object. It then changes with its related rows, whatever wrote them: admin
+    inlines, clones and bulk inserts don't update the timestamp of the object.
+    """
+    if related_fields:
+        queryset = type(instance).objects.filter(pk=instance.pk)
+        return _hash(_aggregate(queryset, related_fields))
+    if instance.last_updated is None:
+        return '"0"'
+    return f'"{(instance.last_updated - EPOCH) // timedelta(microseconds=1)}"'
+
+
+def parse_etags(header):
+    """Return the list of entity tags of an If-Match or If-None-Match header."""
+    etags = []
+    for etag in header.split(","):
+        etag = etag.strip()
+        if etag.startswith("W/"):
+            etag = etag[2:]
+        if etag:
+            etags.append(etag)
+    return etags
+
+
+def list_etag(request, queryset, related_fields=()):
+    """Return the ETag of a list response, computed from an aggregate of its queryset.
+
+    The row count and the latest last_updated of the filtered queryset, and of each of the
+    `related_fields` relations, are read in a single query. Together with the user and the
+    query string, they change whenever the response could change.
+    """
+    values = _aggregate(queryset, related_fields)
+    return _hash([request.user.pk, request.get_full_path(), values])
+
+
+def is_not_modified(request, etag):
+    """Return whether the If-None-Match header of `request` matches `etag`."""
+    if_none_match = request.headers.get("If-None-Match")
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in parse_etags(if_none_match)
+
+
+def check_if_match(instance, if_match, related_fields=()):
+    """Lock the row of `instance`, if it is still at a version of the If-Match header.
+
+    The row is locked before its version is read, so that a concurrent writer waits for the
+    current transaction and then fails the check. Must be called inside a transaction, before
+    writing. `related_fields` are the ones of `object_etag`. Raises PreconditionFailed when the
+    object has been modified.
+    """
+    if not if_match or if_match.strip() == "*":
+        return
+
+    current = type(instance).objects.select_for_update().filter(pk=instance.pk).first()
+    if current is None or object_etag(current, related_fields) not in parse_etags(if_match):
+        raise PreconditionFailed()
+
+
+def touch(instance):
+    """Bump the last_updated timestamp of `instance`, without saving it."""
+    instance.last_updated = django_timezone.now()
+    type(instance).objects.filter(pk=instance.pk).update(last_updated=instance.last_updated)
@@ -0,0 +1,14 @@
+"""Device generation serializers."""
+
+from rest_framework.serializers import CharField, DictField, IntegerField, ListField, Serializer
+
+
+class DeviceGenerationProbeSerializer(Serializer):
+    """Devices to read the generation of, by id or by name.
+
+    `known` maps device ids to the generation last seen by the client, to list the changed ones.
+    """
+
+    device_id = ListField(child=IntegerField(), required=False)
+    device = ListField(child=CharField(), required=False)
+    known = DictField(child=IntegerField(min_value=0), required=False)
@@ -0,0 +1,119 @@
+"""Device generation views."""
+
+from dcim.models import Device
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from drf_yasg.utils import swagger_auto_schema
+from extras.plugins import get_plugin_config
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from netbox_cmdb.api.device_generation.serializers import DeviceGenerationProbeSerializer
+from netbox_cmdb.notifications import format_event, stream_device_changes
+
+
+def filter_devices(request, filters):
+    """Return the devices viewable by the user, filtered by the device_id and device filters."""
+    devices = Device.objects.restrict(request.user, "view")
+    if filters.get("device_id") or filters.get("device"):
+        devices = devices.filter(
+            Q(pk__in=filters.get("device_id", [])) | Q(name__in=filters.get("device", []))
+        )
+    return devices
+
+
+def parse_device_filters(request):
+    serializer = DeviceGenerationProbeSerializer(
+        data={
+            "device_id": request.query_params.getlist("device_id"),
+            "device": request.query_params.getlist("device"),
+        }
+    )
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+
+class EventStreamRenderer(BaseRenderer):
+    media_type = "text/event-stream"
+    format = "event-stream"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # only used for errors, the events themselves are streamed
+        return format_event("error", data)
+
+
+class DeviceGenerationsView(APIView):
+    """Generation counters of devices, bumped by every change of their CMDB objects.
+
+    GET filters the devices with the device_id and device (name) query parameters. POST takes
+    the same filters in its body, for thousands of devices, and the generations already known
+    by the client, to return the devices which changed since.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(
+            {"generations": self._get_generations(request, parse_device_filters(request))}
+        )
+
+    @swagger_auto_schema(request_body=DeviceGenerationProbeSerializer)
+    def post(self, request):
+        serializer = DeviceGenerationProbeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        generations = self._get_generations(request, serializer.validated_data)
+
+        data = {"generations": generations}
+        if "known" in serializer.validated_data:
+            known = serializer.validated_data["known"]
+            data["changed"] = [
+                int(device_id)
+                for device_id, generation in generations.items()
+                if known.get(device_id) != generation
+            ]
+        return Response(data)
+
+    def _get_generations(self, request, filters):
+        devices = filter_devices(request, filters)
+
+        # devices without any change yet have no generation row
+        return {
+            str(device_id): generation or 0
+            for device_id, generation in devices.values_list("pk", "cmdb_generation__generation")
+        }
+
+
+class DeviceChangesStreamView(APIView):
+    """Server-sent events notifying the changes of a set of devices, as soon as they commit.
+
+    The devices are selected with the device_id and device (name) query parameters. Each event
+    carries the device id and its new generation. The stream is closed after the
+    notification_stream_timeout setting: clients reconnect, and read the generations to catch up
+    with the changes made while they were disconnected.
+    """
+
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [EventStreamRenderer, JSONRenderer]
+
+    def get(self, request):
+        device_ids = set(
+            filter_devices(request, parse_device_filters(request)).values_list("pk", flat=True)
+        )
+        if not device_ids:
+            raise ValidationError("No device matches the device_id and device filters.")
+
+        response = StreamingHttpResponse(
+            stream_device_changes(
+                device_ids,
+                window=get_plugin_config("netbox_cmdb", "notification_coalescing_window"),
+                timeout=get_plugin_config("netbox_cmdb", "notification_stream_timeout"),
+            ),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        # disable the buffering of reverse proxies
+        response["X-Accel-Buffering"] = "no"
+        return response
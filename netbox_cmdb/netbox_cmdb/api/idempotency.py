@@ -0,0 +1,111 @@
+"""Idempotency-Key support for the write endpoints.
+
+The first response to a write request carrying an Idempotency-Key header is stored in the
+cache (Redis) for the `idempotency_key_ttl` plugin setting. A retry of the same request with the
+same key gets the stored response back, without running the request again.
+"""
+
+import hashlib
+import json
+
+from django.core.cache import cache
+from extras.plugins import get_plugin_config
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+IDEMPOTENCY_KEY_HEADER = "HTTP_IDEMPOTENCY_KEY"
+IDEMPOTENCY_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+# a request still running after this delay is considered dead and can be retried
+IDEMPOTENCY_LOCK_TIMEOUT = 300
+
+
+class IdempotencyKeyInProgress(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "A request with this Idempotency-Key is still in progress."
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = "This Idempotency-Key has already been used for a different request."
+
+
+class IdempotentReplay(Exception):
+    """Interrupts a request whose response is already known."""
+
+    def __init__(self, stored):
+        super().__init__()
+        self.stored = stored
+
+
+class IdempotencyMixin:
+    """Honour the Idempotency-Key header of write requests on an APIView."""
+
+    def _get_idempotency_key(self, request):
+        key = request.META.get(IDEMPOTENCY_KEY_HEADER)
+        if not key or request.method not in IDEMPOTENCY_METHODS:
+            return None
+
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return f"netbox_cmdb:idempotency:{request.user.pk}:{request.method}:{request.path}:{digest}"
+
+    @staticmethod
+    def _get_fingerprint(request):
+        data = json.dumps(request.data, sort_keys=True, default=str)
+        return hashlib.sha256(f"{request.get_full_path()}:{data}".encode()).hexdigest()
+
+    def initial(self, request, *args, **kwargs):
+        self._idempotency_key = None
+        super().initial(request, *args, **kwargs)
+
+        key = self._get_idempotency_key(request)
+        if key is None:
+            return
+
+        fingerprint = self._get_fingerprint(request)
+        stored = cache.get(key)
+        if stored is not None:
+            if stored["fingerprint"] != fingerprint:
+                raise IdempotencyKeyReused()
+            raise IdempotentReplay(stored)
+
+        # reserve the key, so that concurrent retries are not run twice
+        if not cache.add(f"{key}:lock", True, timeout=IDEMPOTENCY_LOCK_TIMEOUT):
+            raise IdempotencyKeyInProgress()
+
+        self._idempotency_key = key
+        self._idempotency_fingerprint = fingerprint
+
+    def handle_exception(self, exc):
+        if isinstance(exc, IdempotentReplay):
+            return Response(
+                exc.stored["data"],
+                status=exc.stored["status"],
+                headers={"Idempotent-Replayed": "true"},
+            )
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+
+        key = getattr(self, "_idempotency_key", None)
+        if key is not None and response.status_code < 500:
+            cache.set(
+                key,
+                {
+                    "fingerprint": self._idempotency_fingerprint,
+                    "status": response.status_code,
+                    "data": response.data,
+                },
+                timeout=get_plugin_config("netbox_cmdb", "idempotency_key_ttl"),
+            )
+        return response
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            key = getattr(self, "_idempotency_key", None)
+            if key is not None:
+                cache.delete(f"{key}:lock")
@@ -0,0 +1,41 @@
+"""Background job serializers."""
+
+from extras.models import JobResult
+from rest_framework.serializers import ModelSerializer, SerializerMethodField
+
+
+class BulkWriteJobSerializer(ModelSerializer):
+    """Status of a background bulk write, with its progress, errors and written ids."""
+
+    status = SerializerMethodField()
+    progress = SerializerMethodField()
+    errors = SerializerMethodField()
+    ids = SerializerMethodField()
+
+    class Meta:
+        model = JobResult
+        fields = [
+            "id",
+            "job_id",
+            "name",
+            "status",
+            "created",
+            "completed",
+            "progress",
+            "errors",
+            "ids",
+        ]
+
+    def get_status(self, obj):
+        return obj.status
+
+    def get_progress(self, obj):
+        data = obj.data or {}
+        return {"total": data.get("total"), "processed": data.get("processed", 0)}
+
+    def get_errors(self, obj):
+        return (obj.data or {}).get("errors", [])
+
+    def get_ids(self, obj):
+        data = obj.data or {}
+        return {"created": data.get("created", []), "updated": data.get("updated", [])}
@@ -0,0 +1,23 @@
+"""Background job views."""
+
+from extras.models import JobResult
+from rest_framework.mixins import RetrieveModelMixin
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.viewsets import GenericViewSet
+
+from netbox_cmdb.api.job.serializers import BulkWriteJobSerializer
+
+
+class JobViewSet(RetrieveModelMixin, GenericViewSet):
+    """Status of the background jobs enqueued by the plugin, looked up by their job id."""
+
+    queryset = JobResult.objects.filter(obj_type__app_label="netbox_cmdb")
+    serializer_class = BulkWriteJobSerializer
+    permission_classes = [IsAuthenticated]
+    lookup_field = "job_id"
+
+    def get_queryset(self):
+        # users can only follow their own jobs
+        if self.request.user.is_superuser:
+            return self.queryset
+        return self.queryset.filter(user=self.request.user)
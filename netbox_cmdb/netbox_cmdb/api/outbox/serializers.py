@@ -0,0 +1,31 @@
+"""Outbox serializers."""
+
+from django.contrib.contenttypes.models import ContentType
+from netbox.api.fields import ContentTypeField
+from rest_framework.serializers import IntegerField, ModelSerializer, Serializer
+
+from netbox_cmdb.models.outbox import OutboxEvent
+
+
+class OutboxEventSerializer(ModelSerializer):
+    object_type = ContentTypeField(queryset=ContentType.objects.all())
+
+    class Meta:
+        model = OutboxEvent
+        fields = [
+            "id",
+            "version",
+            "object_type",
+            "object_id",
+            "object_repr",
+            "action",
+            "created",
+            "last_changed",
+        ]
+
+
+class OutboxAckSerializer(Serializer):
+    """An event read by a consumer, acknowledged at the version it has read."""
+
+    id = IntegerField()
+    version = IntegerField()
@@ -0,0 +1,44 @@
+"""Outbox views."""
+
+from django.db.models import Q
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.mixins import ListModelMixin
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.viewsets import GenericViewSet
+
+from netbox_cmdb.api.outbox.serializers import OutboxAckSerializer, OutboxEventSerializer
+from netbox_cmdb.models.outbox import OutboxEvent
+
+
+class OutboxViewSet(ListModelMixin, GenericViewSet):
+    """Pending outbox events, oldest first.
+
+    Consumers read a batch of events, process them, then acknowledge them with their id and the
+    version they have read. An event changed again in the meantime is not removed by the
+    acknowledgement, and is read again with its new version.
+    """
+
+    queryset = OutboxEvent.objects.select_related("object_type").order_by("id")
+    serializer_class = OutboxEventSerializer
+    permission_classes = [IsAuthenticated]
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        permission = "delete_outboxevent" if self.action == "ack" else "view_outboxevent"
+        if not request.user.has_perm(f"netbox_cmdb.{permission}"):
+            raise PermissionDenied()
+
+    @swagger_auto_schema(request_body=OutboxAckSerializer(many=True))
+    @action(detail=False, methods=["post"])
+    def ack(self, request):
+        serializer = OutboxAckSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        events = Q()
+        for event in serializer.validated_data:
+            events |= Q(id=event["id"], version=event["version"])
+        acknowledged = OutboxEvent.objects.filter(events).delete()[0] if events else 0
+        return Response({"acknowledged": acknowledged})
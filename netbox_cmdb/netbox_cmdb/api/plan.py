@@ -0,0 +1,212 @@
+"""Write plans.
+
+A plan describes the objects a write request would create, update or delete, computed by
+comparing the validated input with the current rows, without writing anything.
+"""
+
+from django.db import models, router
+from django.db.models.deletion import Collector
+from netaddr import IPAddress, IPNetwork
+
+
+def normalize(value):
+    """Return a comparable and JSON serializable representation of a field value."""
+    if isinstance(value, models.Model):
+        return value.pk
+    if isinstance(value, (IPAddress, IPNetwork)):
+        return str(value)
+    return value
+
+
+def changed_fields(instance, data, fields=None):
+    """Return the fields from `data` whose value differs from the current value of `instance`.
+
+    Only the fields present in `data` (and in `fields` when given) are compared. Foreign keys are
+    compared on their primary key, so that related objects are never loaded from the database, and
+    many-to-many fields on the set of their primary keys.
+    The result maps each changed field name to a (current, new) tuple of normalized values.
+    """
+    changes = {}
+    for name, value in data.items():
+        if fields is not None and name not in fields:
+            continue
+
+        field = instance._meta.get_field(name)
+        if field.many_to_many:
+            current = set(getattr(instance, name).values_list("pk", flat=True))
+            new = {normalize(item) for item in value or []}
+            if current != new:
+                changes[name] = (sorted(current), sorted(new))
+            continue
+        if field.many_to_one or field.one_to_one:
+            current = getattr(instance, field.attname)
+        else:
+            current = getattr(instance, name)
+
+        current, new = normalize(current), normalize(value)
+        if current != new:
+            changes[name] = (current, new)
+    return changes
+
+
+def diff_terms(current_terms, terms_data, fields, key="sequence"):
+    """Compare the current terms of an object with the provided ones, matched on `key`.
+
+    Returns a tuple (to_create, to_update, unchanged, to_delete) where:
+    - to_create is the list of term data without a matching current term,
+    - to_update is a list of (term, term_data, changes) for terms with changed fields,
+    - unchanged is the list of current terms left identical,
+    - to_delete is the list of current terms absent from the provided data.
+    """
+    term_mapping = {getattr(term, key): term for term in current_terms}
+    data_mapping = {term_data[key]: term_data for term_data in terms_data}
+
+    to_create, to_update, unchanged = [], [], []
+    for term_key, term_data in data_mapping.items():
+        term = term_mapping.get(term_key)
+        if term is None:
+            to_create.append(term_data)
+            continue
+
+        changes = changed_fields(term, term_data, fields)
+        if changes:
+            to_update.append((term, term_data, changes))
+        else:
+            unchanged.append(term)
+
+    to_delete = [term for term_key, term in term_mapping.items() if term_key not in data_mapping]
+    return to_create, to_update, unchanged, to_delete
+
+
+def apply_changes(instance, data, fields=None):
+    """Set the fields of `instance` whose value differs in `data`, saving it only if any did.
+
+    Returns whether the instance was saved.
+    """
+    changes = changed_fields(instance, data, fields)
+    for name in changes:
+        setattr(instance, name, data[name])
+    if changes:
+        instance.save()
+    return bool(changes)
+
+
+def apply_terms(model, terms_diff, parent_data):
+    """Write the output of `diff_terms`, leaving the unchanged terms untouched.
+
+    `parent_data` is merged into the data of created terms, to reference their parent.
+    Returns whether any term was written.
+    """
+    to_create, to_update, _, to_delete = terms_diff
+    for term_data in to_create:
+        model.objects.create(**parent_data, **term_data)
+    for term, term_data, changes in to_update:
+        for name in changes:
+            setattr(term, name, term_data[name])
+        term.save()
+    for term in to_delete:
+        term.delete()
+    return bool(to_create or to_update or to_delete)
+
+
+class Plan:
+    """The list of objects a write would create, update or delete."""
+
+    def __init__(self):
+        self.create = []
+        self.update = []
+        self.delete = []
+        self.unchanged = 0
+
+    @staticmethod
+    def _label(model):
+        return model._meta.label_lower
+
+    def add_create(self, model, data):
+        self.create.append(
+            {
+                "model": self._label(model),
+                "data": {
+                    name: normalize(value)
+                    for name, value in data.items()
+                    if not isinstance(value, (list, dict))
+                },
+            }
+        )
+
+    def add_update(self, instance, changes):
+        if not changes:
+            self.unchanged += 1
+            return
+
+        self.update.append(
+            {
+                "model": self._label(instance),
+                "id": instance.pk,
+                "display": str(instance),
+                "changes": {
+                    name: {"current": current, "new": new}
+                    for name, (current, new) in changes.items()
+                },
+            }
+        )
+
+    def add_delete(self, instance):
+        self.delete.append(
+            {"model": self._label(instance), "id": instance.pk, "display": str(instance)}
+        )
+
+    def add_terms(self, model, terms_diff, parent_data):
+        """Add to the plan the output of `diff_terms`.
+
+        `parent_data` is merged into the data of created terms, to reference their parent.
+        """
+        to_create, to_update, unchanged, to_delete = terms_diff
+        for term_data in to_create:
+            self.add_create(model, {**parent_data, **term_data})
+        for term, _, changes in to_update:
+            self.add_update(term, changes)
+        self.unchanged += len(unchanged)
+        for term in to_delete:
+            self.add_delete(term)
+
+    def add_object(self, model, instance, validated_data, fields=None):
+        """Add a single object creation or update, compared field by field."""
+        if instance is None:
+            self.add_create(model, validated_data)
+        else:
+            self.add_update(instance, changed_fields(instance, validated_data, fields))
+
+    def add_deleted_objects(self, objects):
+        """Add the given objects and everything their deletion would cascade to.
+
+        Relations are walked with Django's deletion collector, which only reads from the
+        database. A ProtectedError is raised as it would be by the actual deletion.
+        """
+        by_model = {}
+        for obj in objects:
+            by_model.setdefault(obj._meta.model, []).append(obj)
+
+        for model, instances in by_model.items():
+            collector = Collector(using=router.db_for_write(model))
+            collector.collect(instances)
+            for instances_to_delete in collector.data.values():
+                for instance in instances_to_delete:
+                    self.add_delete(instance)
+            for queryset in collector.fast_deletes:
+                for instance in queryset:
+                    self.add_delete(instance)
+
+    def extend(self, other):
+        self.create.extend(other.create)
+        self.update.extend(other.update)
+        self.delete.extend(other.delete)
+        self.unchanged += other.unchanged
+
+    def as_dict(self):
+        return {
+            "create": self.create,
+            "update": self.update,
+            "delete": self.delete,
+            "unchanged": self.unchanged,
+        }
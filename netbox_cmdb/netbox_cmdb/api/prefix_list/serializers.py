@@ -1,9 +1,25 @@
 """Prefix list serializers."""
 
-from rest_framework.serializers import ModelSerializer, ValidationError
+from django.core.exceptions import ValidationError as DjangoValidationError
+from netaddr import AddrFormatError, IPNetwork
+from netbox.api.serializers import WritableNestedSerializer
+from rest_framework.serializers import (
+    CharField,
+    ChoiceField,
+    IntegerField,
+    ListField,
+    ModelSerializer,
+    Serializer,
+    ValidationError,
+)
 
 from netbox_cmdb.api.common_serializers import CommonDeviceSerializer
+from netbox_cmdb.api.plan import Plan, apply_changes, apply_terms, diff_terms
 from netbox_cmdb.models.prefix_list import PrefixList, PrefixListTerm
+from netbox_cmdb.prefix_list.setops import OPERATIONS
+
+PREFIX_LIST_FIELDS = ("name", "device", "definition", "ip_version")
+PREFIX_LIST_TERM_FIELDS = ("prefix", "le", "ge")
 
 
 class PrefixListTermSerializer(ModelSerializer):
@@ -14,27 +30,106 @@ class PrefixListTermSerializer(ModelSerializer):
         fields = ["sequence", "prefix", "le", "ge"]
 
 
+class NestedSharedPrefixListSerializer(WritableNestedSerializer):
+    class Meta:
+        model = PrefixList
+        fields = ["id", "name"]
+
+    def get_unique_together_validators(self):
+        """Overriding method to disable unique together checks.
+        This is needed as we only accept an ID on creation/update and obviously don't need to validate uniqueness.
+        """
+        return []
+
+
 class PrefixListSerializer(ModelSerializer):
-    """Prefix List serializer."""
+    """Prefix List serializer.
 
-    device = CommonDeviceSerializer()
-    terms = PrefixListTermSerializer(many=True, source="prefix_list_term")
+    A prefix list with a null device is shared. A device prefix list with a definition can have
+    no terms, the terms of its definition then apply.
+    """
+
+    device = CommonDeviceSerializer(allow_null=True)
+    definition = NestedSharedPrefixListSerializer(required=False, allow_null=True)
+    terms = PrefixListTermSerializer(many=True, source="prefix_list_term", required=False)
 
     class Meta:  # pylint: disable=missing-docstring
         model = PrefixList
-        fields = ["id", "name", "device", "ip_version", "terms"]
+        fields = ["id", "name", "device", "definition", "ip_version", "terms"]
 
-    def _validate_terms(self, terms_data):
-        if len(terms_data) < 1:
+    def _validate_terms(self, terms_data, definition=None):
+        if len(terms_data) < 1 and definition is None:
             raise ValidationError(
                 {
                     "detail": "input is not valid, you must have at least one term in your prefix-list."
                 }
             )
 
+    def _get_prefix_list(self, instance, validated_data):
+        """Return the prefix list as it would be saved, without its terms."""
+        values = {
+            field: validated_data.get(field, getattr(instance, field, None))
+            for field in PREFIX_LIST_FIELDS
+        }
+        return PrefixList(
+            pk=getattr(instance, "pk", None),
+            **{field: value for field, value in values.items() if value is not None},
+        )
+
+    def validate(self, attrs):
+        prefix_list = self._get_prefix_list(self.instance, attrs)
+        try:
+            prefix_list.clean()
+        except DjangoValidationError as error:
+            raise ValidationError(error.message_dict)
+
+        # only the terms of a list with a definition are optional
+        if "prefix_list_term" not in attrs and not self.partial and not prefix_list.definition_id:
+            raise ValidationError({"terms": "This field is required."})
+        return super().validate(attrs)
+
+    def _validate_terms_content(self, terms):
+        """Run the model validation of the terms, without saving them."""
+        errors = []
+        for term in terms:
+            try:
+                term.clean_fields(exclude=["prefix_list"])
+                term.clean()
+            except DjangoValidationError as error:
+                errors.append(f"sequence {term.sequence}: {', '.join(error.messages)}")
+
+        if errors:
+            raise ValidationError({"terms": errors})
+
+    def get_plan(self, instance, validated_data):
+        """Return the changes that saving `validated_data` would apply, without writing."""
+        plan = Plan()
+        plan.add_object(PrefixList, instance, validated_data, fields=PREFIX_LIST_FIELDS)
+        if "prefix_list_term" not in validated_data and self.partial:
+            return plan
+
+        terms_data = validated_data.get("prefix_list_term", [])
+        prefix_list = self._get_prefix_list(instance, validated_data)
+        self._validate_terms(terms_data, prefix_list.definition_id)
+
+        current_terms = instance.prefix_list_term.all() if instance else []
+        terms_diff = diff_terms(current_terms, terms_data, PREFIX_LIST_TERM_FIELDS)
+
+        # new and modified terms are validated against the prefix list as it would be saved
+        to_create, to_update, _, _ = terms_diff
+        terms = [PrefixListTerm(prefix_list=prefix_list, **term_data) for term_data in to_create]
+        for term, term_data, _ in to_update:
+            term_values = {field: getattr(term, field) for field in PREFIX_LIST_TERM_FIELDS}
+            term_values.update(term_data)
+            terms.append(PrefixListTerm(prefix_list=prefix_list, **term_values))
+        self._validate_terms_content(terms)
+
+        plan.add_terms(PrefixListTerm, terms_diff, {"prefix_list": instance})
+        return plan
+
     def create(self, validated_data):
-        terms_data = validated_data.pop("prefix_list_term")
-        self._validate_terms(terms_data)
+        terms_data = validated_data.pop("prefix_list_term", [])
+        self._validate_terms(terms_data, validated_data.get("definition"))
         # we create the prefix list first
         prefix_list = PrefixList.objects.create(**validated_data)
 
@@ -44,32 +139,78 @@ class PrefixListSerializer(ModelSerializer):
         return prefix_list
 
     def update(self, instance, validated_data):
-        terms_data = validated_data.pop("prefix_list_term")
-        self._validate_terms(terms_data)
+        # a partial update without terms leaves them untouched
+        if "prefix_list_term" not in validated_data and self.partial:
+            self.changed = apply_changes(instance, validated_data, PREFIX_LIST_FIELDS)
+            return instance
+
+        terms_data = validated_data.pop("prefix_list_term", [])
+        self._validate_terms(terms_data, validated_data.get("definition", instance.definition))
+
+        terms_diff = diff_terms(
+            PrefixListTerm.objects.filter(prefix_list=instance),
+            terms_data,
+            PREFIX_LIST_TERM_FIELDS,
+        )
+        ip_version = instance.ip_version
+        self.changed = apply_changes(instance, validated_data, PREFIX_LIST_FIELDS)
+
+        # unchanged terms are not saved, but must still match a new IP version
+        if instance.ip_version != ip_version:
+            _, _, unchanged, _ = terms_diff
+            for term in unchanged:
+                term.prefix_list = instance
+            self._validate_terms_content(unchanged)
+
+        self.changed |= apply_terms(PrefixListTerm, terms_diff, {"prefix_list": instance})
+        return instance
 
-        # get current prefix list terms
-        pf_terms = list(PrefixListTerm.objects.filter(prefix_list=instance))
-        term_mapping = {term.sequence: term for term in pf_terms}
-        data_mapping = {term["sequence"]: term for term in terms_data}
 
-        instance.name = validated_data.get("name", instance.name)
-        instance.device = validated_data.get("device", instance.device)
-        instance.ip_version = validated_data.get("ip_version", instance.ip_version)
-        instance.save()
+class PrefixSerializer(CharField):
+    """An IP prefix, returned as a string."""
 
-        for term_data in terms_data:
-            term, created = PrefixListTerm.objects.get_or_create(
-                prefix_list=instance, sequence=term_data["sequence"], defaults=term_data
-            )
-            if not created:
-                term.prefix = term_data.get("prefix", term.prefix)
-                term.le = term_data.get("le", term.le)
-                term.ge = term_data.get("ge", term.ge)
-                term.save()
+    def to_internal_value(self, data):
+        value = super().to_internal_value(data)
+        try:
+            return str(IPNetwork(value).cidr)
+        except (AddrFormatError, ValueError):
+            raise ValidationError(f"{value} is not a valid IP prefix.")
 
-        # removing extra terms
-        for term_sequence, term in term_mapping.items():
-            if term_sequence not in data_mapping:
-                term.delete()
 
-        return instance
+class PrefixListMatchSerializer(Serializer):
+    """Prefixes to look up in the prefix lists of the fleet."""
+
+    prefixes = ListField(child=PrefixSerializer(), min_length=1)
+
+
+class PrefixListReferenceSerializer(Serializer):
+    """A prefix list, by id or by device and name."""
+
+    id = IntegerField(required=False)
+    device = CommonDeviceSerializer(required=False)
+    name = CharField(required=False)
+
+    def validate(self, data):
+        if "id" not in data and not ("device" in data and "name" in data):
+            raise ValidationError("a prefix list is referenced by id, or by device and name.")
+        return data
+
+
+class PrefixListSaveAsSerializer(Serializer):
+    """The prefix list to create with the result of a set operation."""
+
+    device = CommonDeviceSerializer()
+    name = CharField(max_length=100)
+
+
+class PrefixListSetOperationSerializer(Serializer):
+    """A set operation on prefix lists; the difference removes the next lists from the first."""
+
+    operation = ChoiceField(choices=list(OPERATIONS))
+    prefix_lists = PrefixListReferenceSerializer(many=True)
+    save_as = PrefixListSaveAsSerializer(required=False)
+
+    def validate_prefix_lists(self, value):
+        if len(value) < 2:
+            raise ValidationError("at least two prefix lists are needed.")
+        return value
@@ -1,18 +1,257 @@
 """Route Policy views."""
 
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from drf_yasg.utils import swagger_auto_schema
+from netbox.api.viewsets.mixins import ObjectValidationMixin
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
 from netbox_cmdb import filtersets
-from netbox_cmdb.api.prefix_list.serializers import PrefixListSerializer
+from netbox_cmdb.api.conditional import check_if_match, object_etag
+from netbox_cmdb.api.idempotency import IdempotencyMixin
+from netbox_cmdb.api.prefix_list.serializers import (
+    PrefixListMatchSerializer,
+    PrefixListSerializer,
+    PrefixListSetOperationSerializer,
+)
 from netbox_cmdb.api.viewsets import CustomNetBoxModelViewSet
-from netbox_cmdb.models.prefix_list import PrefixList
+from netbox_cmdb.api.where_used import WhereUsedMixin
+from netbox_cmdb.changelog import log_creations, log_deletions
+from netbox_cmdb.models.prefix_list import PrefixList, PrefixListTerm
+from netbox_cmdb.prefix_list.analyzer import build_report
+from netbox_cmdb.prefix_list.index import get_index, prefix_lists_changed
+from netbox_cmdb.prefix_list.optimizer import optimize_terms, to_terms
+from netbox_cmdb.prefix_list.ranges import term_range
+from netbox_cmdb.prefix_list.setops import combine
+from netbox_cmdb.shared import inheriting, term_sources
 
 
-class PrefixListViewSet(CustomNetBoxModelViewSet):
+class PrefixListViewSet(WhereUsedMixin, CustomNetBoxModelViewSet):
     queryset = PrefixList.objects.all()
     serializer_class = PrefixListSerializer
-    filterset_fields = [
-        "id",
-        "name",
-        "ip_version",
-        "device__id",
-        "device__name",
-    ] + filtersets.device_location_filterset
+    plan_prefetch_fields = ["prefix_list_term"]
+    etag_related_fields = ["prefix_list_term"]
+    filterset_class = filtersets.PrefixListFilterSet
+
+    @action(detail=False, methods=["get"], url_path="analysis")
+    def analysis(self, request):
+        """Report the shadowed and overlapped terms of the prefix lists matching the filters."""
+        return Response(build_report(self.filter_queryset(self.get_queryset()).order_by()))
+
+    @action(detail=True, methods=["get", "put"], url_path="optimize")
+    def optimize(self, request, pk=None):
+        """Preview (GET) or apply (PUT) the smallest equivalent set of terms of a prefix list.
+
+        Applying replaces all the terms, renumbered by steps of 5, as a single change of the prefix
+        list. It honours ?dry_run=1 and the If-Match header.
+        """
+        prefix_list = self.get_object()
+        current = list(prefix_list.prefix_list_term.values_list("prefix", "ge", "le"))
+        terms = optimize_terms([term_range(prefix, ge, le) for prefix, ge, le in current])
+        unchanged = {(str(prefix), ge, le) for prefix, ge, le in current} == {
+            (term["prefix"], term["ge"], term["le"]) for term in terms
+        } and len(current) == len(terms)
+
+        applied = request.method == "PUT" and not self.dry_run and not unchanged
+        if applied:
+            self._replace_terms(prefix_list, terms)
+
+        return Response(
+            {
+                "terms_before": len(current),
+                "terms_after": len(terms),
+                "unchanged": unchanged,
+                "applied": applied,
+                "terms": terms,
+            },
+            headers={"ETag": object_etag(prefix_list, self.etag_related_fields)},
+        )
+
+    def _replace_terms(self, prefix_list, terms):
+        with transaction.atomic():
+            check_if_match(prefix_list, self.if_match, self.etag_related_fields)
+            if hasattr(prefix_list, "snapshot"):
+                prefix_list.snapshot()
+            # the terms are deleted, and the optimized ones inserted, at once and without signals:
+            # optimized terms are valid by construction, and saving the prefix list bumps its
+            # device, records its change in the outbox and updates the index
+            current = prefix_list.prefix_list_term.all()
+            deleted = list(current)
+            current._raw_delete(current.db)
+            log_deletions(deleted)
+            created = PrefixListTerm.objects.bulk_create(
+                [PrefixListTerm(prefix_list=prefix_list, **term) for term in terms],
+                batch_size=1000,
+            )
+            log_creations(created)
+            prefix_list.save()
+            prefix_lists_changed({prefix_list.pk})
+
+
+class PrefixListMatchView(APIView):
+    """Prefix lists and terms matching prefixes, looked up in an in-memory index of the fleet.
+
+    GET takes prefix query parameters, POST a list of prefixes, for batches. The terms matching
+    each prefix are listed by prefix list, by sequence: the first one is the term that matches.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        serializer = PrefixListMatchSerializer(
+            data={"prefixes": request.query_params.getlist("prefix")}
+        )
+        serializer.is_valid(raise_exception=True)
+        return Response(self._match(request, serializer.validated_data["prefixes"]))
+
+    @swagger_auto_schema(request_body=PrefixListMatchSerializer)
+    def post(self, request):
+        serializer = PrefixListMatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(self._match(request, serializer.validated_data["prefixes"]))
+
+    def _match(self, request, prefixes):
+        if not request.user.has_perm("netbox_cmdb.view_prefixlist"):
+            raise PermissionDenied()
+
+        index = get_index()
+        matches = {prefix: index.match(prefix) for prefix in prefixes}
+
+        # the prefix lists using the terms of a matching shared definition match as well
+        definitions = inheriting(
+            PrefixList, {pk for prefix_matches in matches.values() for pk in prefix_matches}
+        )
+        for prefix_matches in matches.values():
+            for pk, definition_id in definitions.items():
+                if definition_id in prefix_matches:
+                    prefix_matches[pk] = prefix_matches[definition_id]
+
+        prefix_list_ids = {pk for prefix_matches in matches.values() for pk in prefix_matches}
+        prefix_lists = {
+            prefix_list.pk: prefix_list
+            for prefix_list in PrefixList.objects.restrict(request.user, "view")
+            .filter(pk__in=prefix_list_ids)
+            .select_related("device")
+        }
+
+        results = []
+        for prefix, prefix_matches in matches.items():
+            results.append(
+                {
+                    "prefix": prefix,
+                    "prefix_lists": [
+                        {
+                            "id": prefix_list.pk,
+                            "name": prefix_list.name,
+                            # shared prefix lists have no device
+                            "device": prefix_list.device
+                            and {"id": prefix_list.device_id, "name": prefix_list.device.name},
+                            "terms": [
+                                {
+                                    "sequence": term.sequence,
+                                    "prefix": term.prefix,
+                                    "ge": term.ge,
+                                    "le": term.le,
+                                }
+                                for term in terms
+                            ],
+                        }
+                        for pk, terms in sorted(prefix_matches.items())
+                        if (prefix_list := prefix_lists.get(pk))
+                    ],
+                }
+            )
+        return results
+
+
+class PrefixListSetOperationView(IdempotencyMixin, ObjectValidationMixin, APIView):
+    """Union, intersection or difference of prefix lists, computed on the prefixes they match.
+
+    The result is returned as terms, and created as a new prefix list when save_as is given.
+    """
+
+    permission_classes = [IsAuthenticated]
+    queryset = PrefixList.objects.all()
+
+    @swagger_auto_schema(request_body=PrefixListSetOperationSerializer)
+    def post(self, request):
+        serializer = PrefixListSetOperationSerializer(
+            data=request.data, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        prefix_lists = self._get_prefix_lists(request, data["prefix_lists"])
+        ip_versions = {prefix_list.ip_version for prefix_list in prefix_lists}
+        if len(ip_versions) > 1:
+            raise ValidationError(
+                {"prefix_lists": "the prefix lists must have the same IP version."}
+            )
+
+        sources = term_sources(PrefixList, [prefix_list.pk for prefix_list in prefix_lists])
+        ranges = {source: [] for source in sources.values()}
+        for prefix_list_id, prefix, ge, le in (
+            PrefixListTerm.objects.filter(prefix_list__in=ranges)
+            .values_list("prefix_list_id", "prefix", "ge", "le")
+            .iterator()
+        ):
+            ranges[prefix_list_id].append(term_range(prefix, ge, le))
+        terms = to_terms(
+            combine(
+                data["operation"],
+                [ranges[sources[prefix_list.pk]] for prefix_list in prefix_lists],
+            )
+        )
+
+        result = {
+            "operation": data["operation"],
+            "prefix_lists": [prefix_list.pk for prefix_list in prefix_lists],
+            "terms": terms,
+        }
+        if "save_as" not in data:
+            return Response(result)
+
+        result["id"] = self._save_as(request, data["save_as"], ip_versions.pop(), terms)
+        return Response(result, status=status.HTTP_201_CREATED)
+
+    def _get_prefix_lists(self, request, references):
+        queryset = PrefixList.objects.restrict(request.user, "view")
+        prefix_lists = []
+        for index, reference in enumerate(references):
+            lookup = (
+                {"pk": reference["id"]}
+                if "id" in reference
+                else {"device": reference["device"], "name": reference["name"]}
+            )
+            try:
+                prefix_lists.append(queryset.get(**lookup))
+            except PrefixList.DoesNotExist:
+                raise ValidationError({"prefix_lists": f"prefix list {index} not found."})
+        return prefix_lists
+
+    def _save_as(self, request, save_as, ip_version, terms):
+        if not terms:
+            raise ValidationError({"detail": "the result has no term, no prefix list is created."})
+        if PrefixList.objects.filter(device=save_as["device"], name=save_as["name"]).exists():
+            raise ValidationError({"save_as": "a prefix list with this name exists on the device."})
+
+        self.queryset = PrefixList.objects.restrict(request.user, "add")
+        try:
+            with transaction.atomic():
+                prefix_list = PrefixList.objects.create(ip_version=ip_version, **save_as)
+                self._validate_objects(prefix_list)
+                # the terms are valid by construction and inserted at once, without signals
+                created = PrefixListTerm.objects.bulk_create(
+                    [PrefixListTerm(prefix_list=prefix_list, **term) for term in terms],
+                    batch_size=1000,
+                )
+                log_creations(created)
+                prefix_lists_changed({prefix_list.pk})
+        except ObjectDoesNotExist:
+            raise PermissionDenied()
+        return prefix_list.pk
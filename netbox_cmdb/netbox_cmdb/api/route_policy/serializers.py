@@ -1,5 +1,6 @@
 """Route Policy serializers."""
 
+from dcim.models import Device
 from django.core.exceptions import ValidationError
 from netbox.api.serializers import WritableNestedSerializer
 from rest_framework import serializers
@@ -7,10 +8,33 @@ from rest_framework.serializers import ModelSerializer
 
 from netbox_cmdb.api.bgp.serializers import AsnSerializer
 from netbox_cmdb.api.common_serializers import CommonDeviceSerializer
+from netbox_cmdb.api.plan import Plan, apply_changes, apply_terms, diff_terms
+from netbox_cmdb.api.prefix_list.serializers import PrefixSerializer
+from netbox_cmdb.bgp_community_list.matcher import parse_expression
 from netbox_cmdb.models.bgp_community_list import BGPCommunityList
 from netbox_cmdb.models.prefix_list import PrefixList
 from netbox_cmdb.models.route_policy import RoutePolicy, RoutePolicyTerm
 
+ROUTE_POLICY_FIELDS = ("name", "device", "description")
+ROUTE_POLICY_TERM_FIELDS = (
+    "decision",
+    "description",
+    "from_bgp_community",
+    "from_bgp_community_list",
+    "from_prefix_list",
+    "from_source_protocol",
+    "from_route_type",
+    "from_local_pref",
+    "set_local_pref",
+    "set_community",
+    "set_origin",
+    "set_metric",
+    "set_large_community",
+    "set_as_path_prepend_repeat",
+    "set_as_path_prepend_asn",
+    "set_next_hop",
+)
+
 
 class NestedBgpCommunityListSerializer(WritableNestedSerializer):
     class Meta:
@@ -65,6 +89,16 @@ class RoutePolicyTermSerializer(ModelSerializer):
             "set_next_hop",
         ]
 
+    def validate_from_bgp_community(self, value):
+        if value:
+            try:
+                parse_expression(value)
+            except ValueError as error:
+                raise serializers.ValidationError(
+                    f"{value} is not a valid community expression: {error}"
+                )
+        return value
+
 
 class WritableRoutePolicySerializer(ModelSerializer):
     device = CommonDeviceSerializer()
@@ -83,6 +117,21 @@ class WritableRoutePolicySerializer(ModelSerializer):
                 }
             )
 
+    def get_plan(self, instance, validated_data):
+        """Return the changes that saving `validated_data` would apply, without writing."""
+        terms_data = validated_data.get("route_policy_term", [])
+        self._validate_terms(terms_data)
+
+        plan = Plan()
+        plan.add_object(RoutePolicy, instance, validated_data, fields=ROUTE_POLICY_FIELDS)
+        current_terms = instance.route_policy_term.all() if instance else []
+        plan.add_terms(
+            RoutePolicyTerm,
+            diff_terms(current_terms, terms_data, ROUTE_POLICY_TERM_FIELDS),
+            {"route_policy": instance},
+        )
+        return plan
+
     def create(self, validated_data):
         terms_data = validated_data.pop("route_policy_term")
         self._validate_terms(terms_data)
@@ -98,58 +147,16 @@ class WritableRoutePolicySerializer(ModelSerializer):
         terms_data = validated_data.pop("route_policy_term")
         self._validate_terms(terms_data)
 
-        # get current route policy terms
-        rp_terms = list(RoutePolicyTerm.objects.filter(route_policy=instance))
-        term_mapping = {term.sequence: term for term in rp_terms}
-        data_mapping = {term["sequence"]: term for term in terms_data}
-
-        instance.name = validated_data.get("name", instance.name)
-        instance.device = validated_data.get("device", instance.device)
-        instance.description = validated_data.get("description", instance.description)
-        instance.save()
-
-        for term_data in terms_data:
-            term, created = RoutePolicyTerm.objects.get_or_create(
-                route_policy=instance,
-                sequence=term_data["sequence"],
-                defaults=term_data,
-            )
-            if not created:
-                term.decision = term_data.get("decision", term.decision)
-                term.description = term_data.get("description", term.description)
-                term.from_bgp_community = term_data.get(
-                    "from_bgp_community", term.from_bgp_community
-                )
-                term.from_bgp_community_list = term_data.get(
-                    "from_bgp_community_list", term.from_bgp_community_list
-                )
-                term.from_prefix_list = term_data.get("from_prefix_list", term.from_prefix_list)
-                term.from_source_protocol = term_data.get(
-                    "from_source_protocol", term.from_source_protocol
-                )
-                term.from_route_type = term_data.get("from_route_type", term.from_route_type)
-                term.from_local_pref = term_data.get("from_local_pref", term.from_local_pref)
-                term.set_local_pref = term_data.get("set_local_pref", term.set_local_pref)
-                term.set_community = term_data.get("set_community", term.set_community)
-                term.set_origin = term_data.get("set_origin", term.set_origin)
-                term.set_metric = term_data.get("set_metric", term.set_metric)
-                term.set_large_community = term_data.get(
-                    "set_large_community", term.set_large_community
-                )
-                term.set_as_path_prepend_repeat = term_data.get(
-                    "set_as_path_prepend_repeat", term.set_as_path_prepend_repeat
-                )
-                term.set_as_path_prepend_asn = term_data.get(
-                    "set_as_path_prepend_asn", term.set_as_path_prepend_asn
-                )
-                term.set_next_hop = term_data.get("set_next_hop", term.set_next_hop)
-                term.save()
-
-        # removing extra terms
-        for term_sequence, term in term_mapping.items():
-            if term_sequence not in data_mapping:
-                term.delete()
-
+        self.changed = apply_changes(instance, validated_data, ROUTE_POLICY_FIELDS)
+        self.changed |= apply_terms(
+            RoutePolicyTerm,
+            diff_terms(
+                RoutePolicyTerm.objects.filter(route_policy=instance),
+                terms_data,
+                ROUTE_POLICY_TERM_FIELDS,
+            ),
+            {"route_policy": instance},
+        )
         return instance
 
     def validate(self, attrs):
@@ -168,3 +175,58 @@ class WritableRoutePolicySerializer(ModelSerializer):
             raise serializers.ValidationError({"errors": ValidationError(errors).messages})
 
         return super().validate(attrs)
+
+
+class RouteSerializer(serializers.Serializer):
+    """A route to evaluate against a route policy."""
+
+    prefix = PrefixSerializer()
+    communities = serializers.ListField(child=serializers.CharField(), required=False)
+    large_communities = serializers.ListField(child=serializers.CharField(), required=False)
+    local_pref = serializers.IntegerField(min_value=0, required=False)
+    metric = serializers.IntegerField(min_value=0, required=False)
+    origin = serializers.ChoiceField(choices=RoutePolicyTerm.ORIGIN, required=False)
+    source_protocol = serializers.ChoiceField(
+        choices=RoutePolicyTerm.SOURCE_PROTOCOL, required=False
+    )
+    route_type = serializers.ChoiceField(choices=RoutePolicyTerm.ROUTE_TYPE, required=False)
+    as_path = serializers.ListField(child=serializers.IntegerField(min_value=0), required=False)
+    next_hop = serializers.IPAddressField(required=False)
+
+
+class RoutePolicyEvaluationSerializer(serializers.Serializer):
+    """Routes to evaluate against a route policy."""
+
+    routes = RouteSerializer(many=True)
+
+
+class RoutePolicySimulationSerializer(serializers.Serializer):
+    """A file of routes to run through a route policy."""
+
+    routes = serializers.FileField()
+    format = serializers.ChoiceField(choices=["csv", "arrow"], default="csv")
+    samples = serializers.IntegerField(min_value=0, max_value=1000, default=10)
+    # a JSON route policy, as written by an update, to simulate instead of the saved one
+    policy = serializers.JSONField(required=False)
+
+
+class RoutePolicyCloneSerializer(serializers.Serializer):
+    """Devices to clone a route policy to, with the lists it matches, and its optional new name."""
+
+    devices = serializers.PrimaryKeyRelatedField(
+        queryset=Device.objects.all(), many=True, allow_empty=False
+    )
+    name = serializers.CharField(max_length=100, required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # only the devices visible to the user can be targeted
+        if "request" in self.context:
+            self.fields["devices"].child_relation.queryset = Device.objects.restrict(
+                self.context["request"].user, "view"
+            )
+
+    def validate_devices(self, devices):
+        if len(set(devices)) != len(devices):
+            raise serializers.ValidationError("devices must be unique.")
+        return devices
@@ -1,18 +1,162 @@
 """Route Policy views."""
 
-from netbox_cmdb import filtersets
+from django.core.exceptions import ObjectDoesNotExist
+from django.shortcuts import get_object_or_404
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
-from netbox_cmdb.api.route_policy.serializers import WritableRoutePolicySerializer
+from netbox_cmdb import filtersets
+from netbox_cmdb.api.route_policy.serializers import (
+    RoutePolicyCloneSerializer,
+    RoutePolicyEvaluationSerializer,
+    RoutePolicySimulationSerializer,
+    WritableRoutePolicySerializer,
+)
 from netbox_cmdb.api.viewsets import CustomNetBoxModelViewSet
-from netbox_cmdb.models.route_policy import RoutePolicy
+from netbox_cmdb.api.where_used import WhereUsedMixin
+from netbox_cmdb.models.route_policy import RoutePolicy, RoutePolicyTerm
+from netbox_cmdb.route_policy.clone import clone_route_policy
+from netbox_cmdb.route_policy.evaluator import Route, compile_terms, get_policy
+from netbox_cmdb.route_policy.simulation import read_routes, simulate
 
 
-class RoutePolicyViewSet(CustomNetBoxModelViewSet):
+class RoutePolicyViewSet(WhereUsedMixin, CustomNetBoxModelViewSet):
     queryset = RoutePolicy.objects.all()
     serializer_class = WritableRoutePolicySerializer
+    plan_prefetch_fields = ["route_policy_term"]
+    etag_related_fields = ["route_policy_term"]
     filterset_fields = [
         "id",
         "name",
         "device__id",
         "device__name",
     ] + filtersets.device_location_filterset
+
+    # the clones of a route policy are created along with the lists it matches
+    clone_permissions = [
+        "netbox_cmdb.add_routepolicy",
+        "netbox_cmdb.add_prefixlist",
+        "netbox_cmdb.add_bgpcommunitylist",
+    ]
+
+    @swagger_auto_schema(request_body=RoutePolicyCloneSerializer)
+    @action(detail=True, methods=["post"], url_path="clone")
+    def clone(self, request, pk=None):
+        """Clone a route policy, and the prefix and community lists it matches, to devices.
+
+        All the objects are created in a single transaction, with a bulk insert per model. The
+        target devices must be visible to the user, and the clones allowed by its permissions.
+        """
+        if not request.user.has_perms(self.clone_permissions):
+            raise PermissionDenied()
+
+        route_policy = self.get_object()
+        serializer = RoutePolicyCloneSerializer(data=request.data, context={"request": request})
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        try:
+            clones = clone_route_policy(
+                route_policy, data["devices"], data.get("name"), user=request.user
+            )
+        except ValueError as error:
+            raise ValidationError({"devices": str(error)})
+        except ObjectDoesNotExist:
+            raise PermissionDenied()
+        return Response(
+            [
+                {"id": clone.pk, "device": {"id": clone.device_id, "name": clone.device.name}}
+                for clone in clones
+            ],
+            status=status.HTTP_201_CREATED,
+        )
+
+    def _get_viewable_object(self, request, pk):
+        # evaluating routes reads the route policy, whatever the method
+        return get_object_or_404(RoutePolicy.objects.restrict(request.user, "view"), pk=pk)
+
+    @swagger_auto_schema(request_body=RoutePolicyEvaluationSerializer)
+    @action(
+        detail=True,
+        methods=["post"],
+        url_path="evaluate",
+        permission_classes=[IsAuthenticated],
+    )
+    def evaluate(self, request, pk=None):
+        """Evaluate routes: the matching term of each route, its decision and the changed route.
+
+        Routes matched by no term are denied. The policy is compiled once and cached until it, or
+        anything on its device, changes.
+        """
+        route_policy = self._get_viewable_object(request, pk)
+        serializer = RoutePolicyEvaluationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        policy = get_policy(route_policy.pk)
+        results = []
+        for route_data in serializer.validated_data["routes"]:
+            route = Route(
+                **{
+                    field: tuple(value) if isinstance(value, list) else value
+                    for field, value in route_data.items()
+                }
+            )
+            decision, sequence, result = policy.evaluate(route)
+            results.append(
+                {
+                    "prefix": route.prefix,
+                    "decision": decision,
+                    "sequence": sequence,
+                    "route": result._asdict(),
+                }
+            )
+        return Response(results)
+
+    def _compile_unsaved(self, request, route_policy, data):
+        serializer = WritableRoutePolicySerializer(
+            route_policy, data=data, context={"request": request}
+        )
+        if not serializer.is_valid():
+            raise ValidationError({"policy": serializer.errors})
+
+        return compile_terms(
+            RoutePolicyTerm(**term_data)
+            for term_data in serializer.validated_data["route_policy_term"]
+        )
+
+    @swagger_auto_schema(request_body=RoutePolicySimulationSerializer)
+    @action(
+        detail=True,
+        methods=["post"],
+        url_path="simulate",
+        permission_classes=[IsAuthenticated],
+        parser_classes=[MultiPartParser],
+    )
+    def simulate(self, request, pk=None):
+        """Run a table of routes, uploaded as a CSV or Arrow file, through a route policy.
+
+        With a policy, in the format of an update of the route policy, its terms are simulated
+        instead of the saved ones, without saving anything. Returns the accepted, rejected and
+        modified routes, the hits per term and a sample of modified routes.
+        """
+        route_policy = self._get_viewable_object(request, pk)
+        serializer = RoutePolicySimulationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        if "policy" in data:
+            policy = self._compile_unsaved(request, route_policy, data["policy"])
+        else:
+            policy = get_policy(route_policy.pk)
+
+        try:
+            columns = read_routes(data["routes"], data["format"])
+            report = simulate(policy, columns, data["samples"])
+        except (ImportError, ValueError) as error:
+            raise ValidationError({"routes": str(error)})
+        return Response(report)
@@ -7,9 +7,23 @@ from netbox_cmdb.api.bgp.views import (
     BGPGlobalViewSet,
     BGPPeerGroupViewSet,
     BGPSessionsViewSet,
+    DeviceBGPSessionEffectiveView,
+)
+from netbox_cmdb.api.bgp_community_list.views import (
+    BGPCommunityListMatchView,
+    BGPCommunityListViewSet,
+)
+from netbox_cmdb.api.device_generation.views import (
+    DeviceChangesStreamView,
+    DeviceGenerationsView,
+)
+from netbox_cmdb.api.job.views import JobViewSet
+from netbox_cmdb.api.outbox.views import OutboxViewSet
+from netbox_cmdb.api.prefix_list.views import (
+    PrefixListMatchView,
+    PrefixListSetOperationView,
+    PrefixListViewSet,
 )
-from netbox_cmdb.api.bgp_community_list.views import BGPCommunityListViewSet
-from netbox_cmdb.api.prefix_list.views import PrefixListViewSet
 from netbox_cmdb.api.route_policy.views import RoutePolicyViewSet
 
 router = NetBoxRouter()
@@ -18,15 +32,47 @@ router.register("asns", ASNViewSet)
 router.register("bgp-global", BGPGlobalViewSet)
 router.register("bgp-sessions", BGPSessionsViewSet)
 router.register("bgp-community-lists", BGPCommunityListViewSet)
+router.register("jobs", JobViewSet, basename="job")
+router.register("outbox", OutboxViewSet)
 router.register("peer-groups", BGPPeerGroupViewSet)
 router.register("prefix-lists", PrefixListViewSet)
 router.register("route-policies", RoutePolicyViewSet)
 
 urlpatterns = [
+    path(
+        "device-bgp-sessions/effective/",
+        DeviceBGPSessionEffectiveView.as_view(),
+        name="device-bgp-sessions-effective",
+    ),
+    path(
+        "bgp-community-lists/match/",
+        BGPCommunityListMatchView.as_view(),
+        name="bgp-community-lists-match",
+    ),
+    path(
+        "prefix-lists/match/",
+        PrefixListMatchView.as_view(),
+        name="prefix-lists-match",
+    ),
+    path(
+        "prefix-lists/set-operation/",
+        PrefixListSetOperationView.as_view(),
+        name="prefix-lists-set-operation",
+    ),
     path(
         "asns/available-asn/",
         AvailableASNsView.as_view(),
         name="asns-available-asn",
     ),
+    path(
+        "device-generations/",
+        DeviceGenerationsView.as_view(),
+        name="device-generations",
+    ),
+    path(
+        "device-generations/stream/",
+        DeviceChangesStreamView.as_view(),
+        name="device-generations-stream",
+    ),
 ]
 urlpatterns += router.urls
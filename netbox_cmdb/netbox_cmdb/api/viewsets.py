@@ -1,14 +1,53 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db import IntegrityError, transaction
+from netbox.api.serializers import BulkOperationSerializer
 from netbox.api.viewsets import NetBoxModelViewSet
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.serializers import ListSerializer
 
+from netbox_cmdb.api.conditional import (
+    check_if_match,
+    is_not_modified,
+    list_etag,
+    object_etag,
+    touch,
+)
+from netbox_cmdb.api.idempotency import IdempotencyMixin
+from netbox_cmdb.api.job.serializers import BulkWriteJobSerializer
 from netbox_cmdb.api.pagination import PAGINATORS
+from netbox_cmdb.api.plan import Plan, changed_fields
+from netbox_cmdb.constants import DEVICE_MISMATCH
+from netbox_cmdb.jobs import enqueue_bulk_write
+from netbox_cmdb.protection import find_blockers
 
 
-class CustomNetBoxModelViewSet(NetBoxModelViewSet):
+def is_truthy(value):
+    return str(value).lower() in ("1", "true", "yes", "on")
+
+
+def device_mismatch(exc):
+    """Return the message of an IntegrityError raised by the device consistency triggers."""
+    diag = getattr(exc.__cause__, "diag", None)
+    if diag is not None and diag.constraint_name == DEVICE_MISMATCH:
+        return diag.message_primary
+    return None
+
+
+class CustomNetBoxModelViewSet(IdempotencyMixin, NetBoxModelViewSet):
     # we need to specify the ordering here as well since we can't fallback on the
     # CursorPagination object ordering value, until the following PR is merged:
     # https://github.com/encode/django-rest-framework/pull/8954
     ordering = "-created"
 
+    # related objects loaded in bulk to compute the plan of a bulk dry run
+    plan_prefetch_fields = []
+
+    # related objects whose changes are also reflected in the ETag of list and detail responses
+    etag_related_fields = []
+
     # Code taken from https://github.com/netbox-community/netbox/pull/10764
     @property
     def paginator(self):
@@ -23,3 +62,199 @@ class CustomNetBoxModelViewSet(NetBoxModelViewSet):
             else:
                 self._paginator = self.pagination_class()
         return self._paginator
+
+    @property
+    def dry_run(self):
+        """With ?dry_run=1, write requests return the plan of their changes instead of writing."""
+        return is_truthy(self.request.query_params.get("dry_run", False))
+
+    @property
+    def background(self):
+        """With ?background=1, creations and bulk updates are enqueued as a background job."""
+        return is_truthy(self.request.query_params.get("background", False))
+
+    @property
+    def if_match(self):
+        """The If-Match header, which only applies to the detail endpoints."""
+        return self.request.headers.get("If-Match") if self.detail else None
+
+    def handle_exception(self, exc):
+        # writes bypassing the validation of the serializers are still checked by the database
+        if isinstance(exc, IntegrityError) and device_mismatch(exc):
+            exc = ValidationError({"errors": [device_mismatch(exc)]})
+        return super().handle_exception(exc)
+
+    def enqueue_bulk_write(self, request, items, partial=False):
+        job_result = enqueue_bulk_write(
+            self.get_serializer_class(), self.queryset.model, request, items, partial
+        )
+        serializer = BulkWriteJobSerializer(job_result, context={"request": request})
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    def get_plan(self, serializer):
+        """Return the plan of a validated serializer, either for a single object or a list."""
+        plan = Plan()
+        if isinstance(serializer, ListSerializer):
+            for validated_data in serializer.validated_data:
+                plan.extend(self._get_object_plan(serializer.child, None, validated_data))
+        else:
+            plan.extend(
+                self._get_object_plan(serializer, serializer.instance, serializer.validated_data)
+            )
+        return plan
+
+    def _get_object_plan(self, serializer, instance, validated_data):
+        if hasattr(serializer, "get_plan"):
+            return serializer.get_plan(instance, validated_data)
+
+        plan = Plan()
+        plan.add_object(self.queryset.model, instance, validated_data)
+        return plan
+
+    def get_delete_plan(self, objects):
+        plan = Plan()
+        plan.add_deleted_objects(objects)
+        return plan
+
+    def create(self, request, *args, **kwargs):
+        if self.background and not self.dry_run:
+            items = request.data if isinstance(request.data, list) else [request.data]
+            return self.enqueue_bulk_write(request, items)
+        if not self.dry_run:
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(self.get_plan(serializer).as_dict())
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+
+        # answered before any serialization, from a single aggregate query
+        etag = list_etag(request, queryset, self.etag_related_fields)
+        if is_not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+        else:
+            serializer = self.get_serializer(queryset, many=True)
+            response = Response(serializer.data)
+        response["ETag"] = etag
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = object_etag(instance, self.etag_related_fields)
+        if is_not_modified(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data, headers={"ETag": etag})
+
+    def update(self, request, *args, **kwargs):
+        if not self.dry_run:
+            response = super().update(request, *args, **kwargs)
+            response.data["unchanged"] = self.unchanged
+            response["ETag"] = self.etag
+            return response
+
+        partial = kwargs.pop("partial", False)
+        serializer = self.get_serializer(self.get_object(), data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        return Response(self.get_plan(serializer).as_dict())
+
+    @staticmethod
+    def _has_changes(serializer):
+        try:
+            return bool(changed_fields(serializer.instance, serializer.validated_data))
+        except FieldDoesNotExist:
+            return True
+
+    def _perform_update(self, serializer):
+        """Skip the write, its signals and its changelog when the update changes nothing."""
+        if not hasattr(serializer, "get_plan"):
+            # serializers providing a plan detect unchanged objects by themselves
+            serializer.changed = self._has_changes(serializer)
+            if not serializer.changed:
+                return
+
+        super().perform_update(serializer)
+
+    def perform_update(self, serializer):
+        instance = serializer.instance
+        last_updated = instance.last_updated
+        with transaction.atomic():
+            check_if_match(instance, self.if_match, self.etag_related_fields)
+            self._perform_update(serializer)
+
+            # the version of an object also covers its terms, which are saved separately
+            if serializer.changed and instance.last_updated == last_updated:
+                touch(instance)
+
+        self.unchanged = not serializer.changed
+        self.etag = object_etag(instance, self.etag_related_fields)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            check_if_match(instance, self.if_match, self.etag_related_fields)
+            super().perform_destroy(instance)
+
+    def destroy(self, request, *args, **kwargs):
+        if not self.dry_run:
+            return super().destroy(request, *args, **kwargs)
+
+        return Response(self.get_delete_plan([self.get_object()]).as_dict())
+
+    def bulk_update(self, request, *args, **kwargs):
+        if not self.background or self.dry_run:
+            return super().bulk_update(request, *args, **kwargs)
+
+        serializer = BulkOperationSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        return self.enqueue_bulk_write(request, request.data, partial=kwargs.get("partial", False))
+
+    def perform_bulk_update(self, objects, update_data, partial):
+        if not self.dry_run:
+            return super().perform_bulk_update(objects, update_data, partial)
+
+        plan = Plan()
+        for obj in objects.prefetch_related(*self.plan_prefetch_fields):
+            serializer = self.get_serializer(obj, data=update_data.get(obj.id), partial=partial)
+            serializer.is_valid(raise_exception=True)
+            plan.extend(self.get_plan(serializer))
+        return plan.as_dict()
+
+    def bulk_destroy(self, request, *args, **kwargs):
+        if not self.dry_run:
+            return super().bulk_destroy(request, *args, **kwargs)
+
+        serializer = BulkOperationSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        objects = self.get_bulk_destroy_queryset().filter(pk__in=[o["id"] for o in serializer.data])
+        return Response(self.get_delete_plan(objects).as_dict())
+
+    @action(detail=False, methods=["get"], url_path="delete-check")
+    def delete_check(self, request):
+        """Tell which of the objects matching the filters can be deleted, and what blocks the others.
+
+        Objects are blocked by the objects referencing them through a protected foreign key, which
+        are counted with a single query per relation, whatever the number of objects.
+        """
+        pks = list(
+            self.filter_queryset(self.get_queryset()).order_by("pk").values_list("pk", flat=True)
+        )
+        blockers = find_blockers(self.queryset.model, pks)
+        blocked = self.queryset.model.objects.filter(pk__in=blockers).order_by("pk")
+        return Response(
+            {
+                "count": len(pks),
+                "deletable": [pk for pk in pks if pk not in blockers],
+                "blocked": [
+                    {"id": obj.pk, "display": str(obj), "blockers": blockers[obj.pk]}
+                    for obj in blocked
+                ],
+            }
+        )
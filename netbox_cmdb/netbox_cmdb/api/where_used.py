@@ -0,0 +1,37 @@
+"""Where-used action of the viewsets of objects referenced by BGP configurations."""
+
+from netbox.api.pagination import OptionalLimitOffsetPagination
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.response import Response
+
+from netbox_cmdb.where_used import impacted_by
+
+
+class WhereUsedMixin:
+    """Adds a where-used action to the viewsets of objects referenced by BGP configurations."""
+
+    @action(detail=True, methods=["get"], url_path="where-used")
+    def where_used(self, request, pk=None):
+        """Count the objects using this object, directly or not, and list the impacted BGP sessions.
+
+        The ids of the BGP sessions are paginated with limit and offset.
+        """
+        if not request.user.has_perm("netbox_cmdb.view_bgpsession"):
+            raise PermissionDenied()
+
+        impacted = impacted_by(self.get_object())
+        paginator = OptionalLimitOffsetPagination()
+        bgp_session_ids = paginator.paginate_queryset(
+            impacted.pop("bgp_sessions").order_by("pk").values_list("pk", flat=True),
+            request,
+            view=self,
+        )
+        counts = {kind: queryset.count() for kind, queryset in impacted.items()}
+        counts["bgp_sessions"] = paginator.count
+        return Response(
+            {
+                "counts": counts,
+                "bgp_sessions": paginator.get_paginated_response(bgp_session_ids).data,
+            }
+        )
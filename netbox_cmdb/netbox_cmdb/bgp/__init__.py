@@ -0,0 +1 @@
+"""BGP engines: effective configuration and consistency audit of the sessions."""
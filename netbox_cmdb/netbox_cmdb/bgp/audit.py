@@ -0,0 +1,126 @@
+"""Consistency audit of BGP sessions, across the fleet.
+
+The two sides of a BGP session are device BGP sessions configured separately, which can drift
+apart. A side is reported when:
+- afi_safi_mismatch: one of its AFI/SAFIs is not configured on the other side,
+- remote_asn_mismatch: the remote ASN of its peer group is not the effective local ASN of the
+  other side,
+- local_address_not_on_device: its local address is not assigned to an interface of its device.
+
+Each check is a single query over all the audited BGP sessions, run once per side, so that the
+audit of the fleet takes a handful of queries whatever its size.
+"""
+
+from typing import NamedTuple
+
+from dcim.models import Interface
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Exists, F, OuterRef, Q, Subquery
+
+from netbox_cmdb.bgp.effective import effective_value
+from netbox_cmdb.models.bgp import AfiSafi, BGPSession
+
+AFI_SAFI_MISMATCH = "afi_safi_mismatch"
+REMOTE_ASN_MISMATCH = "remote_asn_mismatch"
+LOCAL_ADDRESS_NOT_ON_DEVICE = "local_address_not_on_device"
+
+# each side of a BGP session, with the other side
+SIDES = (("peer_a", "peer_b"), ("peer_b", "peer_a"))
+
+
+class Finding(NamedTuple):
+    bgp_session: int
+    # the side of the BGP session at fault, and its device
+    peer: str
+    device: str
+    kind: str
+    detail: str
+
+
+def _afi_safi_mismatches(sessions, side, other):
+    rows = AfiSafi.objects.filter(
+        Q(**{f"device_bgp_session__{side}__in": sessions.values("pk")}),
+        ~Exists(
+            AfiSafi.objects.filter(
+                device_bgp_session=OuterRef(f"device_bgp_session__{side}__{other}"),
+                afi_safi_name=OuterRef("afi_safi_name"),
+            )
+        ),
+    ).values_list(
+        f"device_bgp_session__{side}__id", "device_bgp_session__device__name", "afi_safi_name"
+    )
+    for pk, device, afi_safi_name in rows:
+        yield Finding(
+            pk, side, device, AFI_SAFI_MISMATCH, f"{afi_safi_name} is not configured on {other}"
+        )
+
+
+def _remote_asn_mismatches(sessions, side, other):
+    rows = (
+        sessions.annotate(
+            remote_asn=F(f"{side}__peer_group__remote_asn__number"),
+            other_local_asn=effective_value("local_asn", f"{other}__"),
+        )
+        .filter(remote_asn__isnull=False)
+        .filter(Q(other_local_asn__isnull=True) | ~Q(remote_asn=F("other_local_asn")))
+        .values_list("pk", f"{side}__device__name", "remote_asn", "other_local_asn")
+    )
+    for pk, device, remote_asn, other_local_asn in rows:
+        yield Finding(
+            pk,
+            side,
+            device,
+            REMOTE_ASN_MISMATCH,
+            f"the remote ASN of its peer group is {remote_asn}, "
+            f"the local ASN of {other} is {other_local_asn}",
+        )
+
+
+def _local_address_mismatches(sessions, side, other):
+    interface_type = ContentType.objects.get_for_model(Interface)
+    rows = (
+        sessions.annotate(
+            address_device=Subquery(
+                Interface.objects.filter(
+                    pk=OuterRef(f"{side}__local_address__assigned_object_id")
+                ).values("device_id")
+            )
+        )
+        .filter(
+            ~Q(**{f"{side}__local_address__assigned_object_type": interface_type})
+            | Q(address_device__isnull=True)
+            | ~Q(address_device=F(f"{side}__device_id"))
+        )
+        .values_list("pk", f"{side}__device__name", f"{side}__local_address__address")
+    )
+    for pk, device, address in rows:
+        yield Finding(
+            pk,
+            side,
+            device,
+            LOCAL_ADDRESS_NOT_ON_DEVICE,
+            f"{address} is not assigned to an interface of {device}",
+        )
+
+
+CHECKS = {
+    AFI_SAFI_MISMATCH: _afi_safi_mismatches,
+    REMOTE_ASN_MISMATCH: _remote_asn_mismatches,
+    LOCAL_ADDRESS_NOT_ON_DEVICE: _local_address_mismatches,
+}
+
+
+def audit_sessions(sessions=None, checks=None):
+    """Return the findings of the given checks, all by default, on the given BGP sessions.
+
+    Findings are sorted by BGP session, side and kind.
+    """
+    if sessions is None:
+        sessions = BGPSession.objects.all()
+    sessions = sessions.order_by()
+
+    findings = []
+    for kind in checks or CHECKS:
+        for side, other in SIDES:
+            findings.extend(CHECKS[kind](sessions, side, other))
+    return sorted(findings, key=lambda finding: (finding.bgp_session, finding.peer, finding.kind))
@@ -0,0 +1,102 @@
+"""Effective configuration of device BGP sessions, resolved in SQL.
+
+A device BGP session inherits the settings it leaves unset from its peer group, then from the BGP
+global configuration of its device. Each inherited value is a Coalesce of the levels, most
+specific first, and its level a Case on the same levels, so that any number of sessions is
+resolved in a single query. An empty description counts as unset.
+"""
+
+from django.db.models import Case, F, Q, Value, When
+from django.db.models.functions import Coalesce, NullIf
+
+from netbox_cmdb.models.bgp import DeviceBGPSession
+
+SESSION = "session"
+PEER_GROUP = "peer_group"
+GLOBAL = "global"
+
+# the path from a device BGP session to each level
+LEVELS = {SESSION: "", PEER_GROUP: "peer_group__", GLOBAL: "device__bgpglobaldevice__"}
+
+# the value of each inherited field at each level, and the levels defining it, most specific first
+INHERITED_FIELDS = {
+    "local_asn": ("local_asn__number", (SESSION, PEER_GROUP, GLOBAL)),
+    "remote_asn": ("remote_asn__number", (PEER_GROUP,)),
+    "description": ("description", (SESSION, PEER_GROUP)),
+    "route_policy_in": ("route_policy_in__name", (SESSION, PEER_GROUP)),
+    "route_policy_out": ("route_policy_out__name", (SESSION, PEER_GROUP)),
+}
+
+# fields whose empty value means unset
+BLANK_FIELDS = ("description",)
+
+# fields only defined by the session
+SESSION_FIELDS = ("enforce_first_as", "enabled", "maximum_prefixes")
+
+
+def _value(path, blank):
+    return NullIf(F(path), Value("")) if blank else F(path)
+
+
+def _is_set(path, blank):
+    condition = Q(**{f"{path}__isnull": False})
+    return condition & ~Q(**{path: ""}) if blank else condition
+
+
+def _paths(field, prefix):
+    attribute, levels = INHERITED_FIELDS[field]
+    return [(level, prefix + LEVELS[level] + attribute) for level in levels]
+
+
+def effective_value(field, prefix=""):
+    """Return the expression of the effective value of an inherited field.
+
+    `prefix` is the path to the device BGP session, when the query is on another model.
+    """
+    blank = field in BLANK_FIELDS
+    values = [_value(path, blank) for _, path in _paths(field, prefix)]
+    return Coalesce(*values) if len(values) > 1 else values[0]
+
+
+def effective_level(field, prefix=""):
+    """Return the expression of the level defining an inherited field, None when none does."""
+    blank = field in BLANK_FIELDS
+    return Case(
+        *(When(_is_set(path, blank), then=Value(level)) for level, path in _paths(field, prefix))
+    )
+
+
+def with_effective_config(queryset=None):
+    """Annotate device BGP sessions with the effective value and level of the inherited fields.
+
+    Annotations are named effective_<field> and effective_<field>_level.
+    """
+    if queryset is None:
+        queryset = DeviceBGPSession.objects.all()
+
+    annotations = {}
+    for field in INHERITED_FIELDS:
+        annotations[f"effective_{field}"] = effective_value(field)
+        annotations[f"effective_{field}_level"] = effective_level(field)
+    return queryset.annotate(**annotations)
+
+
+def effective_rows(queryset=None):
+    """Return the values of the effective configuration of device BGP sessions, as a queryset."""
+    fields = ["id", "device_id", "device__name", *SESSION_FIELDS]
+    for field in INHERITED_FIELDS:
+        fields += [f"effective_{field}", f"effective_{field}_level"]
+    return with_effective_config(queryset).values(*fields)
+
+
+def to_config(row):
+    """Return the effective configuration of a row of effective_rows, each value with its level."""
+    config = {"id": row["id"], "device": {"id": row["device_id"], "name": row["device__name"]}}
+    for field in SESSION_FIELDS:
+        config[field] = {"value": row[field], "level": SESSION}
+    for field in INHERITED_FIELDS:
+        config[field] = {
+            "value": row[f"effective_{field}"],
+            "level": row[f"effective_{field}_level"],
+        }
+    return config
@@ -0,0 +1 @@
+"""BGP community list engines: compiled community matchers."""
@@ -0,0 +1,167 @@
+"""BGP community expressions, compiled into matchers.
+
+An expression is one of:
+- a well-known community name, like no-export,
+- a standard community asn:value, of 16 bits numbers,
+- a large community global:local1:local2, of 32 bits numbers,
+- an extended community type:administrator:value, like target:65000:100 or origin:192.0.2.1:10,
+- any of the above with * in place of a number, which matches any number,
+- otherwise a regular expression, matched against the whole community.
+
+Communities are compared in a canonical form: lower case, numbers without leading zeros and
+well-known communities as numbers. The matchers of community lists are cached per process until
+their device changes. Those of shared community lists, without device, are compiled on each use.
+"""
+
+import re
+from functools import lru_cache
+
+from netaddr import AddrFormatError, IPAddress
+
+from netbox_cmdb.compiled import CompiledCache
+from netbox_cmdb.models.bgp_community_list import BGPCommunityList, BGPCommunityListTerm
+from netbox_cmdb.shared import term_sources
+
+WELL_KNOWN = {
+    "graceful-shutdown": "65535:0",
+    "accept-own": "65535:1",
+    "llgr-stale": "65535:6",
+    "no-llgr": "65535:7",
+    "blackhole": "65535:666",
+    "no-export": "65535:65281",
+    "no-advertise": "65535:65282",
+    "no-export-subconfed": "65535:65283",
+    "local-as": "65535:65283",
+    "no-peer": "65535:65284",
+}
+
+# extended community types, by alias
+EXTENDED_TYPES = {"target": "target", "rt": "target", "origin": "origin", "soo": "origin"}
+
+NUMBERS = re.compile(r"[0-9*]+(?::[0-9*]+){1,2}")
+EXTENDED = re.compile(r"([a-z]+):([0-9.*]+):([0-9*]+)")
+
+EXACT = "exact"
+PATTERN = "pattern"
+
+
+def _number(part, bits):
+    if part == "*":
+        return None
+    if not part.isdigit():
+        raise ValueError(f"{part}: a wildcard replaces a whole number")
+    number = int(part)
+    if number >= 1 << bits:
+        raise ValueError(f"{part} does not fit in {bits} bits")
+    return number
+
+
+def _administrator(part):
+    """Return the administrator of an extended community, and the size of its value."""
+    if part == "*":
+        return None, 32
+    if "." in part:
+        try:
+            return str(IPAddress(part, version=4)), 16
+        except (AddrFormatError, ValueError):
+            raise ValueError(f"{part} is not an IPv4 address")
+    number = _number(part, 32)
+    return number, 32 if number < 1 << 16 else 16
+
+
+def _to_pattern(parts, any_number="[0-9]+"):
+    return ":".join(any_number if part is None else re.escape(str(part)) for part in parts)
+
+
+def parse_expression(expression):
+    """Return the (EXACT, community) or (PATTERN, regular expression) of an expression.
+
+    Raises ValueError for an invalid expression.
+    """
+    value = expression.strip().lower()
+    if not value:
+        raise ValueError("the expression is empty")
+    if value in WELL_KNOWN:
+        return EXACT, WELL_KNOWN[value]
+
+    if NUMBERS.fullmatch(value):
+        parts = value.split(":")
+        bits = 16 if len(parts) == 2 else 32
+        numbers = [_number(part, bits) for part in parts]
+    elif (match := EXTENDED.fullmatch(value)) and match.group(1) in EXTENDED_TYPES:
+        administrator, bits = _administrator(match.group(2))
+        numbers = [EXTENDED_TYPES[match.group(1)], administrator, _number(match.group(3), bits)]
+        if administrator is None:
+            return PATTERN, ":".join([numbers[0], "[0-9.]+", _to_pattern(numbers[2:])])
+    else:
+        try:
+            re.compile(expression.strip())
+        except re.error as error:
+            raise ValueError(f"invalid regular expression: {error}")
+        return PATTERN, expression.strip()
+
+    if None in numbers:
+        return PATTERN, _to_pattern(numbers)
+    return EXACT, ":".join(str(number) for number in numbers)
+
+
+@lru_cache(maxsize=65536)
+def canonical_community(community):
+    """Return the canonical form of a community, or the community as is when not parsed."""
+    try:
+        kind, value = parse_expression(community)
+    except ValueError:
+        return community.strip().lower()
+    return value if kind == EXACT else community.strip().lower()
+
+
+class CommunityMatcher:
+    """Matches communities against compiled community expressions."""
+
+    def __init__(self, expressions):
+        self.exact = set()
+        self.patterns = []
+        for expression in expressions:
+            try:
+                kind, value = parse_expression(expression)
+            except ValueError:
+                # stored before expressions were validated, matched as is
+                kind, value = EXACT, expression.strip().lower()
+            if kind == EXACT:
+                self.exact.add(value)
+            else:
+                self.patterns.append(re.compile(value))
+
+    def match(self, community):
+        community = canonical_community(community)
+        return community in self.exact or any(
+            pattern.fullmatch(community) for pattern in self.patterns
+        )
+
+    def match_any(self, communities):
+        return any(self.match(community) for community in communities)
+
+
+def compile_community_lists(bgp_community_list_ids):
+    """Return the matchers of the given community lists, by id.
+
+    Community lists without terms of their own use the terms of their shared definition.
+    """
+    sources = term_sources(BGPCommunityList, bgp_community_list_ids)
+    expressions = {source: [] for source in sources.values()}
+    for bgp_community_list_id, community in BGPCommunityListTerm.objects.filter(
+        bgp_community_list_id__in=expressions
+    ).values_list("bgp_community_list_id", "community"):
+        expressions[bgp_community_list_id].append(community)
+    matchers = {
+        pk: CommunityMatcher(list_expressions) for pk, list_expressions in expressions.items()
+    }
+    return {pk: matchers[source] for pk, source in sources.items()}
+
+
+_cache = CompiledCache(BGPCommunityList, compile_community_lists, "community_list_cache_size")
+
+
+def get_community_matchers(bgp_community_list_ids):
+    """Return the matchers of the given community lists, from the cache when current."""
+    return _cache.get_many(bgp_community_list_ids)
@@ -0,0 +1,44 @@
+"""Change logging of objects written in bulk.
+
+bulk_create and raw deletes send no signal, so NetBox records no change for the objects they
+write. Their changes are recorded here instead, as NetBox would, with a single insert for all of
+them.
+"""
+
+from extras.choices import ObjectChangeActionChoices
+from extras.models import ObjectChange
+from netbox.context import current_request
+
+BATCH_SIZE = 1000
+
+
+def _log(instances, action):
+    request = current_request.get()
+    if request is None:
+        return
+
+    changes = []
+    for instance in instances:
+        change = instance.to_objectchange(action)
+        # set by ObjectChange.save(), which bulk_create skips
+        change.user = request.user
+        change.user_name = request.user.username
+        change.request_id = request.id
+        changes.append(change)
+    ObjectChange.objects.bulk_create(changes, batch_size=BATCH_SIZE)
+
+
+def log_creations(instances):
+    """Record the creation of bulk created `instances` in the changelog of the current request.
+
+    Like the change logging of NetBox, nothing is recorded outside of a request or a job.
+    """
+    _log(instances, ObjectChangeActionChoices.ACTION_CREATE)
+
+
+def log_deletions(instances):
+    """Record the deletion of `instances`, deleted in bulk without signals, like log_creations."""
+    for instance in instances:
+        if hasattr(instance, "snapshot"):
+            instance.snapshot()
+    _log(instances, ObjectChangeActionChoices.ACTION_DELETE)
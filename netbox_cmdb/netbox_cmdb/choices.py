@@ -42,3 +42,17 @@ class DecisionChoice(ChoiceSet):
         (PERMIT, "Permit"),
         (DENY, "Deny"),
     )
+
+
+class OutboxActionChoices(ChoiceSet):
+    """A ChoiceSet to define the change recorded by an outbox event."""
+
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+
+    CHOICES = (
+        (CREATED, "Created", "green"),
+        (UPDATED, "Updated", "blue"),
+        (DELETED, "Deleted", "red"),
+    )
@@ -0,0 +1,64 @@
+"""Per-process caches of objects compiled from the CMDB.
+
+A compiled object is kept with the generation of its device when it was compiled. Any change of
+a CMDB object of the device bumps the generation, so that a stale compiled object is compiled
+again on its next use. Objects without device, like shared lists, have no generation to check
+against and are not cached.
+"""
+
+import threading
+from collections import OrderedDict
+
+from extras.plugins import get_plugin_config
+
+
+class CompiledCache:
+    """A least recently used cache of objects of a device model, compiled by `compile`.
+
+    `compile` takes a list of primary keys and returns the compiled objects by primary key.
+    """
+
+    def __init__(self, model, compile, size_setting):
+        self.model = model
+        self.compile = compile
+        self.size_setting = size_setting
+        self.objects = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_many(self, pks):
+        """Return the current compiled objects of the given primary keys, which exist."""
+        versions = {
+            pk: (device_id, generation or 0)
+            for pk, device_id, generation in self.model.objects.filter(pk__in=pks).values_list(
+                "pk", "device_id", "device__cmdb_generation__generation"
+            )
+        }
+
+        compiled = {}
+        with self.lock:
+            for pk, version in versions.items():
+                if pk in self.objects and self.objects[pk][0] == version:
+                    self.objects.move_to_end(pk)
+                    compiled[pk] = self.objects[pk][1]
+
+        missing = [pk for pk in versions if pk not in compiled]
+        if not missing:
+            return compiled
+
+        compiled.update(self.compile(missing))
+        with self.lock:
+            for pk in missing:
+                if versions[pk][0] is None:
+                    continue
+                self.objects[pk] = (versions[pk], compiled[pk])
+                self.objects.move_to_end(pk)
+            while len(self.objects) > get_plugin_config("netbox_cmdb", self.size_setting):
+                self.objects.popitem(last=False)
+        return compiled
+
+    def get(self, pk):
+        """Return the current compiled object of a primary key, DoesNotExist if none."""
+        compiled = self.get_many([pk])
+        if pk not in compiled:
+            raise self.model.DoesNotExist()
+        return compiled[pk]
@@ -1,2 +1,5 @@
 BGP_MIN_ASN = 1
 BGP_MAX_ASN = 4294967294
+
+# the name of the database constraint keeping related BGP objects on the same device
+DEVICE_MISMATCH = "netbox_cmdb_device_mismatch"
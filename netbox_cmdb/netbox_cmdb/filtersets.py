@@ -1,10 +1,12 @@
 import django_filters
 from django.db.models import Q
+from netaddr import AddrFormatError, IPNetwork
 from tenancy.filtersets import TenancyFilterSet
 from utilities.filters import MultiValueCharFilter
 
 from netbox.filtersets import ChangeLoggedModelFilterSet
 from netbox_cmdb.models.bgp import ASN, BGPPeerGroup, BGPSession
+from netbox_cmdb.models.prefix_list import PrefixList, PrefixListTerm
 
 device_location_filterset = [
     "device__location__name",
@@ -179,3 +181,58 @@ class BGPPeerGroupFilterSet(ChangeLoggedModelFilterSet):
         return queryset.filter(
             Q(device__name__icontains=value) | Q(name__icontains=value)
         ).distinct()
+
+
+class PrefixListFilterSet(ChangeLoggedModelFilterSet):
+    """Prefix list filterset."""
+
+    shared = django_filters.BooleanFilter(
+        field_name="device",
+        lookup_expr="isnull",
+        label="Is a shared prefix list, without device",
+    )
+
+    term_prefix__net_contained = MultiValueCharFilter(
+        method="filter_term_prefix",
+        label="Has a term inside one of these prefixes",
+    )
+
+    term_prefix__net_contains_or_equals = MultiValueCharFilter(
+        method="filter_term_prefix",
+        label="Has a term containing or equal to one of these prefixes",
+    )
+
+    term_prefix__net_overlaps = MultiValueCharFilter(
+        method="filter_term_prefix",
+        label="Has a term overlapping one of these prefixes",
+    )
+
+    class Meta:
+        model = PrefixList
+        fields = [
+            "id",
+            "name",
+            "ip_version",
+            "device__id",
+            "device__name",
+            "definition__id",
+        ] + device_location_filterset
+
+    def filter_term_prefix(self, queryset, name, value):
+        lookup = name.split("__", 1)[1]
+        query = Q()
+        for prefix in value:
+            try:
+                prefix = str(IPNetwork(prefix).cidr)
+            except (AddrFormatError, ValueError):
+                return queryset.none()
+
+            if lookup == "net_overlaps":
+                # two prefixes overlap when one contains the other
+                query |= Q(prefix__net_contains_or_equals=prefix)
+                query |= Q(prefix__net_contained_or_equal=prefix)
+            else:
+                query |= Q(**{f"prefix__{lookup}": prefix})
+
+        # a semi-join on the terms, served by their GiST index
+        return queryset.filter(pk__in=PrefixListTerm.objects.filter(query).values("prefix_list_id"))
@@ -0,0 +1,189 @@
+"""Background jobs, executed by the NetBox RQ workers."""
+
+import logging
+from datetime import timedelta
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from extras.choices import JobResultStatusChoices
+from extras.context_managers import change_logging
+from extras.models import JobResult
+from extras.plugins import get_plugin_config
+from rest_framework.exceptions import ValidationError
+from utilities.utils import copy_safe_request
+
+from netbox_cmdb.models.bgp import DeviceBGPSession
+from netbox_cmdb.orphans import collect_orphans
+
+logger = logging.getLogger("netbox.plugins.netbox_cmdb.jobs")
+
+
+class ItemPermissionDenied(Exception):
+    """Raised when a written object is not allowed by the user's object permissions."""
+
+
+def enqueue_bulk_write(serializer_class, model, request, items, partial=False):
+    """Enqueue the creation or update of `items` on the NetBox RQ queue.
+
+    Items with an "id" key update the corresponding object, other items are created.
+    """
+    return JobResult.enqueue_job(
+        run_bulk_write,
+        f"{model._meta.verbose_name} bulk write",
+        ContentType.objects.get_for_model(model),
+        request.user,
+        serializer_class=serializer_class,
+        model=model,
+        items=items,
+        request=copy_safe_request(request),
+        partial=partial,
+    )
+
+
+def _save_item(serializer_class, model, request, item, partial):
+    item = dict(item)
+    pk = item.pop("id", None)
+    if pk is None:
+        action, instance = "add", None
+    else:
+        action = "change"
+        instance = model.objects.restrict(request.user, action).get(pk=pk)
+        if hasattr(instance, "snapshot"):
+            instance.snapshot()
+
+    serializer = serializer_class(
+        instance, data=item, partial=partial, context={"request": request}
+    )
+    serializer.is_valid(raise_exception=True)
+    with transaction.atomic():
+        obj = serializer.save()
+        # enforce object-level permissions, as the API views do
+        if not model.objects.restrict(request.user, action).filter(pk=obj.pk).exists():
+            raise ItemPermissionDenied()
+
+    return action, obj.pk
+
+
+def _write_item(results, index, serializer_class, model, request, item, partial):
+    """Write a single item in its own savepoint, recording its id or its errors in `results`."""
+    try:
+        action, pk = _save_item(serializer_class, model, request, item, partial)
+    except ValidationError as error:
+        results["errors"].append({"index": index, "errors": error.detail})
+    except (DjangoValidationError, IntegrityError) as error:
+        results["errors"].append({"index": index, "errors": str(error)})
+    except (ObjectDoesNotExist, ItemPermissionDenied):
+        results["errors"].append({"index": index, "errors": "not found or permission denied"})
+    else:
+        results["created" if action == "add" else "updated"].append(pk)
+
+
+def run_bulk_write(job_result, serializer_class, model, items, request, partial=False):
+    """Write `items` in chunked transactions, recording the progress in the job result.
+
+    A failing item is rolled back alone and reported, the other items are still written.
+    """
+    chunk_size = get_plugin_config("netbox_cmdb", "background_job_chunk_size")
+    job_result.status = JobResultStatusChoices.STATUS_RUNNING
+    job_result.data = {
+        "total": len(items),
+        "processed": 0,
+        "created": [],
+        "updated": [],
+        "errors": [],
+    }
+    job_result.save()
+
+    try:
+        with change_logging(request):
+            for start in range(0, len(items), chunk_size):
+                chunk = items[start : start + chunk_size]
+                with transaction.atomic():
+                    for index, item in enumerate(chunk, start):
+                        _write_item(
+                            job_result.data, index, serializer_class, model, request, item, partial
+                        )
+
+                job_result.data["processed"] = start + len(chunk)
+                job_result.save()
+
+        job_result.set_status(
+            JobResultStatusChoices.STATUS_ERRORED
+            if job_result.data["errors"]
+            else JobResultStatusChoices.STATUS_COMPLETED
+        )
+    except Exception:
+        logger.exception(f"Background job {job_result.job_id} failed")
+        job_result.set_status(JobResultStatusChoices.STATUS_FAILED)
+        raise
+    finally:
+        job_result.save()
+
+
+COLLECT_ORPHANS_JOB = "orphans garbage collection"
+
+
+def scheduled_collect_orphans():
+    """Return the garbage collection job waiting or running, None if there is none."""
+    return (
+        JobResult.objects.filter(
+            name=COLLECT_ORPHANS_JOB,
+            status__in=[
+                JobResultStatusChoices.STATUS_PENDING,
+                JobResultStatusChoices.STATUS_SCHEDULED,
+                JobResultStatusChoices.STATUS_RUNNING,
+            ],
+        )
+        .order_by("created")
+        .first()
+    )
+
+
+def enqueue_collect_orphans(user, kinds=None, delete=False, interval=None, schedule_at=None):
+    """Enqueue the garbage collection of the orphans on the NetBox RQ queue.
+
+    With an interval in minutes, each successful run enqueues the next one.
+    """
+    return JobResult.enqueue_job(
+        run_collect_orphans,
+        COLLECT_ORPHANS_JOB,
+        ContentType.objects.get_for_model(DeviceBGPSession),
+        user,
+        schedule_at=schedule_at,
+        kinds=kinds,
+        delete=delete,
+        interval=interval,
+    )
+
+
+def run_collect_orphans(job_result, kinds=None, delete=False, interval=None):
+    """Count or delete the orphans, recording their number by kind in the job result.
+
+    A failed run doesn't enqueue the next one, so that a failing collection stops repeating.
+    """
+    job_result.status = JobResultStatusChoices.STATUS_RUNNING
+    job_result.save()
+
+    try:
+        job_result.data = collect_orphans(
+            kinds, delete, user=job_result.user, request_id=job_result.job_id
+        )
+        job_result.set_status(JobResultStatusChoices.STATUS_COMPLETED)
+    except Exception:
+        logger.exception(f"Background job {job_result.job_id} failed")
+        job_result.set_status(JobResultStatusChoices.STATUS_FAILED)
+        raise
+    finally:
+        job_result.save()
+
+    if interval:
+        enqueue_collect_orphans(
+            job_result.user,
+            kinds,
+            delete,
+            interval,
+            schedule_at=timezone.now() + timedelta(minutes=interval),
+        )
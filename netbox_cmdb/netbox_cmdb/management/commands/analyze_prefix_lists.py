@@ -0,0 +1,40 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from netbox_cmdb.models.prefix_list import PrefixList
+from netbox_cmdb.prefix_list.analyzer import build_report
+
+
+class Command(BaseCommand):
+    help = "Report the prefix list terms shadowed or overlapped by an earlier term"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--device", action="append", default=[], help="Only analyze this device, repeatable"
+        )
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    def handle(self, *args, **options):
+        prefix_lists = PrefixList.objects.all()
+        if options["device"]:
+            prefix_lists = prefix_lists.filter(device__name__in=options["device"])
+
+        report = build_report(prefix_lists)
+        if options["json"]:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+
+        for prefix_list in report:
+            device = prefix_list["device"]["name"] if prefix_list["device"] else "shared"
+            for finding in prefix_list["findings"]:
+                self.stdout.write(
+                    f"{device} {prefix_list['name']} "
+                    f"seq {finding['sequence']} {finding['prefix']} "
+                    f"ge {finding['ge']} le {finding['le']}: {finding['kind']} by "
+                    f"seq {', '.join(str(sequence) for sequence in finding['by_sequences'])} "
+                    f"(lengths {finding['min_length']}-{finding['max_length']})"
+                )
+
+        count = sum(len(prefix_list["findings"]) for prefix_list in report)
+        self.stderr.write(f"{count} findings in {len(report)} prefix lists")
@@ -0,0 +1,49 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from netbox_cmdb.bgp.audit import CHECKS, audit_sessions
+from netbox_cmdb.models.bgp import BGPSession
+
+
+class Command(BaseCommand):
+    help = "Report the BGP sessions whose two sides are inconsistent"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--device",
+            action="append",
+            default=[],
+            help="Only audit the sessions of this device, repeatable",
+        )
+        parser.add_argument(
+            "--check",
+            action="append",
+            default=[],
+            choices=list(CHECKS),
+            help="Only run this check, repeatable",
+        )
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    def handle(self, *args, **options):
+        sessions = BGPSession.objects.all()
+        if options["device"]:
+            sessions = sessions.filter(
+                Q(peer_a__device__name__in=options["device"])
+                | Q(peer_b__device__name__in=options["device"])
+            )
+
+        findings = audit_sessions(sessions, options["check"])
+        if options["json"]:
+            self.stdout.write(json.dumps([finding._asdict() for finding in findings], indent=2))
+            return
+
+        for finding in findings:
+            self.stdout.write(
+                f"session {finding.bgp_session} {finding.peer} ({finding.device}): "
+                f"{finding.kind}: {finding.detail}"
+            )
+
+        count = len({finding.bgp_session for finding in findings})
+        self.stderr.write(f"{len(findings)} findings in {count} BGP sessions")
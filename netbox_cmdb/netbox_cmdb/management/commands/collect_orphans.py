@@ -0,0 +1,72 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from netbox_cmdb.jobs import enqueue_collect_orphans, scheduled_collect_orphans
+from netbox_cmdb.orphans import ORPHANS, collect_orphans
+
+
+class Command(BaseCommand):
+    help = "Report or delete the orphan objects, that nothing uses anymore"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--kind",
+            action="append",
+            default=[],
+            choices=list(ORPHANS),
+            help="Only collect this kind of orphans, repeatable",
+        )
+        parser.add_argument("--delete", action="store_true", help="Delete the orphans")
+        parser.add_argument(
+            "--batch-size", type=int, help="Number of orphans deleted per transaction"
+        )
+        parser.add_argument(
+            "--schedule",
+            type=int,
+            metavar="MINUTES",
+            help="Enqueue a background job collecting the orphans every MINUTES instead",
+        )
+        parser.add_argument(
+            "--user", help="User recorded in the changelog of the deletions, required to delete"
+        )
+        parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+
+    def _get_user(self, username):
+        if username is None:
+            return None
+        try:
+            return get_user_model().objects.get(username=username)
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"user {username} does not exist")
+
+    def handle(self, *args, **options):
+        user = self._get_user(options["user"])
+        if options["delete"] and user is None:
+            raise CommandError("--delete requires --user, to record the deletions in the changelog")
+
+        if options["schedule"]:
+            # each scheduled job enqueues the next one, a second chain would never stop either
+            job_result = scheduled_collect_orphans()
+            if job_result is not None:
+                raise CommandError(f"job {job_result.job_id} is already {job_result.status}")
+
+            job_result = enqueue_collect_orphans(
+                user, options["kind"], options["delete"], options["schedule"]
+            )
+            self.stderr.write(f"job {job_result.job_id} enqueued")
+            return
+
+        counts = collect_orphans(
+            options["kind"], options["delete"], options["batch_size"], user=user
+        )
+        if options["json"]:
+            self.stdout.write(json.dumps(counts, indent=2))
+            return
+
+        for kind, count in counts.items():
+            self.stdout.write(f"{kind}: {count}")
+
+        verb = "deleted" if options["delete"] else "found"
+        self.stderr.write(f"{sum(counts.values())} orphans {verb}")
@@ -0,0 +1,37 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from netbox_cmdb.models.route_policy import RoutePolicy
+from netbox_cmdb.route_policy.evaluator import get_policy
+from netbox_cmdb.route_policy.simulation import read_routes, simulate
+
+
+class Command(BaseCommand):
+    help = "Run a table of routes, from a CSV or Arrow file, through a route policy"
+
+    def add_arguments(self, parser):
+        parser.add_argument("route_policy", type=int, help="ID of the route policy")
+        parser.add_argument("file", help="CSV or Arrow file of routes, one column per route field")
+        parser.add_argument(
+            "--format", choices=["csv", "arrow"], help="Format of the file, from its extension"
+        )
+        parser.add_argument(
+            "--samples", type=int, default=10, help="Number of modified routes to print"
+        )
+
+    def handle(self, *args, **options):
+        if not RoutePolicy.objects.filter(pk=options["route_policy"]).exists():
+            raise CommandError(f"route policy {options['route_policy']} does not exist")
+
+        file_format = options["format"] or (
+            "arrow" if options["file"].endswith((".arrow", ".feather")) else "csv"
+        )
+        try:
+            with open(options["file"], "rb") as file:
+                columns = read_routes(file, file_format)
+            report = simulate(get_policy(options["route_policy"]), columns, options["samples"])
+        except (ImportError, OSError, ValueError) as error:
+            raise CommandError(error)
+
+        self.stdout.write(json.dumps(report, indent=2))
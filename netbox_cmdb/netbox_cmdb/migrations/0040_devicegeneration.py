@@ -0,0 +1,23 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dcim', '0161_cabling_cleanup'),
+        ('netbox_cmdb', '0039_logicalinterface'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceGeneration',
+            fields=[
+                ('device', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='cmdb_generation', serialize=False, to='dcim.device')),
+                ('generation', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'device generation',
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_cmdb', '0041_outboxevent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='prefixlistterm',
+            index=django.contrib.postgres.indexes.GistIndex(fields=['prefix'], name='netbox_cmdb_plterm_prefix_gist', opclasses=['inet_ops']),
+        ),
+    ]
@@ -0,0 +1,234 @@
+from django.db import migrations
+
+# The objects referenced by a device BGP session, its AFI/SAFIs and the terms of a route policy
+# must be on the same device. These constraint triggers enforce it for any write, including
+# bulk_create() and update() which skip the validation of the serializers and forms. They are
+# deferrable, for transactions moving related objects to another device one table at a time
+# after SET CONSTRAINTS ALL DEFERRED. Their errors are all raised with the constraint name
+# netbox_cmdb_device_mismatch.
+
+FORWARD_SQL = """
+CREATE FUNCTION netbox_cmdb_device_mismatch(field text) RETURNS void AS $$
+BEGIN
+    RAISE EXCEPTION '% is not on the same device', field
+        USING ERRCODE = 'check_violation', CONSTRAINT = 'netbox_cmdb_device_mismatch';
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION netbox_cmdb_devicebgpsession_device_check() RETURNS trigger AS $$
+BEGIN
+    IF NEW.peer_group_id IS NOT NULL AND NEW.device_id IS DISTINCT FROM (
+        SELECT device_id FROM netbox_cmdb_bgppeergroup WHERE id = NEW.peer_group_id
+    ) THEN
+        PERFORM netbox_cmdb_device_mismatch('peer_group');
+    END IF;
+    IF NEW.route_policy_in_id IS NOT NULL AND NEW.device_id IS DISTINCT FROM (
+        SELECT device_id FROM netbox_cmdb_routepolicy WHERE id = NEW.route_policy_in_id
+    ) THEN
+        PERFORM netbox_cmdb_device_mismatch('route_policy_in');
+    END IF;
+    IF NEW.route_policy_out_id IS NOT NULL AND NEW.device_id IS DISTINCT FROM (
+        SELECT device_id FROM netbox_cmdb_routepolicy WHERE id = NEW.route_policy_out_id
+    ) THEN
+        PERFORM netbox_cmdb_device_mismatch('route_policy_out');
+    END IF;
+    IF TG_OP = 'UPDATE' AND NEW.device_id IS DISTINCT FROM OLD.device_id AND EXISTS (
+        SELECT 1 FROM netbox_cmdb_afisafi afisafi
+        JOIN netbox_cmdb_routepolicy policy
+            ON policy.id IN (afisafi.route_policy_in_id, afisafi.route_policy_out_id)
+        WHERE afisafi.device_bgp_session_id = NEW.id
+            AND policy.device_id IS DISTINCT FROM NEW.device_id
+    ) THEN
+        PERFORM netbox_cmdb_device_mismatch('afi_safis');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE CONSTRAINT TRIGGER netbox_cmdb_devicebgpsession_device
+    AFTER INSERT OR UPDATE OF device_id, peer_group_id, route_policy_in_id, route_policy_out_id
+    ON netbox_cmdb_devicebgpsession
+    DEFERRABLE INITIALLY IMMEDIATE
+    FOR EACH ROW EXECUTE PROCEDURE netbox_cmdb_devicebgpsession_device_check();
+
+CREATE FUNCTION netbox_cmdb_afisafi_device_check() RETURNS trigger AS $$
+DECLARE
+    session_device_id integer;
+BEGIN
+    SELECT device_id INTO session_device_id
+    FROM netbox_cmdb_devicebgpsession WHERE id = NEW.device_bgp_session_id;
+    IF session_device_id IS NULL THEN
+        RETURN NULL;
+    END IF;
+    IF NEW.route_policy_in_id IS NOT NULL AND session_device_id IS DISTINCT FROM (
+        SELECT device_id FROM netbox_cmdb_routepolicy WHERE id = NEW.route_policy_in_id
+    ) THEN
+        PERFORM netbox_cmdb_device_mismatch('route_policy_in');
+    END IF;
+    IF NEW.route_policy_out_id IS NOT NULL AND session_device_id IS DISTINCT FROM (
+        SELECT device_id FROM netbox_cmdb_routepolicy WHERE id = NEW.route_policy_out_id
+    ) THEN
+        PERFORM netbox_cmdb_device_mismatch('route_policy_out');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE CONSTRAINT TRIGGER netbox_cmdb_afisafi_device
+    AFTER INSERT OR UPDATE OF device_bgp_session_id, route_policy_in_id, route_policy_out_id
+    ON netbox_cmdb_afisafi
+    DEFERRABLE INITIALLY IMMEDIATE
+    FOR EACH ROW EXECUTE PROCEDURE netbox_cmdb_afisafi_device_check();
+
+CREATE FUNCTION netbox_cmdb_routepolicyterm_device_check() RETURNS trigger AS $$
+DECLARE
+    policy_device_id integer;
+BEGIN
+    SELECT device_id INTO policy_device_id
+    FROM netbox_cmdb_routepolicy WHERE id = NEW.route_policy_id;
+    IF NEW.from_bgp_community_list_id IS NOT NULL AND policy_device_id IS DISTINCT FROM (
+        SELECT device_id FROM netbox_cmdb_bgpcommunitylist
+        WHERE id = NEW.from_bgp_community_list_id
+    ) THEN
+        PERFORM netbox_cmdb_device_mismatch('from_bgp_community_list');
+    END IF;
+    IF NEW.from_prefix_list_id IS NOT NULL AND policy_device_id IS DISTINCT FROM (
+        SELECT device_id FROM netbox_cmdb_prefixlist WHERE id = NEW.from_prefix_list_id
+    ) THEN
+        PERFORM netbox_cmdb_device_mismatch('from_prefix_list');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE CONSTRAINT TRIGGER netbox_cmdb_routepolicyterm_device
+    AFTER INSERT OR UPDATE OF route_policy_id, from_bgp_community_list_id, from_prefix_list_id
+    ON netbox_cmdb_routepolicyterm
+    DEFERRABLE INITIALLY IMMEDIATE
+    FOR EACH ROW EXECUTE PROCEDURE netbox_cmdb_routepolicyterm_device_check();
+
+-- moving a referenced object to another device must not leave the objects using it behind
+
+CREATE FUNCTION netbox_cmdb_routepolicy_device_check() RETURNS trigger AS $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM netbox_cmdb_devicebgpsession
+        WHERE NEW.id IN (route_policy_in_id, route_policy_out_id)
+            AND device_id IS DISTINCT FROM NEW.device_id
+    ) THEN
+        PERFORM netbox_cmdb_device_mismatch('route_policy');
+    END IF;
+    IF EXISTS (
+        SELECT 1 FROM netbox_cmdb_afisafi afisafi
+        JOIN netbox_cmdb_devicebgpsession session
+            ON session.id = afisafi.device_bgp_session_id
+        WHERE NEW.id IN (afisafi.route_policy_in_id, afisafi.route_policy_out_id)
+            AND session.device_id IS DISTINCT FROM NEW.device_id
+    ) THEN
+        PERFORM netbox_cmdb_device_mismatch('route_policy');
+    END IF;
+    IF EXISTS (
+        SELECT 1 FROM netbox_cmdb_routepolicyterm term
+        LEFT JOIN netbox_cmdb_bgpcommunitylist community_list
+            ON community_list.id = term.from_bgp_community_list_id
+        LEFT JOIN netbox_cmdb_prefixlist prefix_list
+            ON prefix_list.id = term.from_prefix_list_id
+        WHERE term.route_policy_id = NEW.id AND (
+            community_list.device_id IS DISTINCT FROM NEW.device_id AND community_list.id IS NOT NULL
+            OR prefix_list.device_id IS DISTINCT FROM NEW.device_id AND prefix_list.id IS NOT NULL
+        )
+    ) THEN
+        PERFORM netbox_cmdb_device_mismatch('route_policy_term');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE CONSTRAINT TRIGGER netbox_cmdb_routepolicy_device
+    AFTER UPDATE OF device_id ON netbox_cmdb_routepolicy
+    DEFERRABLE INITIALLY IMMEDIATE
+    FOR EACH ROW
+    WHEN (OLD.device_id IS DISTINCT FROM NEW.device_id)
+    EXECUTE PROCEDURE netbox_cmdb_routepolicy_device_check();
+
+-- the term column referencing the list is the first argument, its field name the second
+CREATE FUNCTION netbox_cmdb_list_device_check() RETURNS trigger AS $$
+DECLARE
+    mismatch boolean;
+BEGIN
+    EXECUTE format(
+        'SELECT EXISTS (SELECT 1 FROM netbox_cmdb_routepolicyterm term '
+        'JOIN netbox_cmdb_routepolicy policy ON policy.id = term.route_policy_id '
+        'WHERE term.%I = $1 AND policy.device_id IS DISTINCT FROM $2)',
+        TG_ARGV[0]
+    ) INTO mismatch USING NEW.id, NEW.device_id;
+    IF mismatch THEN
+        PERFORM netbox_cmdb_device_mismatch(TG_ARGV[1]);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE CONSTRAINT TRIGGER netbox_cmdb_prefixlist_device
+    AFTER UPDATE OF device_id ON netbox_cmdb_prefixlist
+    DEFERRABLE INITIALLY IMMEDIATE
+    FOR EACH ROW
+    WHEN (OLD.device_id IS DISTINCT FROM NEW.device_id)
+    EXECUTE PROCEDURE netbox_cmdb_list_device_check('from_prefix_list_id', 'from_prefix_list');
+
+CREATE CONSTRAINT TRIGGER netbox_cmdb_bgpcommunitylist_device
+    AFTER UPDATE OF device_id ON netbox_cmdb_bgpcommunitylist
+    DEFERRABLE INITIALLY IMMEDIATE
+    FOR EACH ROW
+    WHEN (OLD.device_id IS DISTINCT FROM NEW.device_id)
+    EXECUTE PROCEDURE netbox_cmdb_list_device_check(
+        'from_bgp_community_list_id', 'from_bgp_community_list'
+    );
+
+CREATE FUNCTION netbox_cmdb_bgppeergroup_device_check() RETURNS trigger AS $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM netbox_cmdb_devicebgpsession
+        WHERE peer_group_id = NEW.id AND device_id IS DISTINCT FROM NEW.device_id
+    ) THEN
+        PERFORM netbox_cmdb_device_mismatch('peer_group');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE CONSTRAINT TRIGGER netbox_cmdb_bgppeergroup_device
+    AFTER UPDATE OF device_id ON netbox_cmdb_bgppeergroup
+    DEFERRABLE INITIALLY IMMEDIATE
+    FOR EACH ROW
+    WHEN (OLD.device_id IS DISTINCT FROM NEW.device_id)
+    EXECUTE PROCEDURE netbox_cmdb_bgppeergroup_device_check();
+"""
+
+REVERSE_SQL = """
+DROP TRIGGER netbox_cmdb_bgppeergroup_device ON netbox_cmdb_bgppeergroup;
+DROP TRIGGER netbox_cmdb_bgpcommunitylist_device ON netbox_cmdb_bgpcommunitylist;
+DROP TRIGGER netbox_cmdb_prefixlist_device ON netbox_cmdb_prefixlist;
+DROP TRIGGER netbox_cmdb_routepolicy_device ON netbox_cmdb_routepolicy;
+DROP TRIGGER netbox_cmdb_routepolicyterm_device ON netbox_cmdb_routepolicyterm;
+DROP TRIGGER netbox_cmdb_afisafi_device ON netbox_cmdb_afisafi;
+DROP TRIGGER netbox_cmdb_devicebgpsession_device ON netbox_cmdb_devicebgpsession;
+DROP FUNCTION netbox_cmdb_bgppeergroup_device_check();
+DROP FUNCTION netbox_cmdb_list_device_check();
+DROP FUNCTION netbox_cmdb_routepolicy_device_check();
+DROP FUNCTION netbox_cmdb_routepolicyterm_device_check();
+DROP FUNCTION netbox_cmdb_afisafi_device_check();
+DROP FUNCTION netbox_cmdb_devicebgpsession_device_check();
+DROP FUNCTION netbox_cmdb_device_mismatch(text);
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_cmdb', '0042_prefixlistterm_prefix_gist'),
+    ]
+
+    operations = [
+        migrations.RunSQL(FORWARD_SQL, reverse_sql=REVERSE_SQL),
+    ]
@@ -0,0 +1,178 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Shared community lists have no device and can be used on any device, like shared prefix lists:
+# the device consistency triggers of route policies skip them. A community list matched by route
+# policies still can't become shared, or stop being shared. A device community list can only
+# reference a shared community list as its definition.
+
+FORWARD_SQL = """
+CREATE OR REPLACE FUNCTION netbox_cmdb_routepolicyterm_device_check() RETURNS trigger AS $$
+DECLARE
+    policy_device_id integer;
+BEGIN
+    SELECT device_id INTO policy_device_id
+    FROM netbox_cmdb_routepolicy WHERE id = NEW.route_policy_id;
+    IF NEW.from_bgp_community_list_id IS NOT NULL AND policy_device_id IS DISTINCT FROM (
+        SELECT COALESCE(device_id, policy_device_id) FROM netbox_cmdb_bgpcommunitylist
+        WHERE id = NEW.from_bgp_community_list_id
+    ) THEN
+        PERFORM netbox_cmdb_device_mismatch('from_bgp_community_list');
+    END IF;
+    IF NEW.from_prefix_list_id IS NOT NULL AND policy_device_id IS DISTINCT FROM (
+        SELECT COALESCE(device_id, policy_device_id) FROM netbox_cmdb_prefixlist
+        WHERE id = NEW.from_prefix_list_id
+    ) THEN
+        PERFORM netbox_cmdb_device_mismatch('from_prefix_list');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION netbox_cmdb_routepolicy_device_check() RETURNS trigger AS $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM netbox_cmdb_devicebgpsession
+        WHERE NEW.id IN (route_policy_in_id, route_policy_out_id)
+            AND device_id IS DISTINCT FROM NEW.device_id
+    ) THEN
+        PERFORM netbox_cmdb_device_mismatch('route_policy');
+    END IF;
+    IF EXISTS (
+        SELECT 1 FROM netbox_cmdb_afisafi afisafi
+        JOIN netbox_cmdb_devicebgpsession session
+            ON session.id = afisafi.device_bgp_session_id
+        WHERE NEW.id IN (afisafi.route_policy_in_id, afisafi.route_policy_out_id)
+            AND session.device_id IS DISTINCT FROM NEW.device_id
+    ) THEN
+        PERFORM netbox_cmdb_device_mismatch('route_policy');
+    END IF;
+    IF EXISTS (
+        SELECT 1 FROM netbox_cmdb_routepolicyterm term
+        LEFT JOIN netbox_cmdb_bgpcommunitylist community_list
+            ON community_list.id = term.from_bgp_community_list_id
+        LEFT JOIN netbox_cmdb_prefixlist prefix_list
+            ON prefix_list.id = term.from_prefix_list_id
+        WHERE term.route_policy_id = NEW.id AND (
+            community_list.device_id IS DISTINCT FROM NEW.device_id AND community_list.device_id IS NOT NULL
+            OR prefix_list.device_id IS DISTINCT FROM NEW.device_id AND prefix_list.device_id IS NOT NULL
+        )
+    ) THEN
+        PERFORM netbox_cmdb_device_mismatch('route_policy_term');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION netbox_cmdb_bgpcommunitylist_definition_check() RETURNS trigger AS $$
+BEGIN
+    IF NEW.definition_id IS NOT NULL AND EXISTS (
+        SELECT 1 FROM netbox_cmdb_bgpcommunitylist
+        WHERE id = NEW.definition_id AND device_id IS NOT NULL
+    ) OR NEW.device_id IS NOT NULL AND EXISTS (
+        SELECT 1 FROM netbox_cmdb_bgpcommunitylist WHERE definition_id = NEW.id
+    ) THEN
+        RAISE EXCEPTION 'the definition must be a shared community list'
+            USING ERRCODE = 'check_violation',
+                CONSTRAINT = 'netbox_cmdb_bgpcommunitylist_shared_definition';
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE CONSTRAINT TRIGGER netbox_cmdb_bgpcommunitylist_definition
+    AFTER INSERT OR UPDATE OF device_id, definition_id ON netbox_cmdb_bgpcommunitylist
+    DEFERRABLE INITIALLY IMMEDIATE
+    FOR EACH ROW EXECUTE PROCEDURE netbox_cmdb_bgpcommunitylist_definition_check();
+"""
+
+REVERSE_SQL = """
+DROP TRIGGER netbox_cmdb_bgpcommunitylist_definition ON netbox_cmdb_bgpcommunitylist;
+DROP FUNCTION netbox_cmdb_bgpcommunitylist_definition_check();
+
+CREATE OR REPLACE FUNCTION netbox_cmdb_routepolicyterm_device_check() RETURNS trigger AS $$
+DECLARE
+    policy_device_id integer;
+BEGIN
+    SELECT device_id INTO policy_device_id
+    FROM netbox_cmdb_routepolicy WHERE id = NEW.route_policy_id;
+    IF NEW.from_bgp_community_list_id IS NOT NULL AND policy_device_id IS DISTINCT FROM (
+        SELECT device_id FROM netbox_cmdb_bgpcommunitylist
+        WHERE id = NEW.from_bgp_community_list_id
+    ) THEN
+        PERFORM netbox_cmdb_device_mismatch('from_bgp_community_list');
+    END IF;
+    IF NEW.from_prefix_list_id IS NOT NULL AND policy_device_id IS DISTINCT FROM (
+        SELECT COALESCE(device_id, policy_device_id) FROM netbox_cmdb_prefixlist
+        WHERE id = NEW.from_prefix_list_id
+    ) THEN
+        PERFORM netbox_cmdb_device_mismatch('from_prefix_list');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION netbox_cmdb_routepolicy_device_check() RETURNS trigger AS $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM netbox_cmdb_devicebgpsession
+        WHERE NEW.id IN (route_policy_in_id, route_policy_out_id)
+            AND device_id IS DISTINCT FROM NEW.device_id
+    ) THEN
+        PERFORM netbox_cmdb_device_mismatch('route_policy');
+    END IF;
+    IF EXISTS (
+        SELECT 1 FROM netbox_cmdb_afisafi afisafi
+        JOIN netbox_cmdb_devicebgpsession session
+            ON session.id = afisafi.device_bgp_session_id
+        WHERE NEW.id IN (afisafi.route_policy_in_id, afisafi.route_policy_out_id)
+            AND session.device_id IS DISTINCT FROM NEW.device_id
+    ) THEN
+        PERFORM netbox_cmdb_device_mismatch('route_policy');
+    END IF;
+    IF EXISTS (
+        SELECT 1 FROM netbox_cmdb_routepolicyterm term
+        LEFT JOIN netbox_cmdb_bgpcommunitylist community_list
+            ON community_list.id = term.from_bgp_community_list_id
+        LEFT JOIN netbox_cmdb_prefixlist prefix_list
+            ON prefix_list.id = term.from_prefix_list_id
+        WHERE term.route_policy_id = NEW.id AND (
+            community_list.device_id IS DISTINCT FROM NEW.device_id AND community_list.id IS NOT NULL
+            OR prefix_list.device_id IS DISTINCT FROM NEW.device_id AND prefix_list.device_id IS NOT NULL
+        )
+    ) THEN
+        PERFORM netbox_cmdb_device_mismatch('route_policy_term');
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('netbox_cmdb', '0044_prefixlist_shared_definition'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bgpcommunitylist',
+            name='device',
+            field=models.ForeignKey(blank=True, help_text='empty for a shared community list', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='%(class)sdevice', to='dcim.device'),
+        ),
+        migrations.AddField(
+            model_name='bgpcommunitylist',
+            name='definition',
+            field=models.ForeignKey(blank=True, help_text='shared community list whose terms apply while this list has none of its own', limit_choices_to={'device__isnull': True}, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='references', to='netbox_cmdb.bgpcommunitylist'),
+        ),
+        migrations.AddConstraint(
+            model_name='bgpcommunitylist',
+            constraint=models.UniqueConstraint(condition=models.Q(('device__isnull', True)), fields=('name',), name='netbox_cmdb_bgpcommunitylist_unique_shared_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='bgpcommunitylist',
+            constraint=models.CheckConstraint(check=models.Q(('definition__isnull', True), ('device__isnull', False), _connector='OR'), name='netbox_cmdb_bgpcommunitylist_shared_without_definition'),
+        ),
+        migrations.RunSQL(FORWARD_SQL, reverse_sql=REVERSE_SQL),
+    ]
@@ -1,25 +1,84 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 from netbox.models import ChangeLoggedModel
 
 
 class BGPCommunityList(ChangeLoggedModel):
-    """An object used in RoutePolicy object to filter on a list of BGP communities."""
+    """An object used in RoutePolicy object to filter on a list of BGP communities.
+
+    A community list without device is shared, like a shared prefix list: device community lists
+    reference it as their definition, and use its terms until they have terms of their own.
+    """
 
     name = models.CharField(max_length=100)
     device = models.ForeignKey(
         to="dcim.Device",
         on_delete=models.CASCADE,
         related_name="%(class)sdevice",
-        null=False,
-        blank=False,
+        null=True,
+        blank=True,
+        help_text="empty for a shared community list",
+    )
+    definition = models.ForeignKey(
+        to="self",
+        on_delete=models.PROTECT,
+        related_name="references",
+        null=True,
+        blank=True,
+        limit_choices_to={"device__isnull": True},
+        help_text="shared community list whose terms apply while this list has none of its own",
     )
 
     def __str__(self):
+        if self.device_id is None:
+            return self.name
         return f"{self.device}-{self.name}"
 
+    @property
+    def is_shared(self):
+        return self.device_id is None
+
+    def clean(self):
+        super().clean()
+
+        # a device community list is matched by the route policies of its device, a shared one
+        # by those of any device
+        if self.pk is not None:
+            stored = BGPCommunityList.objects.filter(pk=self.pk).values_list("device_id", flat=True)
+            if stored and (stored[0] is None) != self.is_shared:
+                raise ValidationError(
+                    {"device": "a community list can't become shared, or stop being shared"}
+                )
+
+        # NULL devices are distinct for the unique together constraint
+        shared = BGPCommunityList.objects.filter(device__isnull=True, name=self.name).exclude(
+            pk=self.pk
+        )
+        if self.is_shared and shared.exists():
+            raise ValidationError({"name": "a shared community list with this name already exists"})
+
+        if self.definition is None:
+            return
+        if self.is_shared:
+            raise ValidationError({"definition": "a shared community list can't have a definition"})
+        if not self.definition.is_shared:
+            raise ValidationError({"definition": "the definition must be a shared community list"})
+
     class Meta:
         unique_together = ("name", "device")
         verbose_name_plural = "BGP community lists"
+        constraints = [
+            # NULL devices are distinct in the unique together constraint
+            models.UniqueConstraint(
+                fields=["name"],
+                condition=models.Q(device__isnull=True),
+                name="netbox_cmdb_bgpcommunitylist_unique_shared_name",
+            ),
+            models.CheckConstraint(
+                check=models.Q(definition__isnull=True) | models.Q(device__isnull=False),
+                name="netbox_cmdb_bgpcommunitylist_shared_without_definition",
+            ),
+        ]
 
 
 class BGPCommunityListTerm(ChangeLoggedModel):
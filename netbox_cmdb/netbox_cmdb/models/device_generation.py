@@ -0,0 +1,55 @@
+from django.db import connection, models
+
+
+class DeviceGeneration(models.Model):
+    """A counter bumped by every change of a CMDB object of a device.
+
+    Clients compare it with the last generation they have seen, to know whether anything changed
+    for a device without fetching its objects.
+    """
+
+    # no database constraint: generations are bumped while a device is being deleted
+    device = models.OneToOneField(
+        to="dcim.Device",
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        primary_key=True,
+        related_name="cmdb_generation",
+    )
+    generation = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.device_id}--{self.generation}"
+
+    @classmethod
+    def bump(cls, device_ids):
+        """Increment the generation of the given devices, in the current transaction."""
+        device_ids = sorted(set(device_ids))
+        if not device_ids:
+            return
+
+        table = cls._meta.db_table
+        values = ", ".join(["(%s, 1)"] * len(device_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (device_id, generation) VALUES {values} "
+                f"ON CONFLICT (device_id) DO UPDATE SET generation = {table}.generation + 1",
+                device_ids,
+            )
+
+    @classmethod
+    def bump_selected(cls, device_ids):
+        """Increment the generation of the devices selected by a query of device ids, in a single
+        statement of the current transaction, without fetching them."""
+        sql, params = device_ids.query.sql_with_params()
+        table = cls._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (device_id, generation) "
+                f"SELECT DISTINCT device_id, 1 FROM ({sql}) AS devices WHERE device_id IS NOT NULL "
+                f"ON CONFLICT (device_id) DO UPDATE SET generation = {table}.generation + 1",
+                params,
+            )
+
+    class Meta:
+        verbose_name = "device generation"
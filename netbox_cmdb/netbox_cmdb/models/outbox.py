@@ -0,0 +1,70 @@
+from django.db import connection, models
+from django.utils import timezone
+
+from netbox_cmdb.choices import OutboxActionChoices
+
+
+class OutboxEvent(models.Model):
+    """A change of a CMDB object, waiting to be read and acknowledged by the outbox consumers.
+
+    All the changes of an object, including the changes of its children (terms, AFI/SAFIs and
+    BGP session peers), are merged into a single event until it is acknowledged. The version is
+    incremented by each merged change.
+    """
+
+    object_type = models.ForeignKey(
+        to="contenttypes.ContentType", on_delete=models.CASCADE, related_name="+"
+    )
+    object_id = models.PositiveBigIntegerField()
+    object_repr = models.CharField(max_length=200)
+    action = models.CharField(max_length=10, choices=OutboxActionChoices)
+    version = models.PositiveIntegerField(default=1)
+    created = models.DateTimeField()
+    last_changed = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.object_repr} {self.action}"
+
+    @classmethod
+    def record(cls, object_type_id, object_id, object_repr, action):
+        """Insert an event, or merge it into the pending event of the same object."""
+        cls.record_many([(object_type_id, object_id, object_repr, action)])
+
+    @classmethod
+    def record_many(cls, events):
+        """Insert or merge the (object_type_id, object_id, object_repr, action) events at once.
+
+        The events must be about distinct objects.
+        """
+        if not events:
+            return
+
+        table = cls._meta.db_table
+        now = timezone.now()
+        values = ", ".join(["(%s, %s, %s, %s, 1, %s, %s)"] * len(events))
+        params = []
+        for object_type_id, object_id, object_repr, action in events:
+            params.extend([object_type_id, object_id, object_repr[:200], action, now, now])
+        with connection.cursor() as cursor:
+            # a deletion supersedes anything, and a creation stays a creation when updated
+            cursor.execute(
+                f"INSERT INTO {table} "
+                "(object_type_id, object_id, object_repr, action, version, created, last_changed) "
+                f"VALUES {values} "
+                "ON CONFLICT (object_type_id, object_id) DO UPDATE SET "
+                f"version = {table}.version + 1, "
+                f"object_repr = COALESCE(NULLIF(EXCLUDED.object_repr, ''), {table}.object_repr), "
+                "last_changed = EXCLUDED.last_changed, "
+                "action = CASE "
+                f"WHEN EXCLUDED.action = %s OR {table}.action = %s THEN {table}.action "
+                "ELSE EXCLUDED.action END",
+                params + [OutboxActionChoices.UPDATED, OutboxActionChoices.DELETED],
+            )
+
+    class Meta:
+        ordering = ["id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["object_type", "object_id"], name="netbox_cmdb_outboxevent_unique_object"
+            ),
+        ]
@@ -1,5 +1,6 @@
 """Prefix list models."""
 
+from django.contrib.postgres.indexes import GistIndex
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.urls import reverse
@@ -21,15 +22,30 @@ class PrefixListIPVersionChoices(ChoiceSet):
 
 
 class PrefixList(ChangeLoggedModel):
-    """Prefix list main model."""
+    """Prefix list main model.
+
+    A prefix list without device is shared: its terms are stored once, and device prefix lists
+    reference it as their definition. The terms of the definition apply to a device prefix list
+    until it has terms of its own, which override them.
+    """
 
     name = models.CharField(max_length=100)
     device = models.ForeignKey(
         to="dcim.Device",
         on_delete=models.CASCADE,
         related_name="%(class)sdevice",
-        null=False,
-        blank=False,
+        null=True,
+        blank=True,
+        help_text="empty for a shared prefix list",
+    )
+    definition = models.ForeignKey(
+        to="self",
+        on_delete=models.PROTECT,
+        related_name="references",
+        null=True,
+        blank=True,
+        limit_choices_to={"device__isnull": True},
+        help_text="shared prefix list whose terms apply while this list has none of its own",
     )
     ip_version = models.CharField(
         max_length=10,
@@ -39,10 +55,54 @@ class PrefixList(ChangeLoggedModel):
     )
 
     def __str__(self):
+        if self.device_id is None:
+            return self.name
         return f"{self.device}-{self.name}"
 
+    @property
+    def is_shared(self):
+        return self.device_id is None
+
+    def clean(self):
+        super().clean()
+
+        # a device prefix list is matched by the route policies of its device, a shared one by
+        # those of any device
+        if self.pk is not None:
+            stored = PrefixList.objects.filter(pk=self.pk).values_list("device_id", flat=True)
+            if stored and (stored[0] is None) != self.is_shared:
+                raise ValidationError(
+                    {"device": "a prefix list can't become shared, or stop being shared"}
+                )
+
+        # NULL devices are distinct for the unique together constraint
+        shared = PrefixList.objects.filter(device__isnull=True, name=self.name).exclude(pk=self.pk)
+        if self.is_shared and shared.exists():
+            raise ValidationError({"name": "a shared prefix list with this name already exists"})
+
+        if self.definition is None:
+            return
+        if self.is_shared:
+            raise ValidationError({"definition": "a shared prefix list can't have a definition"})
+        if not self.definition.is_shared:
+            raise ValidationError({"definition": "the definition must be a shared prefix list"})
+        if self.definition.ip_version != self.ip_version:
+            raise ValidationError({"definition": "the definition has another IP version"})
+
     class Meta:
         unique_together = ("name", "device")
+        constraints = [
+            # NULL devices are distinct in the unique together constraint
+            models.UniqueConstraint(
+                fields=["name"],
+                condition=models.Q(device__isnull=True),
+                name="netbox_cmdb_prefixlist_unique_shared_name",
+            ),
+            models.CheckConstraint(
+                check=models.Q(definition__isnull=True) | models.Q(device__isnull=False),
+                name="netbox_cmdb_prefixlist_shared_without_definition",
+            ),
+        ]
 
 
 class PrefixListTerm(ChangeLoggedModel):
@@ -108,3 +168,9 @@ class PrefixListTerm(ChangeLoggedModel):
     class Meta:
         unique_together = ("prefix_list", "sequence")
         ordering = ["sequence"]
+        indexes = [
+            # used by the containment lookups (<<, <<=, >>=) on prefixes
+            GistIndex(
+                fields=["prefix"], name="netbox_cmdb_plterm_prefix_gist", opclasses=["inet_ops"]
+            ),
+        ]
@@ -103,7 +103,8 @@ class RoutePolicyTerm(ChangeLoggedModel):
     @staticmethod
     def validate_device_consistency(device, from_bgp_community_list, from_prefix_list):
         errors = []
-        if from_bgp_community_list and from_bgp_community_list.device_id != device.id:
+        # shared lists have no device, and can be used on any
+        if from_bgp_community_list and from_bgp_community_list.device_id not in (None, device.id):
             error = ValidationError(
                 "%(field)s is not on the same device",
                 code="device_mismatch",
@@ -111,7 +112,7 @@ class RoutePolicyTerm(ChangeLoggedModel):
             )
             errors.append(error)
 
-        if from_prefix_list and from_prefix_list.device_id != device.id:
+        if from_prefix_list and from_prefix_list.device_id not in (None, device.id):
             error = ValidationError(
                 "%(field)s is not on the same device",
                 code="device_mismatch",
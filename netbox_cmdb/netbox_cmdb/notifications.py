@@ -0,0 +1,95 @@
+"""Change notifications per device, fanned out through Redis pub/sub.
+
+Signal handlers register the devices changed by a transaction, which are published once, when
+the transaction commits. Subscribers coalesce the notifications received within a small window,
+so that a large update results in a single event per device.
+"""
+
+import json
+import logging
+import time
+
+from django_redis import get_redis_connection
+from redis.exceptions import RedisError
+
+from netbox_cmdb.models.device_generation import DeviceGeneration
+from netbox_cmdb.transactions import CommitBatch
+
+logger = logging.getLogger("netbox.plugins.netbox_cmdb.notifications")
+
+CHANNEL_PREFIX = "netbox_cmdb:device:"
+
+# seconds between two comments sent to keep idle streams open
+KEEPALIVE_INTERVAL = 15
+
+
+def get_channel(device_id):
+    return f"{CHANNEL_PREFIX}{device_id}"
+
+
+def _publish(device_ids):
+    generations = dict(
+        DeviceGeneration.objects.filter(device_id__in=device_ids).values_list(
+            "device_id", "generation"
+        )
+    )
+    # notifications are best effort, the changes are committed already
+    try:
+        pipeline = get_redis_connection().pipeline(transaction=False)
+        for device_id in device_ids:
+            message = {"device": device_id, "generation": generations.get(device_id, 0)}
+            pipeline.publish(get_channel(device_id), json.dumps(message))
+        pipeline.execute()
+    except RedisError:
+        logger.exception("Unable to publish device change notifications")
+
+
+_pending = CommitBatch(_publish)
+
+
+def notify_devices(device_ids):
+    """Publish a change of the given devices once the current transaction commits."""
+    _pending.add(device_ids)
+
+
+def format_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_device_changes(device_ids, window, timeout):
+    """Yield server-sent events for the changes of the given devices, for `timeout` seconds.
+
+    Notifications received within `window` seconds after a first one are merged into one event
+    per device, carrying its latest generation.
+    """
+    pubsub = get_redis_connection().pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(*[get_channel(device_id) for device_id in device_ids])
+    try:
+        yield format_event("subscribed", {"devices": sorted(device_ids)})
+
+        deadline = time.monotonic() + timeout
+        last_sent = time.monotonic()
+        while (remaining := deadline - time.monotonic()) > 0:
+            message = pubsub.get_message(timeout=min(KEEPALIVE_INTERVAL, remaining))
+            if message is None:
+                if time.monotonic() - last_sent >= KEEPALIVE_INTERVAL:
+                    last_sent = time.monotonic()
+                    yield ": keepalive\n\n"
+                continue
+
+            changes = {}
+            window_end = time.monotonic() + window
+            while message is not None or time.monotonic() < window_end:
+                if message is not None:
+                    change = json.loads(message["data"])
+                    changes[change["device"]] = max(
+                        change["generation"], changes.get(change["device"], 0)
+                    )
+                remaining = window_end - time.monotonic()
+                message = pubsub.get_message(timeout=remaining) if remaining > 0 else None
+
+            for device_id, generation in sorted(changes.items()):
+                yield format_event("change", {"device": device_id, "generation": generation})
+            last_sent = time.monotonic()
+    finally:
+        pubsub.close()
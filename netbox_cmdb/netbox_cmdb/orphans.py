@@ -0,0 +1,103 @@
+"""Garbage collection of the orphan objects, that nothing uses anymore.
+
+The orphans are:
+- device BGP sessions which are the peer of no BGP session,
+- AFI/SAFIs of no device BGP session,
+- route policies, prefix lists, BGP community lists and ASNs which no object references through
+  a protected foreign key, so whose deletion is not blocked.
+
+Orphans of a kind are found with an anti-join per reference, in a single query whatever the size
+of the tables, and deleted in batches. Kinds are collected in order: the route policies of the
+deleted device BGP sessions are collected in the same run, then the lists and ASNs they used.
+Deletions are recorded in the changelog, in the name of the user collecting the orphans.
+"""
+
+import uuid
+from contextlib import nullcontext
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from extras.context_managers import change_logging
+from extras.plugins import get_plugin_config
+from utilities.utils import NetBoxFakeRequest
+
+from netbox_cmdb.models.bgp import ASN, AfiSafi, BGPSession, DeviceBGPSession
+from netbox_cmdb.models.bgp_community_list import BGPCommunityList
+from netbox_cmdb.models.prefix_list import PrefixList
+from netbox_cmdb.models.route_policy import RoutePolicy
+from netbox_cmdb.protection import protecting_fields
+
+
+def unreferenced(model, fields):
+    """Return the objects of `model` referenced by none of the given foreign keys."""
+    return model.objects.filter(
+        *[
+            ~Exists(field.model._base_manager.filter(**{field.attname: OuterRef("pk")}))
+            for field in fields
+        ]
+    )
+
+
+def _peers():
+    return [BGPSession._meta.get_field(name) for name in ("peer_a", "peer_b")]
+
+
+ORPHANS = {
+    "device_bgp_sessions": lambda: unreferenced(DeviceBGPSession, _peers()),
+    "afi_safis": lambda: AfiSafi.objects.filter(device_bgp_session__isnull=True),
+    "route_policies": lambda: unreferenced(RoutePolicy, protecting_fields(RoutePolicy)),
+    "prefix_lists": lambda: unreferenced(PrefixList, protecting_fields(PrefixList)),
+    "bgp_community_lists": lambda: unreferenced(
+        BGPCommunityList, protecting_fields(BGPCommunityList)
+    ),
+    "asns": lambda: unreferenced(ASN, protecting_fields(ASN)),
+}
+
+
+def _delete(orphans, batch_size):
+    deleted = 0
+    while True:
+        # each batch is looked up again, so that an object referenced meanwhile is left alone
+        with transaction.atomic():
+            pks = list(orphans().order_by("pk").values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                return deleted
+            orphans().filter(pk__in=pks).delete()
+        deleted += len(pks)
+
+
+def _change_logging(user, request_id):
+    if user is None:
+        return nullcontext()
+
+    # change logging records the user and the request id of the current request
+    request = NetBoxFakeRequest(
+        {
+            "META": {},
+            "COOKIES": {},
+            "POST": {},
+            "GET": {},
+            "FILES": {},
+            "user": user,
+            "path": "",
+            "id": request_id or uuid.uuid4(),
+        }
+    )
+    return change_logging(request)
+
+
+def collect_orphans(kinds=None, delete=False, batch_size=None, user=None, request_id=None):
+    """Count the orphans of the given kinds, all by default, deleting them when `delete` is set.
+
+    The deletions are recorded in the changelog as made by `user`, under `request_id`, or a new
+    request id. Without a user, like outside of a request, nothing is recorded.
+    Return the number of orphans by kind.
+    """
+    batch_size = batch_size or get_plugin_config("netbox_cmdb", "orphans_batch_size")
+    counts = {}
+    with _change_logging(user if delete else None, request_id):
+        for kind, orphans in ORPHANS.items():
+            if kinds and kind not in kinds:
+                continue
+            counts[kind] = _delete(orphans, batch_size) if delete else orphans().count()
+    return counts
@@ -0,0 +1,92 @@
+"""Transactional outbox of CMDB changes.
+
+Each save or delete records an event in the same transaction, so that consumers only read
+committed changes. Changes of child objects are reported on their parent: a route policy update
+results in a single event, whatever the number of its terms.
+"""
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
+from netbox.models import ChangeLoggedModel
+
+from netbox_cmdb.choices import OutboxActionChoices
+from netbox_cmdb.models.bgp import AfiSafi, BGPSession, DeviceBGPSession
+from netbox_cmdb.models.bgp_community_list import BGPCommunityListTerm
+from netbox_cmdb.models.outbox import OutboxEvent
+from netbox_cmdb.models.prefix_list import PrefixListTerm
+from netbox_cmdb.models.route_policy import RoutePolicyTerm
+
+# foreign key leading from a child object to the parent its changes are reported on
+PARENT_FIELDS = {
+    AfiSafi: "device_bgp_session",
+    BGPCommunityListTerm: "bgp_community_list",
+    PrefixListTerm: "prefix_list",
+    RoutePolicyTerm: "route_policy",
+}
+
+
+def get_tracked_models():
+    """Return the models whose changes are recorded in the outbox."""
+    return [
+        model
+        for model in apps.get_app_config("netbox_cmdb").get_models()
+        if issubclass(model, ChangeLoggedModel)
+    ]
+
+
+def get_event_target(instance):
+    """Return the (model, pk) of the object whose event reports a change of `instance`.
+
+    Parents are resolved from the foreign key ids, without loading them. None is returned when
+    there is no parent, like for a BGP session peer created or deleted with its session.
+    """
+    model, pk = type(instance), instance.pk
+    if model in PARENT_FIELDS:
+        field = model._meta.get_field(PARENT_FIELDS[model])
+        model, pk = field.related_model, getattr(instance, field.attname)
+        if pk is None:
+            return None
+
+    if model is DeviceBGPSession:
+        model = BGPSession
+        pk = (
+            BGPSession.objects.filter(Q(peer_a_id=pk) | Q(peer_b_id=pk))
+            .values_list("pk", flat=True)
+            .first()
+        )
+        if pk is None:
+            return None
+
+    return model, pk
+
+
+def record_change(instance, action):
+    """Record a change of `instance` in the outbox, merged with the pending event if any."""
+    target = get_event_target(instance)
+    if target is None:
+        return
+
+    model, pk = target
+    if model is type(instance):
+        object_repr = str(instance)
+    else:
+        # the change of a child is an update of its parent, which keeps its representation
+        action, object_repr = OutboxActionChoices.UPDATED, ""
+
+    OutboxEvent.record(ContentType.objects.get_for_model(model).pk, pk, object_repr, action)
+
+
+def record_creations(instances):
+    """Record the creation of objects without parent, like bulk created ones, in a single query."""
+    OutboxEvent.record_many(
+        [
+            (
+                ContentType.objects.get_for_model(type(instance)).pk,
+                instance.pk,
+                str(instance),
+                OutboxActionChoices.CREATED,
+            )
+            for instance in instances
+        ]
+    )
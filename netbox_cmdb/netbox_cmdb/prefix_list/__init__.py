@@ -0,0 +1 @@
+"""Prefix list engines: matching, optimization, analysis and set operations."""
@@ -0,0 +1,155 @@
+"""Prefix list analyzer, reporting the terms which can never match, or only partly.
+
+Terms are evaluated by sequence and the first matching term wins. A term is:
+- shadowed when the earlier terms together match every prefix it matches, so that it never
+  matches,
+- overlapped when the earlier terms match part of the prefixes it matches, so that it is only
+  partly effective. The earlier terms can be broader than the term, or more specific.
+
+Terms are streamed per prefix list, by sequence, and inserted in a radix tree as they come: the
+earlier terms covering a term are found in a single lookup, and the more specific ones in its
+subtree, instead of comparing every pair of terms. The prefixes they take from the term are
+computed per length band, on address intervals, like the set operations on prefix lists.
+"""
+
+from itertools import chain, groupby
+from typing import NamedTuple, Tuple
+
+from netbox_cmdb.models.prefix_list import PrefixList, PrefixListTerm
+from netbox_cmdb.prefix_list.radix import RadixTree
+from netbox_cmdb.prefix_list.ranges import MAX_LENGTH, TermRange, term_range
+from netbox_cmdb.prefix_list.setops import subtract_intervals, to_intervals
+
+SHADOWED = "shadowed"
+OVERLAPPED = "overlapped"
+
+
+class Finding(NamedTuple):
+    kind: str
+    sequence: int
+    prefix: str
+    ge: int
+    le: int
+    # the earliest term responsible, and the lengths the earlier terms take from the term
+    by_sequence: int
+    min_length: int
+    max_length: int
+    # all the earlier terms responsible, by sequence
+    by_sequences: Tuple[int, ...]
+
+
+class _Term(NamedTuple):
+    sequence: int
+    range: TermRange
+
+
+def _bands(term, earlier):
+    """Yield the (min_length, max_length) bands of lengths of `term`, on which the same earlier
+    terms are active."""
+    bounds = {term.min_length, term.max_length + 1}
+    for other in earlier:
+        bounds.update(
+            bound
+            for bound in (other.range.min_length, other.range.max_length + 1)
+            if term.min_length < bound <= term.max_length
+        )
+    bounds = sorted(bounds)
+    return [(start, end - 1) for start, end in zip(bounds, bounds[1:])]
+
+
+def _taken(term, earlier):
+    """Return whether the earlier terms take all the prefixes of `term`, the lengths at which
+    they take some, and the sequences of the earlier terms taking them."""
+    interval = [(term.network, term.last)]
+    shadowed = True
+    lengths = []
+    sequences = set()
+    for min_length, max_length in _bands(term, earlier):
+        active = [
+            other
+            for other in earlier
+            if other.range.min_length <= min_length and max_length <= other.range.max_length
+        ]
+        if not active:
+            shadowed = False
+            continue
+
+        # the earlier terms are inside the term or cover it: they all take some of its prefixes
+        remaining = subtract_intervals(interval, to_intervals(other.range for other in active))
+        shadowed = shadowed and not remaining
+        lengths.extend((min_length, max_length))
+        sequences.update(other.sequence for other in active)
+    return shadowed, lengths, sorted(sequences)
+
+
+def analyze_terms(terms):
+    """Return the findings of the (sequence, prefix, ge, le) terms of a list, sorted by sequence."""
+    trees = {version: RadixTree(max_length) for version, max_length in MAX_LENGTH.items()}
+    findings = []
+    for sequence, prefix, ge, le in terms:
+        term = term_range(prefix, ge, le)
+        tree = trees[term.version]
+
+        # a term of the same prefix is both covering and covered
+        earlier = {
+            other.sequence: other
+            for other in chain(
+                tree.covering(term.network, term.length), tree.covered(term.network, term.length)
+            )
+            if other.range.min_length <= term.max_length
+            and term.min_length <= other.range.max_length
+        }
+        if earlier:
+            shadowed, lengths, sequences = _taken(term, earlier.values())
+            if sequences:
+                findings.append(
+                    Finding(
+                        SHADOWED if shadowed else OVERLAPPED,
+                        sequence,
+                        str(prefix),
+                        ge,
+                        le,
+                        sequences[0],
+                        min(lengths),
+                        max(lengths),
+                        tuple(sequences),
+                    )
+                )
+
+        tree.insert(term.network, term.length, _Term(sequence, term))
+    return findings
+
+
+def analyze_prefix_lists(prefix_lists, chunk_size=10000):
+    """Yield the (prefix list id, findings) of the given prefix lists having findings."""
+    terms = (
+        PrefixListTerm.objects.filter(prefix_list__in=prefix_lists)
+        .order_by("prefix_list_id", "sequence")
+        .values_list("prefix_list_id", "sequence", "prefix", "ge", "le")
+    )
+    for prefix_list_id, rows in groupby(
+        terms.iterator(chunk_size=chunk_size), key=lambda row: row[0]
+    ):
+        findings = analyze_terms(row[1:] for row in rows)
+        if findings:
+            yield prefix_list_id, findings
+
+
+def build_report(prefix_lists):
+    """Return the findings of the given prefix lists, for the API and the management command."""
+    findings = dict(analyze_prefix_lists(prefix_lists))
+    report = []
+    for prefix_list in (
+        PrefixList.objects.filter(pk__in=findings).select_related("device").order_by("pk")
+    ):
+        report.append(
+            {
+                "id": prefix_list.pk,
+                "name": prefix_list.name,
+                # shared prefix lists have no device
+                "device": prefix_list.device
+                and {"id": prefix_list.device_id, "name": prefix_list.device.name},
+                "findings": [finding._asdict() for finding in findings[prefix_list.pk]],
+            }
+        )
+    return report
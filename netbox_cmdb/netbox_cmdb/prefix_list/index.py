@@ -0,0 +1,120 @@
+"""In-memory index of the prefix list terms of the whole fleet.
+
+Each process holds its own index, built once from the database. Changes of prefix lists are
+recorded in Redis with an increasing version on commit, and each process reloads the changed
+lists before answering, so the index stays current without being rebuilt.
+"""
+
+import threading
+from collections import defaultdict
+from typing import NamedTuple
+
+from django_redis import get_redis_connection
+
+from netbox_cmdb.models.prefix_list import PrefixListTerm
+from netbox_cmdb.prefix_list.radix import RadixTree
+from netbox_cmdb.prefix_list.ranges import MAX_LENGTH, parse_prefix, term_range
+from netbox_cmdb.transactions import CommitBatch
+
+VERSION_KEY = "netbox_cmdb:prefix_list_index:version"
+CHANGES_KEY = "netbox_cmdb:prefix_list_index:changes"
+
+# the version is incremented and assigned to the changed lists atomically, so that a process
+# can never read a version before the changes it covers
+RECORD_CHANGES_SCRIPT = """
+local version = redis.call('INCR', KEYS[1])
+for _, prefix_list_id in ipairs(ARGV) do
+    redis.call('ZADD', KEYS[2], version, prefix_list_id)
+end
+return version
+"""
+
+
+class IndexedTerm(NamedTuple):
+    prefix_list_id: int
+    sequence: int
+    prefix: str
+    ge: int
+    le: int
+    min_length: int
+    max_length: int
+
+
+class PrefixListIndex:
+    """Radix trees of all the prefix list terms, one per IP version."""
+
+    def __init__(self):
+        self.trees = {version: RadixTree(max_length) for version, max_length in MAX_LENGTH.items()}
+        self.terms = defaultdict(list)
+        self.version = None
+        self.lock = threading.Lock()
+
+    def _add(self, prefix_list_id, sequence, prefix, ge, le):
+        version, network, length, min_length, max_length = term_range(prefix, ge, le)
+        term = IndexedTerm(prefix_list_id, sequence, str(prefix), ge, le, min_length, max_length)
+        self.trees[version].insert(network, length, term)
+        self.terms[prefix_list_id].append(term)
+
+    def _remove(self, prefix_list_id):
+        for term in self.terms.pop(prefix_list_id, []):
+            version, network, length = parse_prefix(term.prefix)
+            self.trees[version].remove(network, length, term)
+
+    def load(self, prefix_list_ids=None):
+        """Load the terms of the given prefix lists, or of all of them."""
+        terms = PrefixListTerm.objects.order_by()
+        if prefix_list_ids is not None:
+            for prefix_list_id in prefix_list_ids:
+                self._remove(prefix_list_id)
+            terms = terms.filter(prefix_list_id__in=prefix_list_ids)
+
+        for row in terms.values_list("prefix_list_id", "sequence", "prefix", "ge", "le").iterator():
+            self._add(*row)
+
+    def refresh(self):
+        """Apply the changes recorded since the last refresh, or build the index."""
+        redis = get_redis_connection()
+        with self.lock:
+            # read the version first, changes made while loading are applied at the next refresh
+            version = int(redis.get(VERSION_KEY) or 0)
+            if self.version is None:
+                self.load()
+            elif version != self.version:
+                changed = redis.zrangebyscore(CHANGES_KEY, self.version + 1, "+inf")
+                self.load([int(prefix_list_id) for prefix_list_id in changed])
+            self.version = version
+
+    def match(self, prefix):
+        """Return the terms matching a prefix, grouped by prefix list and sorted by sequence."""
+        version, network, length = parse_prefix(prefix)
+        matches = defaultdict(list)
+        for term in self.trees[version].covering(network, length):
+            if term.min_length <= length <= term.max_length:
+                matches[term.prefix_list_id].append(term)
+
+        for terms in matches.values():
+            terms.sort(key=lambda term: term.sequence)
+        return matches
+
+
+_index = PrefixListIndex()
+
+
+def get_index():
+    """Return the index of the process, up to date with the committed changes."""
+    _index.refresh()
+    return _index
+
+
+def _record(prefix_list_ids):
+    get_redis_connection().eval(
+        RECORD_CHANGES_SCRIPT, 2, VERSION_KEY, CHANGES_KEY, *prefix_list_ids
+    )
+
+
+_pending = CommitBatch(_record)
+
+
+def prefix_lists_changed(prefix_list_ids):
+    """Record, once the transaction commits, that the terms of the given prefix lists changed."""
+    _pending.add(prefix_list_ids)
@@ -0,0 +1,119 @@
+"""Prefix list optimizer.
+
+Terms carry no decision, every term permits, so a prefix list matches the union of the ranges of
+its terms whatever their sequence. The optimizer computes a smaller set of terms matching the
+same union:
+- ranges of lengths of a same prefix which overlap or touch are merged,
+- terms sharing the same lengths are merged as integer intervals of addresses, and split back
+  into the fewest prefixes, which aggregates siblings,
+- terms covered by another term are removed, looking up their covering terms in a radix tree.
+Each pass is O(n log n), passes are repeated until the terms no longer change.
+"""
+
+from collections import defaultdict
+
+from netbox_cmdb.prefix_list.radix import RadixTree
+from netbox_cmdb.prefix_list.ranges import MAX_LENGTH, TermRange
+
+SEQUENCE_STEP = 5
+
+
+def merge_length_ranges(ranges):
+    """Merge the overlapping or adjacent length ranges of each prefix."""
+    by_prefix = defaultdict(list)
+    for term in ranges:
+        by_prefix[term.version, term.network, term.length].append(term)
+
+    merged = []
+    for (version, network, length), terms in by_prefix.items():
+        terms.sort(key=lambda term: term.min_length)
+        current = terms[0]
+        for term in terms[1:]:
+            if term.min_length <= current.max_length + 1:
+                current = current._replace(max_length=max(current.max_length, term.max_length))
+            else:
+                merged.append(current)
+                current = term
+        merged.append(current)
+    return merged
+
+
+def interval_to_prefixes(first, last, max_length):
+    """Yield the (network, length) of the fewest prefixes covering the interval first-last."""
+    while first <= last:
+        # the largest block aligned on first which does not go beyond last
+        size = (first & -first).bit_length() - 1 if first else max_length
+        while first + (1 << size) - 1 > last:
+            size -= 1
+        yield first, max_length - size
+        first += 1 << size
+
+
+def aggregate(ranges):
+    """Merge the terms sharing the same lengths, as intervals of addresses."""
+    by_lengths = defaultdict(list)
+    for term in ranges:
+        by_lengths[term.version, term.min_length, term.max_length].append(term)
+
+    aggregated = []
+    for (version, min_length, max_length), terms in by_lengths.items():
+        terms.sort(key=lambda term: term.network)
+        intervals = []
+        for term in terms:
+            if intervals and term.network <= intervals[-1][1] + 1:
+                intervals[-1][1] = max(intervals[-1][1], term.last)
+            else:
+                intervals.append([term.network, term.last])
+
+        # interval bounds are aligned on the original prefixes, which are not longer than
+        # min_length, so are the resulting prefixes
+        for first, last in intervals:
+            for network, length in interval_to_prefixes(first, last, MAX_LENGTH[version]):
+                aggregated.append(TermRange(version, network, length, min_length, max_length))
+    return aggregated
+
+
+def remove_shadowed(ranges):
+    """Remove the terms whose range is included in the range of another term."""
+    trees = {version: RadixTree(max_length) for version, max_length in MAX_LENGTH.items()}
+    kept = []
+    # covering terms have shorter prefixes, or wider ranges of lengths for the same prefix
+    for term in sorted(ranges, key=lambda term: (term.length, term.min_length, -term.max_length)):
+        tree = trees[term.version]
+        if not any(
+            other.min_length <= term.min_length and term.max_length <= other.max_length
+            for other in tree.covering(term.network, term.length)
+        ):
+            tree.insert(term.network, term.length, term)
+            kept.append(term)
+    return kept
+
+
+def optimize(ranges):
+    """Return an equivalent and smaller set of term ranges."""
+    ranges = sorted(set(ranges))
+    while True:
+        optimized = sorted(set(remove_shadowed(aggregate(merge_length_ranges(ranges)))))
+        if optimized == ranges:
+            return optimized
+        ranges = optimized
+
+
+def to_term_data(term, sequence):
+    """Return the term data of a range, with the shortest ge/le form."""
+    ge = term.min_length if term.min_length > term.length else None
+    le = term.max_length if term.max_length > term.length else None
+    if ge is not None and term.max_length == MAX_LENGTH[term.version]:
+        le = None
+    return {"sequence": sequence, "prefix": term.to_prefix(), "ge": ge, "le": le}
+
+
+def to_terms(ranges):
+    """Return the data of the terms of `ranges`, ordered by prefix and numbered by steps of 5."""
+    ordered = sorted(ranges, key=lambda term: (term.version, term.network, term.length))
+    return [to_term_data(term, SEQUENCE_STEP * index) for index, term in enumerate(ordered, 1)]
+
+
+def optimize_terms(ranges):
+    """Return the data of the optimized terms of `ranges`."""
+    return to_terms(optimize(ranges))
@@ -0,0 +1,100 @@
+"""Path-compressed binary trie (Patricia trie) of IP prefixes."""
+
+
+class _Node:
+    __slots__ = ("network", "length", "values", "children")
+
+    def __init__(self, network, length, values=None):
+        self.network = network
+        self.length = length
+        self.values = values if values is not None else []
+        self.children = [None, None]
+
+
+class RadixTree:
+    """Stores values at prefixes of one IP version, and finds the prefixes covering a prefix.
+
+    Only nodes holding values or branching are stored, so a lookup visits at most one node per
+    stored prefix covering the looked up one, instead of one node per bit.
+    """
+
+    def __init__(self, max_length):
+        self.max_length = max_length
+        self.root = _Node(0, 0)
+
+    def _bit(self, network, index):
+        return (network >> (self.max_length - 1 - index)) & 1
+
+    def _mask(self, network, length):
+        shift = self.max_length - length
+        return (network >> shift) << shift
+
+    def _common_length(self, network_a, length_a, network_b, length_b):
+        length = min(length_a, length_b)
+        diff = (network_a ^ network_b) >> (self.max_length - length)
+        return length - diff.bit_length()
+
+    def insert(self, network, length, value):
+        node = self.root
+        while node.length != length:
+            bit = self._bit(network, node.length)
+            child = node.children[bit]
+            if child is None:
+                node.children[bit] = _Node(network, length, [value])
+                return
+
+            common = self._common_length(network, length, child.network, child.length)
+            if common >= child.length:
+                node = child
+                continue
+
+            # the new prefix diverges from the child, or is one of its parents
+            if common == length:
+                new = _Node(network, length, [value])
+            else:
+                new = _Node(self._mask(network, common), common)
+                new.children[self._bit(network, common)] = _Node(network, length, [value])
+            new.children[self._bit(child.network, common)] = child
+            node.children[bit] = new
+            return
+
+        node.values.append(value)
+
+    def remove(self, network, length, value):
+        """Remove a value stored at a prefix. Emptied nodes are kept, they are reused."""
+        for node in self._path(network, length):
+            if node.length == length:
+                node.values.remove(value)
+                return
+        raise KeyError((network, length))
+
+    def _path(self, network, length):
+        node = self.root
+        while node is not None and node.length <= length:
+            if self._common_length(network, length, node.network, node.length) < node.length:
+                return
+            yield node
+            if node.length == length:
+                return
+            node = node.children[self._bit(network, node.length)]
+
+    def covering(self, network, length):
+        """Yield the values stored at the prefixes containing, or equal to, network/length."""
+        for node in self._path(network, length):
+            yield from node.values
+
+    def covered(self, network, length):
+        """Yield the values stored at the prefixes inside, or equal to, network/length."""
+        node = self.root
+        while node is not None and node.length < length:
+            if self._common_length(network, length, node.network, node.length) < node.length:
+                return
+            node = node.children[self._bit(network, node.length)]
+        if node is None or self._common_length(network, length, node.network, node.length) < length:
+            return
+
+        nodes = [node]
+        while nodes:
+            node = nodes.pop()
+            yield from node.values
+            nodes.extend(child for child in node.children if child is not None)
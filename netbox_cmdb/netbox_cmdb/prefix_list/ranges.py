@@ -0,0 +1,56 @@
+"""Integer representation of prefix list terms.
+
+A term matches the prefixes inside its network whose length lies between a minimum and a
+maximum length. Networks are handled as integers, so that containment is a matter of integer
+comparisons.
+"""
+
+from typing import NamedTuple
+
+from netaddr import IPNetwork
+
+MAX_LENGTH = {4: 32, 6: 128}
+
+
+class TermRange(NamedTuple):
+    """The prefixes matched by a term: inside version/network/length, and whose length is
+    between min_length and max_length."""
+
+    version: int
+    network: int
+    length: int
+    min_length: int
+    max_length: int
+
+    @property
+    def last(self):
+        """The last address of the network."""
+        return self.network | ((1 << (MAX_LENGTH[self.version] - self.length)) - 1)
+
+    def matches(self, version, network, length):
+        """Return whether the prefix version/network/length is matched by the term."""
+        if version != self.version or not self.min_length <= length <= self.max_length:
+            return False
+        shift = MAX_LENGTH[version] - self.length
+        return network >> shift == self.network >> shift
+
+    def to_prefix(self):
+        return str(IPNetwork((self.network, self.length), version=self.version))
+
+
+def parse_prefix(prefix):
+    """Return the (version, network, length) of a prefix, host bits cleared."""
+    network = IPNetwork(prefix)
+    return network.version, network.first, network.prefixlen
+
+
+def term_range(prefix, ge=None, le=None):
+    """Return the range of prefixes matched by a term.
+
+    Without ge nor le, only the prefix itself is matched. With ge alone, lengths go up to the
+    maximum length of the IP version, and with le alone they start at the prefix length.
+    """
+    version, network, length = parse_prefix(prefix)
+    if ge is None and le is None:
+        return TermRange(version, network, length, length, length)
+    return TermRange(version, network, length, ge or length, le or MAX_LENGTH[version])
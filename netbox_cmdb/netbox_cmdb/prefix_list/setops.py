@@ -0,0 +1,128 @@
+"""Set operations on prefix lists: union, intersection and difference.
+
+A prefix list is the set of prefixes matched by its terms. Between two consecutive bounds of
+the ge/le ranges of the terms involved, called a length band, the same terms are active at every
+length, so the prefixes matched in a band are those inside a union of address intervals. The
+operations are computed band by band on sorted integer intervals, then turned back into terms
+and optimized.
+"""
+
+from netbox_cmdb.prefix_list.optimizer import interval_to_prefixes, optimize
+from netbox_cmdb.prefix_list.ranges import MAX_LENGTH, TermRange
+
+UNION = "union"
+INTERSECTION = "intersection"
+DIFFERENCE = "difference"
+
+
+def to_intervals(ranges):
+    """Return the sorted and disjoint address intervals covered by the networks of `ranges`."""
+    intervals = []
+    for term in sorted(ranges, key=lambda term: term.network):
+        if intervals and term.network <= intervals[-1][1] + 1:
+            intervals[-1][1] = max(intervals[-1][1], term.last)
+        else:
+            intervals.append([term.network, term.last])
+    return [tuple(interval) for interval in intervals]
+
+
+def union_intervals(a, b):
+    merged = []
+    for first, last in sorted(a + b):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    return [tuple(interval) for interval in merged]
+
+
+def intersect_intervals(a, b):
+    result = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        first, last = max(a[i][0], b[j][0]), min(a[i][1], b[j][1])
+        if first <= last:
+            result.append((first, last))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+
+def subtract_intervals(a, b):
+    result = []
+    j = 0
+    for first, last in a:
+        while j < len(b) and b[j][1] < first:
+            j += 1
+        k = j
+        while k < len(b) and b[k][0] <= last:
+            if b[k][0] > first:
+                result.append((first, b[k][0] - 1))
+            first = max(first, b[k][1] + 1)
+            k += 1
+        if first <= last:
+            result.append((first, last))
+    return result
+
+
+def union_all(interval_sets):
+    result = []
+    for intervals in interval_sets:
+        result = union_intervals(result, intervals)
+    return result
+
+
+OPERATIONS = {
+    UNION: union_intervals,
+    INTERSECTION: intersect_intervals,
+    DIFFERENCE: subtract_intervals,
+}
+
+
+def length_bands(range_sets):
+    """Return the (version, min_length, max_length) bands of lengths of the given ranges."""
+    bounds = {version: set() for version in MAX_LENGTH}
+    for ranges in range_sets:
+        for term in ranges:
+            bounds[term.version].update((term.min_length, term.max_length + 1))
+
+    bands = []
+    for version, version_bounds in bounds.items():
+        version_bounds = sorted(version_bounds)
+        for start, end in zip(version_bounds, version_bounds[1:]):
+            bands.append((version, start, end - 1))
+    return bands
+
+
+def combine(operation, range_sets):
+    """Return the optimized ranges of `operation` applied to the given sets of ranges, in order.
+
+    The difference is the prefixes of the first set matched by none of the others.
+    """
+    operator = OPERATIONS[operation]
+    result = []
+    for version, min_length, max_length in length_bands(range_sets):
+        band_intervals = [
+            to_intervals(
+                term
+                for term in ranges
+                if term.version == version
+                and term.min_length <= min_length
+                and max_length <= term.max_length
+            )
+            for ranges in range_sets
+        ]
+        if operation == DIFFERENCE:
+            intervals = operator(band_intervals[0], union_all(band_intervals[1:]))
+        else:
+            intervals = band_intervals[0]
+            for other in band_intervals[1:]:
+                intervals = operator(intervals, other)
+
+        # intervals are aligned on networks not longer than min_length, so are their prefixes
+        for first, last in intervals:
+            for network, length in interval_to_prefixes(first, last, MAX_LENGTH[version]):
+                result.append(TermRange(version, network, length, min_length, max_length))
+    return optimize(result)
@@ -0,0 +1,39 @@
+"""Pre-check of bulk deletions against the PROTECT foreign keys.
+
+Django's deletion collector looks for protecting objects one deleted object at a time, and only
+fails once it has walked all of them, with a ProtectedError. Here each relation protecting a
+model is queried once for all the objects to delete, which tells upfront which objects are
+blocked, and by what, so that they can be left out of the deletion.
+"""
+
+from django.db.models import PROTECT, Count
+
+
+def protecting_fields(model):
+    """Return the foreign keys protecting the objects of `model` from deletion."""
+    return [
+        relation.field
+        for relation in model._meta.related_objects
+        if getattr(relation, "on_delete", None) is PROTECT
+    ]
+
+
+def find_blockers(model, pks):
+    """Return the relations blocking the deletion of the objects of `model` with the given pks.
+
+    Blockers are listed by blocked pk, each as the model and field of the protecting objects, and
+    how many of them reference the object.
+    """
+    blockers = {}
+    for field in protecting_fields(model):
+        rows = (
+            field.model._base_manager.filter(**{f"{field.attname}__in": pks})
+            .order_by()
+            .values_list(field.attname)
+            .annotate(count=Count("pk"))
+        )
+        for pk, count in rows:
+            blockers.setdefault(pk, []).append(
+                {"model": field.model._meta.label_lower, "field": field.name, "count": count}
+            )
+    return blockers
@@ -0,0 +1 @@
+"""Route policy engines: evaluation of routes against compiled policies."""
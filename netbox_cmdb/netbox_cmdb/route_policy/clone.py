@@ -0,0 +1,173 @@
+"""Cloning of a route policy to devices, with the prefix lists and BGP community lists it matches.
+
+Lists are device-scoped, so each target device gets its own copy of the lists, and the terms of
+its route policy are rewired to them. Shared lists are not copied: the copies of the lists keep
+referencing their shared definition, and the terms matching a shared list directly keep matching
+it. The source objects are read once, then each model is inserted with a single bulk_create for
+all the devices, in one transaction: cloning to hundreds of devices takes the same number of
+queries as cloning to one.
+
+bulk_create sends no signal, so the generations of the devices, the outbox events, the changelog
+and the prefix list index are updated explicitly, once for all the created objects.
+"""
+
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+
+from netbox_cmdb.changelog import log_creations
+from netbox_cmdb.models.bgp_community_list import BGPCommunityList, BGPCommunityListTerm
+from netbox_cmdb.models.prefix_list import PrefixList, PrefixListTerm
+from netbox_cmdb.models.route_policy import RoutePolicy, RoutePolicyTerm
+from netbox_cmdb.outbox import record_creations
+from netbox_cmdb.prefix_list.index import prefix_lists_changed
+from netbox_cmdb.signals import devices_changed
+
+BATCH_SIZE = 1000
+
+
+def _copy(obj, **values):
+    """Return an unsaved copy of `obj`, with the given field values by attname."""
+    model = type(obj)
+    fields = {
+        field.attname: getattr(obj, field.attname)
+        for field in model._meta.concrete_fields
+        if not field.primary_key
+    }
+    fields.update(values)
+    return model(**fields)
+
+
+def _clone(model, objects, devices, **values):
+    """Create a copy of each object on each device, returned by (object pk, device pk)."""
+    clones = {}
+    for obj in objects:
+        for device in devices:
+            clone = _copy(obj, **values)
+            clone.device = device
+            clones[obj.pk, device.pk] = clone
+    model.objects.bulk_create(clones.values(), batch_size=BATCH_SIZE)
+    return clones
+
+
+def _clone_terms(model, terms, parent_field, parents, devices):
+    """Create a copy of each term in the copy of its parent on each device, and return them."""
+    return model.objects.bulk_create(
+        [
+            _copy(term, **{parent_field: parents[getattr(term, parent_field), device.pk].pk})
+            for term in terms
+            for device in devices
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+
+def _clone_of(clones, pk, device):
+    return clones[pk, device.pk].pk if (pk, device.pk) in clones else pk
+
+
+def _check_permissions(user, clones):
+    """Raise ObjectDoesNotExist unless `user` is allowed to add all the `clones`, of any model."""
+    for model, objects in clones.items():
+        pks = [obj.pk for obj in objects.values()]
+        if model.objects.restrict(user, "add").filter(pk__in=pks).count() != len(pks):
+            raise ObjectDoesNotExist()
+
+
+def _conflicts(model, names, devices):
+    return [
+        f"{model._meta.verbose_name} {name} already exists on {device}"
+        for device, name in model.objects.filter(device__in=devices, name__in=names)
+        .order_by("device__name", "name")
+        .values_list("device__name", "name")
+    ]
+
+
+def clone_route_policy(route_policy, devices, name=None, user=None):
+    """Clone `route_policy` and the lists its terms match to each of `devices`.
+
+    The clones keep the names of the source objects, but the route policy can be renamed. Return
+    the clones of the route policy, in the order of the devices. Raise ValueError when a name is
+    already used on a target device. When `user` is given, raise ObjectDoesNotExist, and create
+    nothing, unless its object permissions allow adding all the clones.
+    """
+    terms = list(RoutePolicyTerm.objects.filter(route_policy=route_policy).order_by("sequence"))
+    # shared lists are used by the clones as they are
+    prefix_lists = list(
+        PrefixList.objects.filter(
+            pk__in={term.from_prefix_list_id for term in terms} - {None}, device__isnull=False
+        )
+    )
+    community_lists = list(
+        BGPCommunityList.objects.filter(
+            pk__in={term.from_bgp_community_list_id for term in terms} - {None},
+            device__isnull=False,
+        )
+    )
+
+    name = name or route_policy.name
+    conflicts = (
+        _conflicts(RoutePolicy, [name], devices)
+        + _conflicts(PrefixList, [pl.name for pl in prefix_lists], devices)
+        + _conflicts(BGPCommunityList, [cl.name for cl in community_lists], devices)
+    )
+    if conflicts:
+        raise ValueError(", ".join(conflicts))
+
+    with transaction.atomic():
+        prefix_list_clones = _clone(PrefixList, prefix_lists, devices)
+        prefix_list_terms = _clone_terms(
+            PrefixListTerm,
+            PrefixListTerm.objects.filter(prefix_list__in=prefix_lists),
+            "prefix_list_id",
+            prefix_list_clones,
+            devices,
+        )
+        community_list_clones = _clone(BGPCommunityList, community_lists, devices)
+        community_list_terms = _clone_terms(
+            BGPCommunityListTerm,
+            BGPCommunityListTerm.objects.filter(bgp_community_list__in=community_lists),
+            "bgp_community_list_id",
+            community_list_clones,
+            devices,
+        )
+
+        policy_clones = _clone(RoutePolicy, [route_policy], devices, name=name)
+        policy_terms = RoutePolicyTerm.objects.bulk_create(
+            [
+                _copy(
+                    term,
+                    route_policy_id=policy_clones[route_policy.pk, device.pk].pk,
+                    from_prefix_list_id=_clone_of(
+                        prefix_list_clones, term.from_prefix_list_id, device
+                    ),
+                    from_bgp_community_list_id=_clone_of(
+                        community_list_clones, term.from_bgp_community_list_id, device
+                    ),
+                )
+                for term in terms
+                for device in devices
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+        if user is not None:
+            _check_permissions(
+                user,
+                {
+                    RoutePolicy: policy_clones,
+                    PrefixList: prefix_list_clones,
+                    BGPCommunityList: community_list_clones,
+                },
+            )
+
+        devices_changed([device.pk for device in devices])
+        clones = [
+            *policy_clones.values(),
+            *prefix_list_clones.values(),
+            *community_list_clones.values(),
+        ]
+        record_creations(clones)
+        log_creations([*clones, *policy_terms, *prefix_list_terms, *community_list_terms])
+        prefix_lists_changed({prefix_list.pk for prefix_list in prefix_list_clones.values()})
+
+    return [policy_clones[route_policy.pk, device.pk] for device in devices]
@@ -0,0 +1,207 @@
+"""Route policy evaluator.
+
+A route policy is compiled into a program: its terms by sequence, each with the conditions built
+from its from_* fields and the actions of its set_* fields. The referenced prefix lists are
+compiled into radix trees and the community lists into community matchers. A route is evaluated
+by the first term whose conditions all match; a route matched by no term is denied.
+
+Compiled policies are cached per process, by policy and generation of its device: any change of
+the policy, its terms or the lists it references bumps the generation, so that a stale program
+is never used again.
+"""
+
+from typing import NamedTuple, Tuple
+
+from netbox_cmdb.bgp_community_list.matcher import CommunityMatcher, get_community_matchers
+from netbox_cmdb.choices import DecisionChoice
+from netbox_cmdb.compiled import CompiledCache
+from netbox_cmdb.models.prefix_list import PrefixList, PrefixListTerm
+from netbox_cmdb.models.route_policy import RoutePolicy, RoutePolicyTerm
+from netbox_cmdb.prefix_list.radix import RadixTree
+from netbox_cmdb.prefix_list.ranges import MAX_LENGTH, parse_prefix, term_range
+from netbox_cmdb.shared import term_sources
+
+
+class Route(NamedTuple):
+    prefix: str
+    communities: Tuple[str, ...] = ()
+    large_communities: Tuple[str, ...] = ()
+    local_pref: int = None
+    metric: int = None
+    origin: str = None
+    source_protocol: str = "bgp"
+    route_type: str = None
+    as_path: Tuple[int, ...] = ()
+    next_hop: str = None
+
+
+class Result(NamedTuple):
+    decision: str
+    # the sequence of the matching term, None when no term matched
+    sequence: int
+    route: Route
+
+
+def split_communities(value):
+    """Return the communities of a set_community or set_large_community value."""
+    return tuple(value.replace(",", " ").split())
+
+
+class PrefixListMatcher:
+    """The terms of a prefix list, in radix trees."""
+
+    def __init__(self, terms):
+        self.ranges = [term_range(prefix, ge, le) for prefix, ge, le in terms]
+        self.trees = {version: RadixTree(max_length) for version, max_length in MAX_LENGTH.items()}
+        for version, network, length, min_length, max_length in self.ranges:
+            self.trees[version].insert(network, length, (min_length, max_length))
+
+    def match(self, version, network, length):
+        return any(
+            min_length <= length <= max_length
+            for min_length, max_length in self.trees[version].covering(network, length)
+        )
+
+
+def _match_communities(matcher, route, prefix):
+    # community expressions match standard, extended and large communities alike
+    return matcher.match_any(route.communities) or matcher.match_any(route.large_communities)
+
+
+# conditions on the prefix and communities; the other conditions compare a field of the route
+CONDITIONS = {
+    "prefix_list": lambda matcher, route, prefix: matcher.match(*prefix),
+    "community_list": _match_communities,
+    "community": _match_communities,
+}
+
+
+class CompiledTerm(NamedTuple):
+    sequence: int
+    decision: str
+    # values of the conditions the term matches on, and of the route fields it sets
+    matches: dict
+    actions: dict
+
+    def match(self, route, prefix):
+        for condition, value in self.matches.items():
+            if condition in CONDITIONS:
+                if not CONDITIONS[condition](value, route, prefix):
+                    return False
+            elif getattr(route, condition) != value:
+                return False
+        return True
+
+
+class CompiledPolicy:
+    """The program of a route policy."""
+
+    def __init__(self, terms):
+        self.terms = terms
+
+    def evaluate(self, route):
+        """Return the Result of `route`, with the actions of the matching term applied."""
+        prefix = parse_prefix(route.prefix)
+        for term in self.terms:
+            if term.match(route, prefix):
+                if term.decision == DecisionChoice.PERMIT:
+                    route = apply_actions(route, term.actions)
+                return Result(term.decision, term.sequence, route)
+        return Result(DecisionChoice.DENY, None, route)
+
+
+def apply_actions(route, actions):
+    """Return `route` with the actions of a term applied."""
+    changes = {field: value for field, value in actions.items() if field != "as_path_prepend"}
+    if "as_path_prepend" in actions:
+        changes["as_path"] = actions["as_path_prepend"] + tuple(route.as_path)
+    return route._replace(**changes)
+
+
+def _matches(term, prefix_lists, community_lists):
+    matches = {}
+    if term.from_prefix_list_id is not None:
+        matches["prefix_list"] = prefix_lists[term.from_prefix_list_id]
+    if term.from_bgp_community_list_id is not None:
+        matches["community_list"] = community_lists[term.from_bgp_community_list_id]
+    if term.from_bgp_community:
+        matches["community"] = CommunityMatcher([term.from_bgp_community])
+    if term.from_source_protocol:
+        matches["source_protocol"] = term.from_source_protocol
+    if term.from_route_type:
+        matches["route_type"] = term.from_route_type
+    if term.from_local_pref is not None:
+        matches["local_pref"] = term.from_local_pref
+    return matches
+
+
+def _actions(term):
+    actions = {}
+    if term.set_local_pref is not None:
+        actions["local_pref"] = term.set_local_pref
+    if term.set_metric is not None:
+        actions["metric"] = term.set_metric
+    if term.set_origin:
+        actions["origin"] = term.set_origin
+    if term.set_community:
+        actions["communities"] = split_communities(term.set_community)
+    if term.set_large_community:
+        actions["large_communities"] = split_communities(term.set_large_community)
+    if term.set_next_hop:
+        actions["next_hop"] = str(term.set_next_hop)
+    if term.set_as_path_prepend_asn is not None:
+        repeat = term.set_as_path_prepend_repeat or 1
+        actions["as_path_prepend"] = (term.set_as_path_prepend_asn.number,) * repeat
+    return actions
+
+
+def compile_policy(route_policy_id):
+    """Compile a route policy, in a query for its terms and a few per kind of referenced list."""
+    return compile_terms(
+        RoutePolicyTerm.objects.filter(route_policy_id=route_policy_id).select_related(
+            "set_as_path_prepend_asn"
+        )
+    )
+
+
+def compile_terms(terms):
+    """Compile route policy terms, saved or not, such as the terms of an update to preview."""
+    terms = sorted(terms, key=lambda term: term.sequence)
+
+    # prefix lists without terms of their own use the terms of their shared definition
+    sources = term_sources(PrefixList, {term.from_prefix_list_id for term in terms} - {None})
+    rows = {source: [] for source in sources.values()}
+    for prefix_list_id, prefix, ge, le in PrefixListTerm.objects.filter(
+        prefix_list_id__in=rows
+    ).values_list("prefix_list_id", "prefix", "ge", "le"):
+        rows[prefix_list_id].append((prefix, ge, le))
+    matchers = {pk: PrefixListMatcher(prefix_list) for pk, prefix_list in rows.items()}
+    prefix_lists = {pk: matchers[source] for pk, source in sources.items()}
+
+    community_lists = get_community_matchers(
+        {term.from_bgp_community_list_id for term in terms} - {None}
+    )
+
+    return CompiledPolicy(
+        [
+            CompiledTerm(
+                term.sequence,
+                term.decision,
+                _matches(term, prefix_lists, community_lists),
+                _actions(term),
+            )
+            for term in terms
+        ]
+    )
+
+
+def compile_policies(route_policy_ids):
+    return {pk: compile_policy(pk) for pk in route_policy_ids}
+
+
+_cache = CompiledCache(RoutePolicy, compile_policies, "route_policy_cache_size")
+
+
+def get_policy(route_policy_id):
+    """Return the compiled route policy, from the cache of the process when it is current."""
+    return _cache.get(route_policy_id)
@@ -0,0 +1,318 @@
+"""Batch simulation of a route policy over a full routing table.
+
+Routes are read as columns, from a CSV or an Arrow file whose columns are named after the
+fields of Route. Communities and AS paths are lists, or strings of space separated values.
+
+With NumPy, each condition of a term is evaluated on all the routes at once:
+- prefixes become integer arrays, the 64 first bits for IPv6,
+- a prefix list becomes, for each prefix length, sorted intervals of addresses in which the
+  routes are looked up with a binary search,
+- communities are numbered and a community matcher runs once per distinct community, so that a
+  community list is a lookup in a boolean array.
+Without NumPy, routes are evaluated one by one by the compiled policy.
+"""
+
+import csv
+import io
+import socket
+
+from netbox_cmdb.choices import DecisionChoice
+from netbox_cmdb.prefix_list.ranges import MAX_LENGTH
+from netbox_cmdb.prefix_list.setops import to_intervals
+from netbox_cmdb.route_policy.evaluator import Route
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+LIST_FIELDS = ("communities", "large_communities", "as_path")
+INTEGER_FIELDS = ("local_pref", "metric")
+
+# IPv6 prefixes are compared on their 64 first bits, longer ones are matched one by one
+KEY_LENGTH = 64
+
+
+def read_routes(file, file_format="csv"):
+    """Return the columns of the routes of a binary file, by field name."""
+    if file_format == "arrow":
+        try:
+            from pyarrow import feather
+        except ImportError:
+            raise ImportError("reading Arrow files requires pyarrow")
+        return feather.read_table(file).to_pydict()
+
+    columns = {}
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8"))
+    for field in reader.fieldnames or []:
+        if field in Route._fields:
+            columns[field] = []
+    for row in reader:
+        for field, values in columns.items():
+            values.append(row[field])
+    return columns
+
+
+def _normalize(field, value):
+    if field in LIST_FIELDS:
+        if not value:
+            value = ()
+        elif isinstance(value, str):
+            value = value.split()
+        if field == "as_path":
+            return tuple(int(asn) for asn in value)
+        return tuple(dict.fromkeys(value))
+    if value in ("", None):
+        return Route._field_defaults.get(field)
+    if field in INTEGER_FIELDS:
+        return int(value)
+    return value
+
+
+def normalize_columns(columns):
+    """Return the columns of all the fields of Route, with values of the types of Route."""
+    if "prefix" not in columns:
+        raise ValueError("the routes have no prefix column")
+
+    count = len(columns["prefix"])
+    normalized = {}
+    for field in Route._fields:
+        if field in columns:
+            normalized[field] = [_normalize(field, value) for value in columns[field]]
+        else:
+            normalized[field] = [_normalize(field, None)] * count
+    return normalized
+
+
+def route_at(columns, index):
+    return Route(*(columns[field][index] for field in Route._fields))
+
+
+class RouteTable:
+    """Normalized route columns, as NumPy arrays."""
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.count = len(columns["prefix"])
+        self._parse_prefixes()
+        self.local_pref = np.array(
+            [-1 if value is None else value for value in columns["local_pref"]], dtype=np.int64
+        )
+        self.metric = np.array(
+            [-1 if value is None else value for value in columns["metric"]], dtype=np.int64
+        )
+        for field in ("origin", "source_protocol", "route_type", "next_hop"):
+            setattr(self, field, np.array(columns[field], dtype=object))
+        self._communities = {}
+        self._prefix_lists = {}
+
+    def _parse_prefixes(self):
+        self.versions = np.empty(self.count, dtype=np.uint8)
+        self.keys = np.empty(self.count, dtype=np.uint64)
+        self.lengths = np.empty(self.count, dtype=np.uint8)
+        # (index, version, network, length) of the prefixes too long for their key
+        self.long_prefixes = []
+
+        for index, prefix in enumerate(self.columns["prefix"]):
+            address, _, length = prefix.partition("/")
+            version = 6 if ":" in address else 4
+            packed = socket.inet_pton(socket.AF_INET6 if version == 6 else socket.AF_INET, address)
+            max_length = MAX_LENGTH[version]
+            length = int(length) if length else max_length
+            shift = max_length - length
+            network = int.from_bytes(packed, "big") >> shift << shift
+
+            self.versions[index] = version
+            self.lengths[index] = length
+            if version == 6:
+                self.keys[index] = network >> (max_length - KEY_LENGTH)
+                if length > KEY_LENGTH:
+                    self.long_prefixes.append((index, version, network, length))
+            else:
+                self.keys[index] = network
+
+    def _key_shift(self, version):
+        return MAX_LENGTH[version] - KEY_LENGTH if version == 6 else 0
+
+    def prefix_list(self, matcher):
+        """Return which routes are matched by a prefix list."""
+        if id(matcher) in self._prefix_lists:
+            return self._prefix_lists[id(matcher)]
+
+        matched = np.zeros(self.count, dtype=bool)
+        for version in MAX_LENGTH:
+            ranges = [term for term in matcher.ranges if term.version == version]
+            if not ranges:
+                continue
+            shift = self._key_shift(version)
+            of_version = self.versions == version
+            for length in np.unique(self.lengths[of_version]).tolist():
+                if version == 6 and length > KEY_LENGTH:
+                    continue
+                intervals = to_intervals(
+                    term for term in ranges if term.min_length <= length <= term.max_length
+                )
+                if not intervals:
+                    continue
+                starts = np.array([first >> shift for first, _ in intervals], dtype=np.uint64)
+                ends = np.array([last >> shift for _, last in intervals], dtype=np.uint64)
+
+                selected = np.flatnonzero(of_version & (self.lengths == length))
+                keys = self.keys[selected]
+                positions = np.searchsorted(starts, keys, side="right") - 1
+                inside = positions >= 0
+                inside[inside] = keys[inside] <= ends[positions[inside]]
+                matched[selected[inside]] = True
+
+        for index, version, network, length in self.long_prefixes:
+            matched[index] = matcher.match(version, network, length)
+
+        self._prefix_lists[id(matcher)] = matched
+        return matched
+
+    def communities(self, field):
+        """Return the (vocabulary, route index, community number) of a community column."""
+        if field not in self._communities:
+            vocabulary, routes, numbers = {}, [], []
+            for index, communities in enumerate(self.columns[field]):
+                for community in communities:
+                    routes.append(index)
+                    numbers.append(vocabulary.setdefault(community, len(vocabulary)))
+            self._communities[field] = (
+                vocabulary,
+                np.array(routes, dtype=np.int64),
+                np.array(numbers, dtype=np.int64),
+            )
+        return self._communities[field]
+
+    def count_communities(self, field, wanted):
+        """Return, for each route, how many of its communities are `wanted`, a predicate."""
+        vocabulary, routes, numbers = self.communities(field)
+        wanted = np.fromiter(map(wanted, vocabulary), dtype=bool, count=len(vocabulary))
+        return np.bincount(routes[wanted[numbers]], minlength=self.count)
+
+    def match(self, condition, value):
+        """Return which routes match a condition of a term."""
+        if condition == "prefix_list":
+            return self.prefix_list(value)
+        if condition in ("community_list", "community"):
+            # like the evaluator, community expressions also match the large communities
+            return (self.count_communities("communities", value.match) > 0) | (
+                self.count_communities("large_communities", value.match) > 0
+            )
+        return getattr(self, condition) == value
+
+    def changed(self, actions):
+        """Return which routes are modified by the actions of a term."""
+        changed = np.zeros(self.count, dtype=bool)
+        for field, value in actions.items():
+            if field == "as_path_prepend":
+                changed[:] = bool(value)
+            elif field in ("communities", "large_communities"):
+                wanted = set(value)
+                _, routes, _ = self.communities(field)
+                counts = np.bincount(routes, minlength=self.count)
+                changed |= (counts != len(wanted)) | (
+                    self.count_communities(field, wanted.__contains__) != len(wanted)
+                )
+            else:
+                changed |= getattr(self, field) != value
+        return changed
+
+
+def _report(policy, hits, modified, unmatched, count, samples):
+    terms = [
+        {
+            "sequence": term.sequence,
+            "decision": term.decision,
+            "hits": hits[index],
+            "modified": modified[index],
+        }
+        for index, term in enumerate(policy.terms)
+    ]
+    accepted = sum(term["hits"] for term in terms if term["decision"] == DecisionChoice.PERMIT)
+    return {
+        "routes": count,
+        "accepted": accepted,
+        "rejected": count - accepted,
+        "modified": sum(modified),
+        "unmatched": unmatched,
+        "terms": terms,
+        "samples": samples,
+    }
+
+
+def _sample(policy, columns, indexes):
+    samples = []
+    for index in indexes:
+        route = route_at(columns, index)
+        decision, sequence, result = policy.evaluate(route)
+        samples.append({"sequence": sequence, "before": route._asdict(), "after": result._asdict()})
+    return samples
+
+
+def simulate_vectorized(policy, columns, sample_size=10):
+    table = RouteTable(columns)
+    remaining = np.ones(table.count, dtype=bool)
+    changed = np.zeros(table.count, dtype=bool)
+    hits, modified = [], []
+    for term in policy.terms:
+        hit = remaining.copy()
+        for condition, value in term.matches.items():
+            if not hit.any():
+                break
+            hit &= table.match(condition, value)
+        remaining &= ~hit
+
+        term_modified = np.zeros(table.count, dtype=bool)
+        if term.decision == DecisionChoice.PERMIT and term.actions:
+            term_modified = hit & table.changed(term.actions)
+        changed |= term_modified
+        hits.append(int(hit.sum()))
+        modified.append(int(term_modified.sum()))
+
+    samples = _sample(policy, columns, np.flatnonzero(changed)[:sample_size].tolist())
+    return _report(policy, hits, modified, int(remaining.sum()), table.count, samples)
+
+
+def simulate_iterative(policy, columns, sample_size=10):
+    count = len(columns["prefix"])
+    positions = {term.sequence: position for position, term in enumerate(policy.terms)}
+    hits, modified = [0] * len(policy.terms), [0] * len(policy.terms)
+    unmatched, changed = 0, []
+    for index in range(count):
+        route = route_at(columns, index)
+        decision, sequence, result = policy.evaluate(route)
+        if sequence is None:
+            unmatched += 1
+            continue
+        hits[positions[sequence]] += 1
+        if decision == DecisionChoice.PERMIT and _is_modified(route, result):
+            modified[positions[sequence]] += 1
+            changed.append(index)
+
+    samples = _sample(policy, columns, changed[:sample_size])
+    return _report(policy, hits, modified, unmatched, count, samples)
+
+
+def _is_modified(route, result):
+    return any(
+        (
+            set(getattr(route, field)) != set(getattr(result, field))
+            if field in ("communities", "large_communities")
+            else getattr(route, field) != getattr(result, field)
+        )
+        for field in Route._fields
+    )
+
+
+def simulate(policy, columns, sample_size=10):
+    """Run the routes of `columns` through a compiled policy.
+
+    Returns the accepted, rejected and modified route counts, the hits and modifications per
+    term, and a sample of modified routes before and after the policy.
+    """
+    columns = normalize_columns(columns)
+    if np is None:
+        return simulate_iterative(policy, columns, sample_size)
+    return simulate_vectorized(policy, columns, sample_size)
@@ -0,0 +1,67 @@
+"""Resolution of the terms of lists referencing a shared definition.
+
+The terms of a shared prefix list or community list are stored once. A device list referencing
+it uses them while it has no term of its own, so the list whose terms apply is resolved for many
+lists at once, in a single query.
+"""
+
+from django.db.models import Exists, OuterRef
+
+from netbox_cmdb.models.bgp_community_list import BGPCommunityList, BGPCommunityListTerm
+from netbox_cmdb.models.prefix_list import PrefixList, PrefixListTerm
+from netbox_cmdb.models.route_policy import RoutePolicy
+
+# the terms of each kind of list, their foreign key to it, and the field of route policy terms
+# matching it
+LIST_TERMS = {
+    PrefixList: (PrefixListTerm, "prefix_list", "from_prefix_list"),
+    BGPCommunityList: (BGPCommunityListTerm, "bgp_community_list", "from_bgp_community_list"),
+}
+
+
+def _own_terms(model):
+    term_model, list_field, _ = LIST_TERMS[model]
+    return Exists(term_model.objects.filter(**{list_field: OuterRef("pk")}))
+
+
+def term_sources(model, list_ids):
+    """Return, by list id, the id of the list whose terms apply to it."""
+    rows = (
+        model.objects.filter(pk__in=list_ids)
+        .annotate(own_terms=_own_terms(model))
+        .values_list("pk", "definition_id", "own_terms")
+    )
+    return {
+        pk: definition_id if definition_id is not None and not own_terms else pk
+        for pk, definition_id, own_terms in rows
+    }
+
+
+def inheriting(model, definition_ids):
+    """Return, by id, the lists using the terms of one of the given definitions."""
+    return dict(
+        model.objects.filter(definition__in=definition_ids)
+        .annotate(own_terms=_own_terms(model))
+        .filter(own_terms=False)
+        .values_list("pk", "definition_id")
+    )
+
+
+def devices_using_query(model, list_ids):
+    """Return a query of the ids of the devices using one of the given shared lists.
+
+    They own the lists referencing them, or the route policies matching them directly.
+    """
+    _, _, term_field = LIST_TERMS[model]
+    referencing = model.objects.filter(definition__in=list_ids).order_by().values_list("device_id")
+    matching = (
+        RoutePolicy.objects.filter(**{f"route_policy_term__{term_field}__in": list_ids})
+        .order_by()
+        .values_list("device_id")
+    )
+    return referencing.union(matching)
+
+
+def devices_using(model, list_ids):
+    """Return the ids of the devices using one of the given shared lists."""
+    return {device_id for device_id, in devices_using_query(model, list_ids)}
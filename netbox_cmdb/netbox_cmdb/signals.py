@@ -1,6 +1,18 @@
-from django.db.models.signals import post_delete
+from dcim.models import Device
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
 from django.dispatch import receiver
+from netbox_cmdb.choices import OutboxActionChoices
 from netbox_cmdb.models.bgp import BGPSession
+from netbox_cmdb.models.device_generation import DeviceGeneration
+from netbox_cmdb.models.interface import LogicalInterface
+from netbox_cmdb.models.prefix_list import PrefixListTerm
+from netbox_cmdb.notifications import notify_devices
+from netbox_cmdb.outbox import get_tracked_models, record_change
+from netbox_cmdb.prefix_list.index import prefix_lists_changed
+from netbox_cmdb.shared import LIST_TERMS, devices_using, devices_using_query
+from netbox_cmdb.tracking import DEVICE_PATHS, get_device_id, get_stored_device_id
+from netbox_cmdb.transactions import CommitBatch
 
 
 @receiver(post_delete, sender=BGPSession)
@@ -12,3 +24,100 @@ def clean_device_bgp_sessions(sender, instance, **kwargs):
     if instance.peer_b:
         b = instance.peer_b
         b.delete()
+
+
+def devices_changed(device_ids):
+    device_ids = set(device_ids) - {None}
+    if not device_ids:
+        return
+    DeviceGeneration.bump(device_ids)
+    notify_devices(device_ids)
+
+
+def remember_stored_device(sender, instance, **kwargs):
+    instance._cmdb_stored_device_id = get_stored_device_id(instance)
+
+
+def bump_device_generation(sender, instance, **kwargs):
+    devices_changed({get_device_id(instance), getattr(instance, "_cmdb_stored_device_id", None)})
+
+
+for model in DEVICE_PATHS:
+    pre_save.connect(remember_stored_device, sender=model)
+    post_save.connect(bump_device_generation, sender=model)
+    post_delete.connect(bump_device_generation, sender=model)
+
+
+def record_saved_object(sender, instance, created, **kwargs):
+    record_change(instance, OutboxActionChoices.CREATED if created else OutboxActionChoices.UPDATED)
+
+
+def record_deleted_object(sender, instance, **kwargs):
+    record_change(instance, OutboxActionChoices.DELETED)
+
+
+for model in get_tracked_models():
+    post_save.connect(record_saved_object, sender=model)
+    post_delete.connect(record_deleted_object, sender=model)
+
+
+@receiver([post_save, post_delete], sender=PrefixListTerm)
+def update_prefix_list_index(sender, instance, **kwargs):
+    prefix_lists_changed({instance.prefix_list_id})
+
+
+def _track_shared_lists(model, term_model, list_field):
+    """Bump the devices using the shared lists changed, in the transaction of the change."""
+
+    def notify(list_ids):
+        notify_devices(devices_using(model, list_ids) - {None})
+
+    changed = CommitBatch(notify)
+
+    def shared_list_changed(list_id):
+        # a single statement, whatever the number of devices: the generations move with the
+        # change, the notifications are published once the transaction commits
+        DeviceGeneration.bump_selected(devices_using_query(model, [list_id]))
+        changed.add({list_id})
+
+    def collect_list(sender, instance, **kwargs):
+        if instance.is_shared:
+            shared_list_changed(instance.pk)
+
+    def collect_term(sender, instance, **kwargs):
+        try:
+            # already loaded by the generation bump of the term's own device
+            parent = getattr(instance, list_field)
+        except ObjectDoesNotExist:
+            return
+        if parent.is_shared:
+            shared_list_changed(parent.pk)
+
+    for signal in (post_save, post_delete):
+        signal.connect(collect_list, sender=model, weak=False)
+        signal.connect(collect_term, sender=term_model, weak=False)
+
+
+# a shared list has no device, its changes are tracked on the devices using it
+for model, (term_model, list_field, _) in LIST_TERMS.items():
+    _track_shared_lists(model, term_model, list_field)
+
+
+@receiver(m2m_changed, sender=LogicalInterface.tagged_vlans.through)
+def bump_logical_interface_vlans(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        devices_changed({get_device_id(instance)})
+        record_change(instance, OutboxActionChoices.UPDATED)
+    elif pk_set:
+        logical_interfaces = LogicalInterface.objects.filter(pk__in=pk_set)
+        devices_changed(logical_interfaces.values_list("parent_interface__device_id", flat=True))
+        for logical_interface in logical_interfaces:
+            record_change(logical_interface, OutboxActionChoices.UPDATED)
+
+
+@receiver(post_delete, sender=Device)
+def clean_device_generation(sender, instance, **kwargs):
+    DeviceGeneration.objects.filter(device_id=instance.pk).delete()
@@ -0,0 +1,81 @@
+from dcim.models import Interface
+from dcim.models.devices import Device, DeviceRole, DeviceType, Manufacturer
+from dcim.models.sites import Site
+from django.test import TestCase
+from ipam.models.ip import IPAddress
+
+from netbox_cmdb.bgp.audit import (
+    AFI_SAFI_MISMATCH,
+    LOCAL_ADDRESS_NOT_ON_DEVICE,
+    REMOTE_ASN_MISMATCH,
+    audit_sessions,
+)
+from netbox_cmdb.models.bgp import ASN, AfiSafi, BGPPeerGroup, BGPSession, DeviceBGPSession
+
+
+class BGPSessionAuditTestCase(TestCase):
+    def setUp(self):
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        device1 = Device.objects.create(
+            name="router-test1", device_role=device_role, device_type=device_type, site=site
+        )
+        device2 = Device.objects.create(
+            name="router-test2", device_role=device_role, device_type=device_type, site=site
+        )
+        interface = Interface.objects.create(device=device1, name="eth0", type="1000base-t")
+        asn1 = ASN.objects.create(number=65001, organization_name="router-test1")
+        asn2 = ASN.objects.create(number=65002, organization_name="router-test2")
+        asn3 = ASN.objects.create(number=65003, organization_name="other")
+
+        # the peer group of peer A expects the wrong remote ASN
+        peer_group = BGPPeerGroup.objects.create(name="PG-TEST", device=device1, remote_asn=asn3)
+        peer_a = DeviceBGPSession.objects.create(
+            device=device1,
+            local_asn=asn1,
+            local_address=IPAddress.objects.create(
+                address="10.0.0.1/31", assigned_object=interface
+            ),
+            peer_group=peer_group,
+        )
+        # the local address of peer B is assigned to no interface
+        peer_b = DeviceBGPSession.objects.create(
+            device=device2,
+            local_asn=asn2,
+            local_address=IPAddress.objects.create(address="10.0.0.0/31"),
+        )
+        self.bgp_session = BGPSession.objects.create(peer_a=peer_a, peer_b=peer_b)
+        # an AFI/SAFI configured on peer A only
+        for peer, afi_safi_names in (
+            (peer_a, ["ipv4-unicast", "ipv6-unicast"]),
+            (peer_b, ["ipv4-unicast"]),
+        ):
+            for afi_safi_name in afi_safi_names:
+                AfiSafi.objects.create(device_bgp_session=peer, afi_safi_name=afi_safi_name)
+
+    def test_audit(self):
+        findings = audit_sessions()
+
+        assert [(finding.bgp_session, finding.peer, finding.kind) for finding in findings] == [
+            (self.bgp_session.pk, "peer_a", AFI_SAFI_MISMATCH),
+            (self.bgp_session.pk, "peer_a", REMOTE_ASN_MISMATCH),
+            (self.bgp_session.pk, "peer_b", LOCAL_ADDRESS_NOT_ON_DEVICE),
+        ]
+        assert findings[0].detail == "ipv6-unicast is not configured on peer_b"
+        assert findings[1].device == "router-test1"
+        assert "65003" in findings[1].detail and "65002" in findings[1].detail
+
+    def test_audit_checks(self):
+        with self.assertNumQueries(2):
+            findings = audit_sessions(checks=[AFI_SAFI_MISMATCH])
+        assert [finding.kind for finding in findings] == [AFI_SAFI_MISMATCH]
+
+    def test_consistent_session(self):
+        AfiSafi.objects.create(
+            device_bgp_session=self.bgp_session.peer_b, afi_safi_name="ipv6-unicast"
+        )
+        assert audit_sessions(checks=[AFI_SAFI_MISMATCH]) == []
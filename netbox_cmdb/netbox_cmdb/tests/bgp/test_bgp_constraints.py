@@ -0,0 +1,88 @@
+from dcim.models.devices import Device, DeviceRole, DeviceType, Manufacturer
+from dcim.models.sites import Site
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from ipam.models.ip import IPAddress
+
+from netbox_cmdb.models.bgp import ASN, AfiSafi, BGPPeerGroup, DeviceBGPSession
+from netbox_cmdb.models.prefix_list import PrefixList
+from netbox_cmdb.models.route_policy import RoutePolicy, RoutePolicyTerm
+
+
+class DeviceConsistencyConstraintsTestCase(TestCase):
+    def setUp(self):
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        self.device1 = Device.objects.create(
+            name="router-test1", device_role=device_role, device_type=device_type, site=site
+        )
+        self.device2 = Device.objects.create(
+            name="router-test2", device_role=device_role, device_type=device_type, site=site
+        )
+        self.asn = ASN.objects.create(number=65001, organization_name="router-test1")
+
+        self.route_policy = RoutePolicy.objects.create(name="RP-TEST", device=self.device1)
+        self.peer_group = BGPPeerGroup.objects.create(name="PG-TEST", device=self.device1)
+        self.prefix_list = PrefixList.objects.create(name="PL-TEST", device=self.device1)
+        self.session = DeviceBGPSession.objects.create(
+            device=self.device1,
+            local_asn=self.asn,
+            local_address=IPAddress.objects.create(address="10.0.0.1/32"),
+            peer_group=self.peer_group,
+        )
+
+    def test_bulk_create_mismatch(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DeviceBGPSession.objects.bulk_create(
+                [
+                    DeviceBGPSession(
+                        device=self.device2,
+                        local_asn=self.asn,
+                        local_address=IPAddress.objects.create(address="10.0.0.2/32"),
+                        route_policy_in=self.route_policy,
+                    )
+                ]
+            )
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            RoutePolicyTerm.objects.bulk_create(
+                [
+                    RoutePolicyTerm(
+                        route_policy=RoutePolicy.objects.create(name="RP", device=self.device2),
+                        sequence=10,
+                        decision="permit",
+                        from_prefix_list=self.prefix_list,
+                    )
+                ]
+            )
+
+    def test_update_mismatch(self):
+        AfiSafi.objects.create(
+            afi_safi_name="ipv4-unicast",
+            device_bgp_session=self.session,
+            route_policy_in=self.route_policy,
+        )
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            DeviceBGPSession.objects.filter(pk=self.session.pk).update(device=self.device2)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            RoutePolicy.objects.filter(pk=self.route_policy.pk).update(device=self.device2)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            BGPPeerGroup.objects.filter(pk=self.peer_group.pk).update(device=self.device2)
+
+    def test_deferred_move(self):
+        """Related objects can be moved together when the constraints are deferred."""
+        with transaction.atomic():
+            with transaction.get_connection().cursor() as cursor:
+                cursor.execute("SET CONSTRAINTS ALL DEFERRED")
+            BGPPeerGroup.objects.filter(pk=self.peer_group.pk).update(device=self.device2)
+            DeviceBGPSession.objects.filter(pk=self.session.pk).update(device=self.device2)
+
+        self.session.refresh_from_db()
+        assert self.session.device == self.device2
@@ -0,0 +1,75 @@
+from dcim.models.devices import Device, DeviceRole, DeviceType, Manufacturer
+from dcim.models.sites import Site
+from django.test import TestCase
+from ipam.models.ip import IPAddress
+
+from netbox_cmdb.bgp.effective import effective_rows, to_config
+from netbox_cmdb.models.bgp import ASN, BGPGlobal, BGPPeerGroup, DeviceBGPSession
+from netbox_cmdb.models.route_policy import RoutePolicy
+
+
+class EffectiveConfigTestCase(TestCase):
+    def setUp(self):
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        device1 = Device.objects.create(
+            name="router-test1", device_role=device_role, device_type=device_type, site=site
+        )
+        device2 = Device.objects.create(
+            name="router-test2", device_role=device_role, device_type=device_type, site=site
+        )
+        asn1 = ASN.objects.create(number=65001, organization_name="router-test1")
+        asn2 = ASN.objects.create(number=65002, organization_name="router-test2")
+        BGPGlobal.objects.create(device=device1, local_asn=asn1, graceful_restart=True)
+
+        route_policy_in = RoutePolicy.objects.create(name="RP-IN", device=device1)
+        route_policy_out = RoutePolicy.objects.create(name="RP-OUT", device=device1)
+        peer_group = BGPPeerGroup.objects.create(
+            name="PG-TEST",
+            device=device1,
+            remote_asn=asn2,
+            description="from the peer group",
+            route_policy_in=route_policy_in,
+        )
+        self.inheriting = DeviceBGPSession.objects.create(
+            device=device1,
+            local_address=IPAddress.objects.create(address="10.0.0.1/32"),
+            peer_group=peer_group,
+            route_policy_out=route_policy_out,
+        )
+        self.standalone = DeviceBGPSession.objects.create(
+            device=device2,
+            local_asn=asn2,
+            local_address=IPAddress.objects.create(address="10.0.0.2/32"),
+            enforce_first_as=False,
+        )
+
+    def test_effective_config(self):
+        with self.assertNumQueries(1):
+            configs = {row["id"]: to_config(row) for row in effective_rows()}
+
+        inheriting = configs[self.inheriting.pk]
+        assert inheriting["device"]["name"] == "router-test1"
+        assert inheriting["local_asn"] == {"value": 65001, "level": "global"}
+        assert inheriting["remote_asn"] == {"value": 65002, "level": "peer_group"}
+        assert inheriting["description"] == {"value": "from the peer group", "level": "peer_group"}
+        assert inheriting["route_policy_in"] == {"value": "RP-IN", "level": "peer_group"}
+        assert inheriting["route_policy_out"] == {"value": "RP-OUT", "level": "session"}
+        assert inheriting["enforce_first_as"] == {"value": True, "level": "session"}
+
+        standalone = configs[self.standalone.pk]
+        assert standalone["local_asn"] == {"value": 65002, "level": "session"}
+        assert standalone["remote_asn"] == {"value": None, "level": None}
+        assert standalone["description"] == {"value": None, "level": None}
+        assert standalone["enforce_first_as"] == {"value": False, "level": "session"}
+
+    def test_session_overrides_peer_group(self):
+        self.inheriting.description = "from the session"
+        self.inheriting.save()
+
+        row = effective_rows(DeviceBGPSession.objects.filter(pk=self.inheriting.pk)).get()
+        assert to_config(row)["description"] == {"value": "from the session", "level": "session"}
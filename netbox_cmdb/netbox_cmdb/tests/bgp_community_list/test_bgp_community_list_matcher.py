@@ -0,0 +1,94 @@
+from dcim.models.devices import Device, DeviceRole, DeviceType, Manufacturer
+from dcim.models.sites import Site
+from django.test import TestCase
+
+from netbox_cmdb.api.bgp_community_list.serializers import BGPCommunityListSerializer
+from netbox_cmdb.bgp_community_list.matcher import (
+    EXACT,
+    PATTERN,
+    CommunityMatcher,
+    get_community_matchers,
+    parse_expression,
+)
+from netbox_cmdb.models.bgp_community_list import BGPCommunityList, BGPCommunityListTerm
+
+
+class CommunityMatcherTestCase(TestCase):
+    def test_parse_expression(self):
+        assert parse_expression("64512:0100") == (EXACT, "64512:100")
+        assert parse_expression("No-Export") == (EXACT, "65535:65281")
+        assert parse_expression("4200000000:1:2") == (EXACT, "4200000000:1:2")
+        assert parse_expression("rt:65000:100") == (EXACT, "target:65000:100")
+        assert parse_expression("64512:*")[0] == PATTERN
+
+        for expression in ("", "65536:1", "64512:1*", "target:1.2.3.4:70000", "64512:("):
+            with self.assertRaises(ValueError):
+                parse_expression(expression)
+
+    def test_match(self):
+        matcher = CommunityMatcher(
+            ["64512:100", "no-export", "64513:*", "*:666", "origin:*:10", "^6451[45]:1.$"]
+        )
+        for community in (
+            "64512:0100",
+            "65535:65281",
+            "64513:7",
+            "65000:666",
+            "soo:192.0.2.1:10",
+            "64514:12",
+        ):
+            assert matcher.match(community), community
+        for community in ("64512:101", "64512:7", "origin:192.0.2.1:11", "64516:12"):
+            assert not matcher.match(community), community
+
+        assert matcher.match_any(["64512:1", "64513:1"])
+        assert not matcher.match_any([])
+
+    def test_large_and_extended_wildcards(self):
+        matcher = CommunityMatcher(["4200000000:*:1", "target:65000:*"])
+        assert matcher.match("4200000000:7:1")
+        assert not matcher.match("4200000000:7:2")
+        assert matcher.match("rt:65000:42")
+        assert not matcher.match("target:65001:42")
+
+
+class CommunityMatcherCacheTestCase(TestCase):
+    def setUp(self):
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        self.device = Device.objects.create(
+            name="router-test",
+            device_role=device_role,
+            device_type=device_type,
+            site=site,
+        )
+        self.community_list = BGPCommunityList.objects.create(name="CL-TEST", device=self.device)
+        BGPCommunityListTerm.objects.create(
+            bgp_community_list=self.community_list, sequence=5, community="64512:*"
+        )
+
+    def test_cached_until_device_changes(self):
+        matcher = get_community_matchers([self.community_list.pk])[self.community_list.pk]
+        assert matcher.match("64512:1")
+        assert get_community_matchers([self.community_list.pk])[self.community_list.pk] is matcher
+
+        BGPCommunityListTerm.objects.create(
+            bgp_community_list=self.community_list, sequence=10, community="no-export"
+        )
+        recompiled = get_community_matchers([self.community_list.pk])[self.community_list.pk]
+        assert recompiled is not matcher
+        assert recompiled.match("65535:65281")
+
+    def test_invalid_expression_rejected(self):
+        data = {
+            "name": "CL-INVALID",
+            "device": {"name": "router-test"},
+            "terms": [{"sequence": 5, "community": "64512:65536"}],
+        }
+        serializer = BGPCommunityListSerializer(data=data)
+        assert serializer.is_valid() == False
+        assert "terms" in serializer.errors
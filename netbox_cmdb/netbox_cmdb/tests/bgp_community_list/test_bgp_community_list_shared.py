@@ -0,0 +1,133 @@
+from dcim.models.devices import Device, DeviceRole, DeviceType, Manufacturer
+from dcim.models.sites import Site
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from netbox_cmdb.api.bgp_community_list.serializers import BGPCommunityListSerializer
+from netbox_cmdb.bgp_community_list.matcher import get_community_matchers
+from netbox_cmdb.models.bgp_community_list import BGPCommunityList, BGPCommunityListTerm
+from netbox_cmdb.models.device_generation import DeviceGeneration
+from netbox_cmdb.models.route_policy import RoutePolicy, RoutePolicyTerm
+from netbox_cmdb.route_policy.evaluator import Route, compile_policy
+from netbox_cmdb.shared import devices_using, term_sources
+from netbox_cmdb.where_used import impacted_by
+
+
+class SharedBGPCommunityListTestCase(TestCase):
+    def setUp(self):
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        self.devices = [
+            Device.objects.create(
+                name=f"router-test{index}",
+                device_role=device_role,
+                device_type=device_type,
+                site=site,
+            )
+            for index in range(2)
+        ]
+
+        # the commit callbacks of the setup run at its end, as if it was committed
+        with self.captureOnCommitCallbacks(execute=True):
+            self.shared = BGPCommunityList.objects.create(name="CL-BLACKHOLE")
+            BGPCommunityListTerm.objects.create(
+                bgp_community_list=self.shared, sequence=5, community="65535:666"
+            )
+
+            # the first device inherits the shared terms, the second one overrides them
+            self.inherited = BGPCommunityList.objects.create(
+                name="CL-BLACKHOLE", device=self.devices[0], definition=self.shared
+            )
+            self.overridden = BGPCommunityList.objects.create(
+                name="CL-BLACKHOLE", device=self.devices[1], definition=self.shared
+            )
+            BGPCommunityListTerm.objects.create(
+                bgp_community_list=self.overridden, sequence=5, community="64512:666"
+            )
+
+            self.route_policies = []
+            for device, community_list in zip(self.devices, [self.inherited, self.overridden]):
+                route_policy = RoutePolicy.objects.create(name="RP-BLACKHOLE", device=device)
+                RoutePolicyTerm.objects.create(
+                    route_policy=route_policy,
+                    sequence=5,
+                    decision="deny",
+                    from_bgp_community_list=community_list,
+                )
+                self.route_policies.append(route_policy)
+
+    def test_term_sources(self):
+        ids = [self.shared.pk, self.inherited.pk, self.overridden.pk]
+        assert term_sources(BGPCommunityList, ids) == {
+            self.shared.pk: self.shared.pk,
+            self.inherited.pk: self.shared.pk,
+            self.overridden.pk: self.overridden.pk,
+        }
+
+        matchers = get_community_matchers(ids)
+        assert matchers[self.inherited.pk].match("65535:666")
+        assert not matchers[self.overridden.pk].match("65535:666")
+
+    def test_evaluate(self):
+        inherited = compile_policy(self.route_policies[0].pk)
+        assert inherited.evaluate(Route("10.0.0.0/8", communities=["65535:666"])).sequence == 5
+        assert inherited.evaluate(Route("10.0.0.0/8", communities=["64512:666"])).sequence is None
+
+        overridden = compile_policy(self.route_policies[1].pk)
+        assert overridden.evaluate(Route("10.0.0.0/8", communities=["65535:666"])).sequence is None
+        assert overridden.evaluate(Route("10.0.0.0/8", communities=["64512:666"])).sequence == 5
+
+    def test_shared_term_change(self):
+        assert devices_using(BGPCommunityList, [self.shared.pk]) == {self.devices[0].pk}
+
+        generations = dict(DeviceGeneration.objects.values_list("device_id", "generation"))
+        with self.captureOnCommitCallbacks():
+            BGPCommunityListTerm.objects.create(
+                bgp_community_list=self.shared, sequence=10, community="65535:65281"
+            )
+            # bumped before the transaction commits
+            generation = DeviceGeneration.objects.get(device=self.devices[0]).generation
+            assert generation == generations.get(self.devices[0].pk, 0) + 1
+
+    def test_impacted_by(self):
+        used = impacted_by(self.shared)
+        assert set(used["route_policies"]) == {self.route_policies[0]}
+
+    def test_clean(self):
+        other = BGPCommunityList(name="CL-OTHER", device=self.devices[0], definition=self.inherited)
+        with self.assertRaises(ValidationError):
+            other.clean()
+
+        other = BGPCommunityList(name="CL-OTHER", definition=self.shared)
+        with self.assertRaises(ValidationError):
+            other.clean()
+
+        # a device community list can't become shared
+        self.inherited.device = None
+        with self.assertRaisesRegex(ValidationError, "become shared"):
+            self.inherited.clean()
+
+    def test_serializer(self):
+        # the device must be given, null for a shared community list
+        data = {"name": "CL-BLACKHOLE", "terms": []}
+        serializer = BGPCommunityListSerializer(instance=self.inherited, data=data)
+        assert not serializer.is_valid()
+        assert "device" in serializer.errors
+
+        data = {
+            "name": "CL-BLACKHOLE",
+            "device": None,
+            "terms": [{"sequence": 5, "community": "65535:666"}],
+        }
+        serializer = BGPCommunityListSerializer(data=data)
+        assert not serializer.is_valid()
+        assert "name" in serializer.errors
+
+        data["name"] = "CL-NO-EXPORT"
+        serializer = BGPCommunityListSerializer(data=data)
+        assert serializer.is_valid()
+        assert serializer.save().is_shared
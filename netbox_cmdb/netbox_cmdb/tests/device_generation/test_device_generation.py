@@ -0,0 +1,61 @@
+from dcim.models.devices import Device, DeviceRole, DeviceType, Manufacturer
+from dcim.models.sites import Site
+from django.test import TestCase
+
+from netbox_cmdb.models.device_generation import DeviceGeneration
+from netbox_cmdb.models.prefix_list import PrefixList, PrefixListTerm
+
+
+def get_generation(device):
+    generation = DeviceGeneration.objects.filter(device=device).first()
+    return generation.generation if generation else 0
+
+
+class DeviceGenerationTestCase(TestCase):
+    def setUp(self):
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        self.device1 = Device.objects.create(
+            name="router-test1",
+            device_role=device_role,
+            device_type=device_type,
+            site=site,
+        )
+        self.device2 = Device.objects.create(
+            name="router-test2",
+            device_role=device_role,
+            device_type=device_type,
+            site=site,
+        )
+
+    def test_bump_on_save_and_delete(self):
+        prefix_list = PrefixList.objects.create(name="PF-TEST", device=self.device1)
+        assert get_generation(self.device1) == 1
+
+        term = PrefixListTerm.objects.create(
+            prefix_list=prefix_list, sequence=5, prefix="10.0.0.0/8"
+        )
+        assert get_generation(self.device1) == 2
+
+        term.delete()
+        assert get_generation(self.device1) == 3
+        assert get_generation(self.device2) == 0
+
+    def test_bump_on_device_change(self):
+        prefix_list = PrefixList.objects.create(name="PF-TEST", device=self.device1)
+        prefix_list.device = self.device2
+        prefix_list.save()
+
+        assert get_generation(self.device1) == 2
+        assert get_generation(self.device2) == 1
+
+    def test_cascade_delete(self):
+        prefix_list = PrefixList.objects.create(name="PF-TEST", device=self.device1)
+        PrefixListTerm.objects.create(prefix_list=prefix_list, sequence=5, prefix="10.0.0.0/8")
+        prefix_list.delete()
+
+        assert get_generation(self.device1) == 4
@@ -2,6 +2,7 @@ from dcim.models import Device, DeviceRole, DeviceType, Manufacturer, Site
 from django.forms import ValidationError
 from django.test import TestCase
 
+from netbox_cmdb.api.plan import changed_fields
 from netbox_cmdb.models import VLAN, DeviceInterface, LogicalInterface
 
 
@@ -112,3 +113,23 @@ class BaseTestCase(TestCase):
             # Set a native VLAN
             logical_interface.native_vlan = vlan2
             logical_interface.save()
+
+    def test_unchanged_tagged_vlans(self):
+        """Test that an update giving the same tagged VLANs is detected as unchanged."""
+        vlan1 = VLAN.objects.get(vid=1)
+        vlan2 = VLAN.objects.create(vid=10, name="VLAN 10", description="Second VLAN")
+        logical_interface = LogicalInterface.objects.create(
+            index=4,
+            parent_interface=DeviceInterface.objects.get(name="etp1"),
+            type="l2",
+            mode="tagged",
+        )
+        logical_interface.tagged_vlans.set([vlan1, vlan2])
+
+        data = {"type": "l2", "mode": "tagged", "tagged_vlans": [vlan2, vlan1]}
+        assert changed_fields(logical_interface, data) == {}
+
+        data["tagged_vlans"] = [vlan1]
+        assert changed_fields(logical_interface, data) == {
+            "tagged_vlans": ([vlan1.pk, vlan2.pk], [vlan1.pk])
+        }
@@ -0,0 +1,111 @@
+from dcim.models.devices import Device, DeviceRole, DeviceType, Manufacturer
+from dcim.models.sites import Site
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from extras.choices import ObjectChangeActionChoices
+from extras.models import ObjectChange
+from ipam.models.ip import IPAddress
+
+from netbox_cmdb.models.bgp import ASN, AfiSafi, BGPSession, DeviceBGPSession
+from netbox_cmdb.models.bgp_community_list import BGPCommunityList
+from netbox_cmdb.models.prefix_list import PrefixList
+from netbox_cmdb.models.route_policy import RoutePolicy, RoutePolicyTerm
+from netbox_cmdb.orphans import ORPHANS, collect_orphans
+
+
+class OrphansTestCase(TestCase):
+    def setUp(self):
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        device = Device.objects.create(
+            name="router-test", device_role=device_role, device_type=device_type, site=site
+        )
+        self.asn = ASN.objects.create(number=65001, organization_name="used")
+        ASN.objects.create(number=65002, organization_name="unused")
+
+        # used: a BGP session, its peers, their route policy and the lists it matches
+        self.prefix_list = PrefixList.objects.create(name="PF-USED", device=device)
+        self.route_policy = RoutePolicy.objects.create(name="RP-USED", device=device)
+        RoutePolicyTerm.objects.create(
+            route_policy=self.route_policy, sequence=5, from_prefix_list=self.prefix_list
+        )
+        peers = [
+            DeviceBGPSession.objects.create(
+                device=device,
+                local_asn=self.asn,
+                local_address=IPAddress.objects.create(address=f"10.0.0.{index}/32"),
+                route_policy_in=self.route_policy,
+            )
+            for index in range(1, 3)
+        ]
+        BGPSession.objects.create(peer_a=peers[0], peer_b=peers[1])
+
+        # orphans: a device BGP session without BGP session, whose route policy only it uses
+        orphan_policy = RoutePolicy.objects.create(name="RP-ORPHAN", device=device)
+        orphan_community_list = BGPCommunityList.objects.create(name="CL-ORPHAN", device=device)
+        RoutePolicyTerm.objects.create(
+            route_policy=orphan_policy, sequence=5, from_bgp_community_list=orphan_community_list
+        )
+        DeviceBGPSession.objects.create(
+            device=device,
+            local_asn=self.asn,
+            local_address=IPAddress.objects.create(address="10.0.0.3/32"),
+            route_policy_out=orphan_policy,
+        )
+        PrefixList.objects.create(name="PF-ORPHAN", device=device)
+        AfiSafi.objects.create(afi_safi_name="ipv4-unicast")
+
+    def test_report(self):
+        with self.assertNumQueries(len(ORPHANS)):
+            counts = collect_orphans()
+
+        # the route policy of the orphan session is still used when only reporting
+        assert counts == {
+            "device_bgp_sessions": 1,
+            "afi_safis": 1,
+            "route_policies": 0,
+            "prefix_lists": 1,
+            "bgp_community_lists": 0,
+            "asns": 1,
+        }
+
+    def test_delete(self):
+        counts = collect_orphans(delete=True, batch_size=1)
+        assert counts == {
+            "device_bgp_sessions": 1,
+            "afi_safis": 1,
+            "route_policies": 1,
+            "prefix_lists": 1,
+            "bgp_community_lists": 1,
+            "asns": 1,
+        }
+
+        assert list(RoutePolicy.objects.all()) == [self.route_policy]
+        assert list(PrefixList.objects.all()) == [self.prefix_list]
+        assert list(ASN.objects.all()) == [self.asn]
+        assert not BGPCommunityList.objects.exists()
+        assert DeviceBGPSession.objects.count() == 2
+        assert collect_orphans() == {kind: 0 for kind in ORPHANS}
+
+    def test_kinds(self):
+        assert collect_orphans(["asns"], delete=True) == {"asns": 1}
+        assert DeviceBGPSession.objects.count() == 3
+
+    def test_changelog(self):
+        user = get_user_model().objects.create(username="collector")
+        assert collect_orphans(["asns"], delete=True, user=user) == {"asns": 1}
+
+        change = ObjectChange.objects.get(action=ObjectChangeActionChoices.ACTION_DELETE)
+        assert change.object_repr == "65002"
+        assert change.user == user
+
+    def test_command_delete_requires_user(self):
+        with self.assertRaises(CommandError):
+            call_command("collect_orphans", delete=True)
+        assert ASN.objects.count() == 2
@@ -0,0 +1,47 @@
+from dcim.models.devices import Device, DeviceRole, DeviceType, Manufacturer
+from dcim.models.sites import Site
+from django.test import TestCase
+
+from netbox_cmdb.choices import OutboxActionChoices
+from netbox_cmdb.models.outbox import OutboxEvent
+from netbox_cmdb.models.route_policy import RoutePolicy, RoutePolicyTerm
+
+
+class OutboxTestCase(TestCase):
+    def setUp(self):
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        self.device = Device.objects.create(
+            name="router-test",
+            device_role=device_role,
+            device_type=device_type,
+            site=site,
+        )
+
+    def test_terms_are_merged_in_their_route_policy_event(self):
+        route_policy = RoutePolicy.objects.create(name="RM-TEST", device=self.device)
+        term = RoutePolicyTerm.objects.create(
+            route_policy=route_policy, sequence=5, set_local_pref=100
+        )
+        RoutePolicyTerm.objects.create(route_policy=route_policy, sequence=10, set_local_pref=200)
+        term.delete()
+
+        event = OutboxEvent.objects.get()
+        assert event.object_id == route_policy.pk
+        assert event.object_repr == str(route_policy)
+        assert event.action == OutboxActionChoices.CREATED
+        assert event.version == 4
+
+    def test_deletion_supersedes_updates(self):
+        route_policy = RoutePolicy.objects.create(name="RM-TEST", device=self.device)
+        OutboxEvent.objects.all().delete()
+
+        RoutePolicyTerm.objects.create(route_policy=route_policy, sequence=5, set_local_pref=100)
+        route_policy.delete()
+
+        event = OutboxEvent.objects.get()
+        assert event.action == OutboxActionChoices.DELETED
@@ -0,0 +1,84 @@
+from io import StringIO
+
+from dcim.models.devices import Device, DeviceRole, DeviceType, Manufacturer
+from dcim.models.sites import Site
+from django.core.management import call_command
+from django.test import TestCase
+
+from netbox_cmdb.models.prefix_list import PrefixList, PrefixListTerm
+from netbox_cmdb.prefix_list.analyzer import OVERLAPPED, SHADOWED, analyze_terms, build_report
+
+
+class PrefixListAnalyzerTestCase(TestCase):
+    def test_analyze_terms(self):
+        findings = analyze_terms(
+            [
+                (5, "10.0.0.0/8", None, 24),
+                (10, "10.1.0.0/16", None, None),
+                (15, "10.2.0.0/16", 20, 28),
+                (20, "192.168.0.0/16", None, None),
+                (25, "192.168.0.0/16", None, None),
+                (30, "172.16.0.0/12", None, 24),
+            ]
+        )
+        assert [(f.kind, f.sequence, f.by_sequence) for f in findings] == [
+            (SHADOWED, 10, 5),
+            (OVERLAPPED, 15, 5),
+            (SHADOWED, 25, 20),
+        ]
+        assert (findings[1].min_length, findings[1].max_length) == (20, 24)
+
+    def test_more_specific_term_first(self):
+        # a specific term before a broader one takes part of its prefixes
+        findings = analyze_terms([(5, "10.1.0.0/16", None, None), (10, "10.0.0.0/8", None, 24)])
+        assert [(f.kind, f.sequence, f.by_sequence) for f in findings] == [(OVERLAPPED, 10, 5)]
+        assert (findings[0].min_length, findings[0].max_length) == (16, 16)
+
+    def test_shadowed_by_several_terms(self):
+        findings = analyze_terms(
+            [
+                (5, "10.0.0.0/9", None, 24),
+                (10, "10.128.0.0/9", None, 24),
+                (15, "10.0.0.0/8", 9, 24),
+                (20, "10.0.0.0/8", None, None),
+            ]
+        )
+        assert [(f.kind, f.sequence, f.by_sequences) for f in findings] == [(SHADOWED, 15, (5, 10))]
+
+
+class PrefixListAnalyzerReportTestCase(TestCase):
+    def setUp(self):
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        self.device = Device.objects.create(
+            name="router-test",
+            device_role=device_role,
+            device_type=device_type,
+            site=site,
+        )
+        self.prefix_list = PrefixList.objects.create(name="PF-TEST", device=self.device)
+        PrefixListTerm.objects.create(
+            prefix_list=self.prefix_list, sequence=5, prefix="10.0.0.0/8", le=24
+        )
+        PrefixListTerm.objects.create(
+            prefix_list=self.prefix_list, sequence=10, prefix="10.1.0.0/16"
+        )
+        clean = PrefixList.objects.create(name="PF-CLEAN", device=self.device)
+        PrefixListTerm.objects.create(prefix_list=clean, sequence=5, prefix="10.0.0.0/8")
+
+    def test_build_report(self):
+        report = build_report(PrefixList.objects.all())
+
+        assert [prefix_list["id"] for prefix_list in report] == [self.prefix_list.pk]
+        assert report[0]["findings"][0]["kind"] == SHADOWED
+        assert report[0]["findings"][0]["sequence"] == 10
+
+    def test_command(self):
+        out = StringIO()
+        call_command("analyze_prefix_lists", device=["router-test"], stdout=out, stderr=StringIO())
+
+        assert "PF-TEST seq 10 10.1.0.0/16 ge None le None: shadowed by seq 5" in out.getvalue()
@@ -0,0 +1,61 @@
+from dcim.models.devices import Device, DeviceRole, DeviceType, Manufacturer
+from dcim.models.sites import Site
+from django.test import TestCase
+
+from netbox_cmdb.filtersets import PrefixListFilterSet
+from netbox_cmdb.models.prefix_list import PrefixList, PrefixListTerm
+
+
+class PrefixListFilterSetTestCase(TestCase):
+    queryset = PrefixList.objects.all()
+    filterset = PrefixListFilterSet
+
+    @classmethod
+    def setUpTestData(cls):
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        devices = [
+            Device(name="router1", device_role=device_role, device_type=device_type, site=site),
+            Device(name="router2", device_role=device_role, device_type=device_type, site=site),
+        ]
+        Device.objects.bulk_create(devices)
+
+        prefix_lists = [
+            PrefixList(name="PF-1", device=devices[0]),
+            PrefixList(name="PF-2", device=devices[0]),
+            PrefixList(name="PF-1", device=devices[1]),
+        ]
+        PrefixList.objects.bulk_create(prefix_lists)
+
+        PrefixListTerm.objects.bulk_create(
+            [
+                PrefixListTerm(prefix_list=prefix_lists[0], sequence=5, prefix="10.1.0.0/16"),
+                PrefixListTerm(prefix_list=prefix_lists[0], sequence=10, prefix="10.2.0.0/16"),
+                PrefixListTerm(prefix_list=prefix_lists[1], sequence=5, prefix="10.0.0.0/8"),
+                PrefixListTerm(prefix_list=prefix_lists[2], sequence=5, prefix="192.168.0.0/16"),
+            ]
+        )
+
+    def test_term_prefix_net_contained(self):
+        params = {"term_prefix__net_contained": ["10.0.0.0/8"]}
+        self.assertEqual(self.filterset(params, self.queryset).qs.count(), 1)
+        params = {"term_prefix__net_contained": ["10.0.0.0/8", "192.168.0.0/15"]}
+        self.assertEqual(self.filterset(params, self.queryset).qs.count(), 2)
+
+    def test_term_prefix_net_contains_or_equals(self):
+        params = {"term_prefix__net_contains_or_equals": ["10.1.2.0/24"]}
+        self.assertEqual(self.filterset(params, self.queryset).qs.count(), 2)
+
+    def test_term_prefix_net_overlaps(self):
+        params = {"term_prefix__net_overlaps": ["10.1.0.0/16"]}
+        self.assertEqual(self.filterset(params, self.queryset).qs.count(), 2)
+        params = {"term_prefix__net_overlaps": ["10.1.0.0/16"], "device__name": ["router2"]}
+        self.assertEqual(self.filterset(params, self.queryset).qs.count(), 0)
+
+    def test_invalid_prefix(self):
+        params = {"term_prefix__net_overlaps": ["not-a-prefix"]}
+        self.assertEqual(self.filterset(params, self.queryset).qs.count(), 0)
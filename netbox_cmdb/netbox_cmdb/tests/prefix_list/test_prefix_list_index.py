@@ -0,0 +1,71 @@
+from dcim.models.devices import Device, DeviceRole, DeviceType, Manufacturer
+from dcim.models.sites import Site
+from django.test import TestCase
+
+from netbox_cmdb.models.prefix_list import PrefixList, PrefixListTerm
+from netbox_cmdb.prefix_list.index import PrefixListIndex
+from netbox_cmdb.prefix_list.radix import RadixTree
+from netbox_cmdb.prefix_list.ranges import parse_prefix, term_range
+
+
+class RadixTreeTestCase(TestCase):
+    def test_covering(self):
+        tree = RadixTree(32)
+        for prefix in ["0.0.0.0/0", "10.0.0.0/8", "10.1.0.0/16", "10.2.0.0/16", "192.168.0.0/16"]:
+            _, network, length = parse_prefix(prefix)
+            tree.insert(network, length, prefix)
+
+        _, network, length = parse_prefix("10.1.2.0/24")
+        assert list(tree.covering(network, length)) == ["0.0.0.0/0", "10.0.0.0/8", "10.1.0.0/16"]
+
+        _, network, length = parse_prefix("10.0.0.0/8")
+        tree.remove(network, length, "10.0.0.0/8")
+        _, network, length = parse_prefix("10.2.0.0/24")
+        assert list(tree.covering(network, length)) == ["0.0.0.0/0", "10.2.0.0/16"]
+
+    def test_term_range(self):
+        assert term_range("10.0.0.0/8").matches(*parse_prefix("10.0.0.0/8"))
+        assert not term_range("10.0.0.0/8").matches(*parse_prefix("10.0.0.0/16"))
+        assert term_range("10.0.0.0/8", le=24).matches(*parse_prefix("10.1.0.0/16"))
+        assert not term_range("10.0.0.0/8", ge=20).matches(*parse_prefix("10.1.0.0/16"))
+        assert term_range("10.0.0.0/8", ge=20).matches(*parse_prefix("10.1.0.1/32"))
+
+
+class PrefixListIndexTestCase(TestCase):
+    def setUp(self):
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        self.device = Device.objects.create(
+            name="router-test",
+            device_role=device_role,
+            device_type=device_type,
+            site=site,
+        )
+        self.prefix_list = PrefixList.objects.create(name="PF-TEST", device=self.device)
+        PrefixListTerm.objects.create(
+            prefix_list=self.prefix_list, sequence=5, prefix="10.0.0.0/8", le=24
+        )
+        PrefixListTerm.objects.create(
+            prefix_list=self.prefix_list, sequence=10, prefix="10.1.0.0/16"
+        )
+
+    def test_match(self):
+        index = PrefixListIndex()
+        index.load()
+
+        matches = index.match("10.1.0.0/16")
+        assert [term.sequence for term in matches[self.prefix_list.pk]] == [5, 10]
+        assert index.match("10.1.1.1/32") == {}
+
+    def test_reload(self):
+        index = PrefixListIndex()
+        index.load()
+        PrefixListTerm.objects.filter(sequence=5).delete()
+        index.load([self.prefix_list.pk])
+
+        matches = index.match("10.1.0.0/16")
+        assert [term.sequence for term in matches[self.prefix_list.pk]] == [10]
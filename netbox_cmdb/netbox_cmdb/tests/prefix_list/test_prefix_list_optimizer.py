@@ -0,0 +1,75 @@
+from dcim.models.devices import Device, DeviceRole, DeviceType, Manufacturer
+from dcim.models.sites import Site
+from django.test import TestCase
+
+from netbox_cmdb.models.prefix_list import PrefixList, PrefixListTerm
+from netbox_cmdb.prefix_list.optimizer import interval_to_prefixes, optimize_terms
+from netbox_cmdb.prefix_list.ranges import parse_prefix, term_range
+
+
+def terms(*terms):
+    return [term_range(prefix, ge, le) for prefix, ge, le in terms]
+
+
+class PrefixListOptimizerTestCase(TestCase):
+    def test_interval_to_prefixes(self):
+        _, first, _ = parse_prefix("10.0.0.0/24")
+        _, last, _ = parse_prefix("10.0.2.255/32")
+        assert list(interval_to_prefixes(first, last, 32)) == [(first, 23), (first + 512, 24)]
+
+    def test_aggregate_siblings(self):
+        optimized = optimize_terms(
+            terms(("10.0.0.0/25", None, None), ("10.0.0.128/25", None, None))
+        )
+        assert optimized == [{"sequence": 5, "prefix": "10.0.0.0/24", "ge": 25, "le": 25}]
+
+    def test_remove_shadowed(self):
+        optimized = optimize_terms(
+            terms(("10.1.0.0/16", None, None), ("10.0.0.0/8", None, 24), ("10.2.0.0/16", 20, 24))
+        )
+        assert optimized == [{"sequence": 5, "prefix": "10.0.0.0/8", "ge": None, "le": 24}]
+
+    def test_merge_length_ranges(self):
+        optimized = optimize_terms(
+            terms(("10.0.0.0/8", 16, 24), ("10.0.0.0/8", 25, None), ("192.168.0.0/16", None, None))
+        )
+        assert optimized == [
+            {"sequence": 5, "prefix": "10.0.0.0/8", "ge": 16, "le": None},
+            {"sequence": 10, "prefix": "192.168.0.0/16", "ge": None, "le": None},
+        ]
+
+    def test_unrelated_terms_are_kept(self):
+        optimized = optimize_terms(
+            terms(("10.0.0.0/24", None, None), ("10.0.1.0/24", None, 32), ("2001:db8::/32", 48, 64))
+        )
+        assert [(term["prefix"], term["ge"], term["le"]) for term in optimized] == [
+            ("10.0.0.0/24", None, None),
+            ("10.0.1.0/24", None, 32),
+            ("2001:db8::/32", 48, 64),
+        ]
+
+
+class PrefixListOptimizeTestCase(TestCase):
+    def setUp(self):
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        self.device = Device.objects.create(
+            name="router-test",
+            device_role=device_role,
+            device_type=device_type,
+            site=site,
+        )
+        self.prefix_list = PrefixList.objects.create(name="PF-TEST", device=self.device)
+        for sequence in range(256):
+            PrefixListTerm.objects.create(
+                prefix_list=self.prefix_list, sequence=sequence, prefix=f"10.0.{sequence}.0/24"
+            )
+
+    def test_optimize_stored_terms(self):
+        current = self.prefix_list.prefix_list_term.values_list("prefix", "ge", "le")
+        optimized = optimize_terms([term_range(prefix, ge, le) for prefix, ge, le in current])
+        assert optimized == [{"sequence": 5, "prefix": "10.0.0.0/16", "ge": 24, "le": 24}]
@@ -225,3 +225,95 @@ class PrefixListSerializerUpdate(BaseTestCase):
             "input is not valid, you must have at least one term in your prefix-list.",
         ):
             pf_serializer.save()
+
+    def test_prefix_list_update_plan(self):
+        data = {
+            "name": "PF-TEST",
+            "device": {"name": "router-test"},
+            "ip_version": "ipv4",
+            "terms": [
+                {
+                    "sequence": 5,
+                    "prefix": "10.0.0.0/24",
+                    "le": 32,
+                },
+                {
+                    "sequence": 15,
+                    "prefix": "192.168.2.0/24",
+                },
+            ],
+        }
+        pf_serializer = PrefixListSerializer(instance=self.prefix_list, data=data)
+        assert pf_serializer.is_valid() == True
+        plan = pf_serializer.get_plan(self.prefix_list, pf_serializer.validated_data).as_dict()
+
+        assert [item["data"]["sequence"] for item in plan["create"]] == [15]
+        assert plan["update"] == []
+        assert [item["id"] for item in plan["delete"]] == [self.prefix_list_terms[1].pk]
+        assert plan["unchanged"] == 2  # the prefix list itself and the term 5
+
+        # nothing has been written
+        assert PrefixListTerm.objects.filter(prefix_list=self.prefix_list).count() == 2
+
+    def test_prefix_list_update_plan_invalid_term(self):
+        data = {
+            "name": "PF-TEST",
+            "device": {"name": "router-test"},
+            "ip_version": "ipv4",
+            "terms": [
+                {
+                    "sequence": 5,
+                    "prefix": "10.0.0.0/24",
+                    "le": 16,
+                },
+            ],
+        }
+        pf_serializer = PrefixListSerializer(instance=self.prefix_list, data=data)
+        assert pf_serializer.is_valid() == True
+
+        with self.assertRaisesRegex(ValidationError, "Invalid le value"):
+            pf_serializer.get_plan(self.prefix_list, pf_serializer.validated_data)
+
+    def test_prefix_list_update_unchanged(self):
+        data = {
+            "name": "PF-TEST",
+            "device": {"name": "router-test"},
+            "ip_version": "ipv4",
+            "terms": [
+                {
+                    "sequence": 5,
+                    "prefix": "10.0.0.0/24",
+                    "le": 32,
+                },
+                {
+                    "sequence": 10,
+                    "prefix": "192.168.1.0/24",
+                },
+            ],
+        }
+        last_updated = self.prefix_list.last_updated
+        pf_serializer = PrefixListSerializer(instance=self.prefix_list, data=data)
+        assert pf_serializer.is_valid() == True
+        pf_serializer.save()
+
+        assert pf_serializer.changed == False
+        assert PrefixList.objects.get(pk=self.prefix_list.pk).last_updated == last_updated
+
+    def test_prefix_list_update_ip_version_unchanged_terms(self):
+        data = {
+            "name": "PF-TEST",
+            "device": {"name": "router-test"},
+            "ip_version": "ipv6",
+            "terms": [
+                {
+                    "sequence": 5,
+                    "prefix": "10.0.0.0/24",
+                    "le": 32,
+                },
+            ],
+        }
+        pf_serializer = PrefixListSerializer(instance=self.prefix_list, data=data)
+        assert pf_serializer.is_valid() == True
+
+        with self.assertRaisesRegex(ValidationError, "IP version mismatch"):
+            pf_serializer.save()
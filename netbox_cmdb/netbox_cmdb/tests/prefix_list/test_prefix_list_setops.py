@@ -0,0 +1,50 @@
+from django.test import TestCase
+
+from netbox_cmdb.prefix_list.optimizer import to_terms
+from netbox_cmdb.prefix_list.ranges import term_range
+from netbox_cmdb.prefix_list.setops import (
+    DIFFERENCE,
+    INTERSECTION,
+    UNION,
+    combine,
+    subtract_intervals,
+)
+
+
+def terms(*terms):
+    return [term_range(prefix, ge, le) for prefix, ge, le in terms]
+
+
+def result(operation, *range_sets):
+    return [
+        (term["prefix"], term["ge"], term["le"])
+        for term in to_terms(combine(operation, range_sets))
+    ]
+
+
+class PrefixListSetOperationsTestCase(TestCase):
+    def test_subtract_intervals(self):
+        assert subtract_intervals([(0, 99)], [(10, 19), (50, 200)]) == [(0, 9), (20, 49)]
+        assert subtract_intervals([(0, 9), (20, 29)], []) == [(0, 9), (20, 29)]
+
+    def test_union(self):
+        assert result(
+            UNION,
+            terms(("10.0.0.0/25", None, None)),
+            terms(("10.0.0.128/25", None, None)),
+        ) == [("10.0.0.0/24", 25, 25)]
+
+    def test_intersection(self):
+        assert result(
+            INTERSECTION,
+            terms(("10.0.0.0/8", None, 24)),
+            terms(("10.1.0.0/16", 20, 28), ("192.168.0.0/16", None, None)),
+        ) == [("10.1.0.0/16", 20, 24)]
+
+    def test_difference(self):
+        assert result(
+            DIFFERENCE,
+            terms(("10.0.0.0/23", 24, 24), ("192.168.0.0/16", None, None)),
+            terms(("10.0.1.0/24", None, None)),
+            terms(("192.168.0.0/16", None, 32)),
+        ) == [("10.0.0.0/24", None, None)]
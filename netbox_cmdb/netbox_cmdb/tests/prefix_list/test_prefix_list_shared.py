@@ -0,0 +1,144 @@
+from dcim.models.devices import Device, DeviceRole, DeviceType, Manufacturer
+from dcim.models.sites import Site
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from netbox_cmdb.api.prefix_list.serializers import PrefixListSerializer
+from netbox_cmdb.models.device_generation import DeviceGeneration
+from netbox_cmdb.models.prefix_list import PrefixList, PrefixListTerm
+from netbox_cmdb.models.route_policy import RoutePolicy, RoutePolicyTerm
+from netbox_cmdb.route_policy.evaluator import Route, compile_policy
+from netbox_cmdb.shared import devices_using, inheriting, term_sources
+from netbox_cmdb.where_used import impacted_by
+
+
+class SharedPrefixListTestCase(TestCase):
+    def setUp(self):
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        self.devices = [
+            Device.objects.create(
+                name=f"router-test{index}",
+                device_role=device_role,
+                device_type=device_type,
+                site=site,
+            )
+            for index in range(2)
+        ]
+
+        # the commit callbacks of the setup run at its end, as if it was committed
+        with self.captureOnCommitCallbacks(execute=True):
+            self.shared = PrefixList.objects.create(name="PF-BOGONS")
+            PrefixListTerm.objects.create(
+                prefix_list=self.shared, sequence=5, prefix="10.0.0.0/8", le=32
+            )
+
+            # the first device inherits the shared terms, the second one overrides them
+            self.inherited = PrefixList.objects.create(
+                name="PF-BOGONS", device=self.devices[0], definition=self.shared
+            )
+            self.overridden = PrefixList.objects.create(
+                name="PF-BOGONS", device=self.devices[1], definition=self.shared
+            )
+            PrefixListTerm.objects.create(
+                prefix_list=self.overridden, sequence=5, prefix="192.168.0.0/16", le=32
+            )
+
+            self.route_policies = []
+            for device, prefix_list in zip(self.devices, [self.inherited, self.overridden]):
+                route_policy = RoutePolicy.objects.create(name="RP-BOGONS", device=device)
+                RoutePolicyTerm.objects.create(
+                    route_policy=route_policy,
+                    sequence=5,
+                    decision="deny",
+                    from_prefix_list=prefix_list,
+                )
+                self.route_policies.append(route_policy)
+
+    def test_term_sources(self):
+        assert term_sources(
+            PrefixList, [self.shared.pk, self.inherited.pk, self.overridden.pk]
+        ) == {
+            self.shared.pk: self.shared.pk,
+            self.inherited.pk: self.shared.pk,
+            self.overridden.pk: self.overridden.pk,
+        }
+        assert inheriting(PrefixList, [self.shared.pk]) == {self.inherited.pk: self.shared.pk}
+
+    def test_evaluate(self):
+        inherited = compile_policy(self.route_policies[0].pk)
+        assert inherited.evaluate(Route("10.1.0.0/16")).sequence == 5
+        assert inherited.evaluate(Route("192.168.1.0/24")).sequence is None
+
+        overridden = compile_policy(self.route_policies[1].pk)
+        assert overridden.evaluate(Route("10.1.0.0/16")).sequence is None
+        assert overridden.evaluate(Route("192.168.1.0/24")).sequence == 5
+
+    def test_shared_term_change(self):
+        # the route policies matching the shared list directly are on the devices using it
+        RoutePolicyTerm.objects.create(
+            route_policy=self.route_policies[1], sequence=10, from_prefix_list=self.shared
+        )
+        assert devices_using(PrefixList, [self.shared.pk]) == {device.pk for device in self.devices}
+
+        generations = dict(DeviceGeneration.objects.values_list("device_id", "generation"))
+        # the devices are bumped in the transaction of the change, before it commits
+        with self.captureOnCommitCallbacks():
+            for sequence in (10, 15):
+                PrefixListTerm.objects.create(
+                    prefix_list=self.shared, sequence=sequence, prefix=f"172.{sequence}.0.0/16"
+                )
+            for device in self.devices:
+                generation = DeviceGeneration.objects.get(device=device).generation
+                assert generation == generations.get(device.pk, 0) + 2
+
+    def test_impacted_by(self):
+        used = impacted_by(self.shared)
+        assert set(used["route_policies"]) == set(self.route_policies)
+
+    def test_clean(self):
+        other = PrefixList(name="PF-OTHER", device=self.devices[0], definition=self.inherited)
+        with self.assertRaises(ValidationError):
+            other.clean()
+
+        other = PrefixList(name="PF-OTHER", definition=self.shared)
+        with self.assertRaises(ValidationError):
+            other.clean()
+
+        other = PrefixList(
+            name="PF-OTHER", device=self.devices[0], definition=self.shared, ip_version="ipv6"
+        )
+        with self.assertRaises(ValidationError):
+            other.clean()
+
+        # a device prefix list can't become shared
+        self.inherited.device = None
+        with self.assertRaisesRegex(ValidationError, "become shared"):
+            self.inherited.clean()
+
+    def test_serializer(self):
+        # the device must be given, null for a shared prefix list
+        data = {"name": "PF-BOGONS", "ip_version": "ipv4", "terms": []}
+        serializer = PrefixListSerializer(instance=self.inherited, data=data)
+        assert not serializer.is_valid()
+        assert "device" in serializer.errors
+
+        # the unique together validator ignores shared prefix lists, with a null device
+        data = {
+            "name": "PF-BOGONS",
+            "device": None,
+            "ip_version": "ipv4",
+            "terms": [{"sequence": 5, "prefix": "10.0.0.0/8"}],
+        }
+        serializer = PrefixListSerializer(data=data)
+        assert not serializer.is_valid()
+        assert "name" in serializer.errors
+
+        data["name"] = "PF-MARTIANS"
+        serializer = PrefixListSerializer(data=data)
+        assert serializer.is_valid()
+        assert serializer.save().is_shared
@@ -0,0 +1,90 @@
+from dcim.models.devices import Device, DeviceRole, DeviceType, Manufacturer
+from dcim.models.sites import Site
+from django.test import TestCase
+from django.urls import reverse
+from utilities.testing import TestCase as NetBoxTestCase
+
+from netbox_cmdb.models.bgp import ASN, BGPPeerGroup
+from netbox_cmdb.models.route_policy import RoutePolicy, RoutePolicyTerm
+from netbox_cmdb.protection import find_blockers, protecting_fields
+
+
+class ProtectionTestCase(TestCase):
+    def setUp(self):
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        device = Device.objects.create(
+            name="router-test", device_role=device_role, device_type=device_type, site=site
+        )
+        self.asns = [
+            ASN.objects.create(number=number, organization_name=f"org-{number}")
+            for number in range(1, 5)
+        ]
+        for name in ("PG-1", "PG-2"):
+            BGPPeerGroup.objects.create(name=name, device=device, remote_asn=self.asns[0])
+        route_policy = RoutePolicy.objects.create(name="RP-TEST", device=device)
+        RoutePolicyTerm.objects.create(
+            route_policy=route_policy, sequence=5, set_as_path_prepend_asn=self.asns[1]
+        )
+
+    def test_protecting_fields(self):
+        fields = {(field.model, field.name) for field in protecting_fields(ASN)}
+        assert (BGPPeerGroup, "remote_asn") in fields
+        assert (RoutePolicyTerm, "set_as_path_prepend_asn") in fields
+
+    def test_find_blockers(self):
+        with self.assertNumQueries(len(protecting_fields(ASN))):
+            blockers = find_blockers(ASN, [asn.pk for asn in self.asns])
+
+        assert set(blockers) == {self.asns[0].pk, self.asns[1].pk}
+        assert blockers[self.asns[0].pk] == [
+            {"model": "netbox_cmdb.bgppeergroup", "field": "remote_asn", "count": 2}
+        ]
+        assert blockers[self.asns[1].pk] == [
+            {"model": "netbox_cmdb.routepolicyterm", "field": "set_as_path_prepend_asn", "count": 1}
+        ]
+
+
+class ProtectedBulkDeleteViewTestCase(NetBoxTestCase):
+    def test_malformed_pk(self):
+        self.add_permissions("netbox_cmdb.delete_asn")
+        asn = ASN.objects.create(number=1, organization_name="org-1")
+
+        response = self.client.post(
+            reverse("plugins:netbox_cmdb:asn_bulk_delete"), {"pk": [asn.pk, "not-a-pk"]}
+        )
+        assert response.status_code == 302
+        assert ASN.objects.filter(pk=asn.pk).exists()
+
+    def test_confirm_with_blocked_objects(self):
+        self.add_permissions("netbox_cmdb.delete_asn")
+        blocked, free = [
+            ASN.objects.create(number=number, organization_name=f"org-{number}")
+            for number in (1, 2)
+        ]
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        device = Device.objects.create(
+            name="router-test", device_role=device_role, device_type=device_type, site=site
+        )
+        BGPPeerGroup.objects.create(name="PG-1", device=device, remote_asn=blocked)
+
+        url = reverse("plugins:netbox_cmdb:asn_bulk_delete")
+        response = self.client.post(url, {"pk": [blocked.pk, free.pk]})
+        assert response.status_code == 200
+        assert [int(pk) for pk in response.context["form"].initial["pk"]] == [free.pk]
+
+        # the confirmation posts the pks of the selection, as a stale form would
+        response = self.client.post(
+            url, {"pk": [blocked.pk, free.pk], "_confirm": True, "confirm": True}
+        )
+        assert response.status_code == 302
+        assert list(ASN.objects.all()) == [blocked]
@@ -0,0 +1,89 @@
+from dcim.models.devices import Device, DeviceRole, DeviceType, Manufacturer
+from dcim.models.sites import Site
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from netbox_cmdb.models.bgp_community_list import BGPCommunityList, BGPCommunityListTerm
+from netbox_cmdb.models.device_generation import DeviceGeneration
+from netbox_cmdb.models.outbox import OutboxEvent
+from netbox_cmdb.models.prefix_list import PrefixList, PrefixListTerm
+from netbox_cmdb.models.route_policy import RoutePolicy, RoutePolicyTerm
+from netbox_cmdb.route_policy.clone import clone_route_policy
+
+
+class RoutePolicyCloneTestCase(TestCase):
+    def setUp(self):
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        self.devices = [
+            Device.objects.create(
+                name=f"router-test{index}",
+                device_role=device_role,
+                device_type=device_type,
+                site=site,
+            )
+            for index in range(4)
+        ]
+
+        prefix_list = PrefixList.objects.create(name="PF-EDGE", device=self.devices[0])
+        for sequence, prefix in enumerate(["10.0.0.0/8", "192.168.0.0/16"], start=1):
+            PrefixListTerm.objects.create(prefix_list=prefix_list, sequence=sequence, prefix=prefix)
+        community_list = BGPCommunityList.objects.create(name="CL-EDGE", device=self.devices[0])
+        BGPCommunityListTerm.objects.create(
+            bgp_community_list=community_list, sequence=1, community="65000:1"
+        )
+        self.route_policy = RoutePolicy.objects.create(
+            name="RP-EDGE", device=self.devices[0], description="edge"
+        )
+        RoutePolicyTerm.objects.create(
+            route_policy=self.route_policy,
+            sequence=5,
+            decision="permit",
+            from_prefix_list=prefix_list,
+            set_local_pref=200,
+        )
+        RoutePolicyTerm.objects.create(
+            route_policy=self.route_policy,
+            sequence=10,
+            decision="deny",
+            from_bgp_community_list=community_list,
+        )
+
+    def test_clone(self):
+        targets = self.devices[1:]
+        clones = clone_route_policy(self.route_policy, targets)
+
+        assert [clone.device for clone in clones] == targets
+        for clone, device in zip(clones, targets):
+            clone.refresh_from_db()
+            assert (clone.name, clone.description) == ("RP-EDGE", "edge")
+
+            terms = list(clone.route_policy_term.order_by("sequence"))
+            assert [term.sequence for term in terms] == [5, 10]
+            assert terms[0].set_local_pref == 200
+            # the terms match the clones of the lists, on the same device
+            assert terms[0].from_prefix_list.device == device
+            assert terms[0].from_prefix_list.prefix_list_term.count() == 2
+            assert terms[1].from_bgp_community_list.device == device
+            assert terms[1].from_bgp_community_list.bgp_community_list_term.count() == 1
+
+        assert PrefixList.objects.count() == 4
+        assert DeviceGeneration.objects.filter(device__in=targets).count() == 3
+        assert OutboxEvent.objects.filter(object_id__in=[clone.pk for clone in clones]).exists()
+
+    def test_queries_do_not_depend_on_devices(self):
+        with CaptureQueriesContext(connection) as one_device:
+            clone_route_policy(self.route_policy, self.devices[1:2])
+        with CaptureQueriesContext(connection) as two_devices:
+            clone_route_policy(self.route_policy, self.devices[2:])
+        assert len(one_device) == len(two_devices)
+
+    def test_conflicts(self):
+        with self.assertRaisesRegex(ValueError, "PF-EDGE already exists on router-test0"):
+            clone_route_policy(self.route_policy, self.devices[:2], name="RP-EDGE-2")
+        assert not RoutePolicy.objects.filter(name="RP-EDGE-2").exists()
@@ -0,0 +1,81 @@
+from dcim.models.devices import Device, DeviceRole, DeviceType, Manufacturer
+from dcim.models.sites import Site
+from django.test import TestCase
+
+from netbox_cmdb.models.bgp import ASN
+from netbox_cmdb.models.bgp_community_list import BGPCommunityList, BGPCommunityListTerm
+from netbox_cmdb.models.prefix_list import PrefixList, PrefixListTerm
+from netbox_cmdb.models.route_policy import RoutePolicy, RoutePolicyTerm
+from netbox_cmdb.route_policy.evaluator import Route, get_policy
+
+
+class RoutePolicyEvaluatorTestCase(TestCase):
+    def setUp(self):
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        self.device = Device.objects.create(
+            name="router-test",
+            device_role=device_role,
+            device_type=device_type,
+            site=site,
+        )
+        self.prefix_list = PrefixList.objects.create(name="PF-TEST", device=self.device)
+        PrefixListTerm.objects.create(
+            prefix_list=self.prefix_list, sequence=5, prefix="10.0.0.0/8", le=24
+        )
+        community_list = BGPCommunityList.objects.create(name="CL-TEST", device=self.device)
+        BGPCommunityListTerm.objects.create(
+            bgp_community_list=community_list, sequence=5, community="65000:666"
+        )
+        BGPCommunityListTerm.objects.create(
+            bgp_community_list=community_list, sequence=10, community="4200000000:0:666"
+        )
+
+        self.route_policy = RoutePolicy.objects.create(name="RP-TEST", device=self.device)
+        RoutePolicyTerm.objects.create(
+            route_policy=self.route_policy,
+            sequence=5,
+            decision="deny",
+            from_bgp_community_list=community_list,
+        )
+        RoutePolicyTerm.objects.create(
+            route_policy=self.route_policy,
+            sequence=10,
+            decision="permit",
+            from_prefix_list=self.prefix_list,
+            set_local_pref=200,
+            set_as_path_prepend_asn=ASN.objects.create(number=65001, organization_name="org"),
+            set_as_path_prepend_repeat=2,
+        )
+
+    def test_evaluate(self):
+        policy = get_policy(self.route_policy.pk)
+
+        decision, sequence, _ = policy.evaluate(Route("10.1.0.0/16", communities=("65000:666",)))
+        assert (decision, sequence) == ("deny", 5)
+
+        # the large communities of a route are matched by the community list too
+        route = Route("10.1.0.0/16", large_communities=("4200000000:0:666",))
+        assert policy.evaluate(route).sequence == 5
+
+        decision, sequence, route = policy.evaluate(Route("10.1.0.0/16", as_path=(65002,)))
+        assert (decision, sequence) == ("permit", 10)
+        assert route.local_pref == 200
+        assert route.as_path == (65001, 65001, 65002)
+
+        # matched by no term
+        assert policy.evaluate(Route("10.1.0.0/25")).sequence is None
+
+    def test_cache_invalidation(self):
+        policy = get_policy(self.route_policy.pk)
+        assert get_policy(self.route_policy.pk) is policy
+
+        PrefixListTerm.objects.create(
+            prefix_list=self.prefix_list, sequence=10, prefix="0.0.0.0/0", le=32
+        )
+        policy = get_policy(self.route_policy.pk)
+        assert policy.evaluate(Route("10.1.0.0/25")).sequence == 10
@@ -0,0 +1,105 @@
+from io import BytesIO
+
+from dcim.models.devices import Device, DeviceRole, DeviceType, Manufacturer
+from dcim.models.sites import Site
+from django.test import TestCase
+
+from netbox_cmdb.models.bgp_community_list import BGPCommunityList, BGPCommunityListTerm
+from netbox_cmdb.models.prefix_list import PrefixList, PrefixListTerm
+from netbox_cmdb.models.route_policy import RoutePolicy, RoutePolicyTerm
+from netbox_cmdb.route_policy.evaluator import get_policy
+from netbox_cmdb.route_policy.simulation import (
+    normalize_columns,
+    read_routes,
+    simulate,
+    simulate_iterative,
+    simulate_vectorized,
+)
+
+ROUTES = b"""prefix,communities,local_pref,as_path
+10.0.0.0/24,65000:1 65000:2,100,65002
+10.0.1.0/24,,100,65002 65003
+10.0.0.0/25,65000:666,,65002
+192.168.0.0/16,65000:666,,65002
+2001:db8::/48,,,65004
+2001:db8::1/128,,,65004
+"""
+
+
+class RoutePolicySimulationTestCase(TestCase):
+    def setUp(self):
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        device = Device.objects.create(
+            name="router-test",
+            device_role=device_role,
+            device_type=device_type,
+            site=site,
+        )
+        self.device = device
+        prefix_list = PrefixList.objects.create(name="PF-TEST", device=device)
+        PrefixListTerm.objects.create(
+            prefix_list=prefix_list, sequence=5, prefix="10.0.0.0/8", le=24
+        )
+        prefix_list_v6 = PrefixList.objects.create(
+            name="PF-TEST6", device=device, ip_version="ipv6"
+        )
+        PrefixListTerm.objects.create(
+            prefix_list=prefix_list_v6, sequence=5, prefix="2001:db8::/32", le=128
+        )
+
+        self.route_policy = RoutePolicy.objects.create(name="RP-TEST", device=device)
+        RoutePolicyTerm.objects.create(
+            route_policy=self.route_policy,
+            sequence=5,
+            decision="deny",
+            from_bgp_community="65000:666",
+        )
+        RoutePolicyTerm.objects.create(
+            route_policy=self.route_policy,
+            sequence=10,
+            from_prefix_list=prefix_list,
+            from_local_pref=100,
+            set_local_pref=200,
+        )
+        RoutePolicyTerm.objects.create(
+            route_policy=self.route_policy, sequence=15, from_prefix_list=prefix_list_v6
+        )
+
+    def test_simulate(self):
+        report = simulate(get_policy(self.route_policy.pk), read_routes(BytesIO(ROUTES)))
+
+        assert (report["routes"], report["accepted"], report["rejected"]) == (6, 4, 2)
+        assert [term["hits"] for term in report["terms"]] == [2, 2, 2]
+        assert report["modified"] == 2
+        assert report["unmatched"] == 0
+        assert report["samples"][0]["after"]["local_pref"] == 200
+
+    def test_vectorized_and_iterative_agree(self):
+        policy = get_policy(self.route_policy.pk)
+        columns = normalize_columns(read_routes(BytesIO(ROUTES)))
+
+        assert simulate_vectorized(policy, columns) == simulate_iterative(policy, columns)
+
+    def test_large_community_list(self):
+        community_list = BGPCommunityList.objects.create(name="CL-LARGE", device=self.device)
+        BGPCommunityListTerm.objects.create(
+            bgp_community_list=community_list, sequence=5, community="4200000000:0:666"
+        )
+        route_policy = RoutePolicy.objects.create(name="RP-LARGE", device=self.device)
+        RoutePolicyTerm.objects.create(
+            route_policy=route_policy, sequence=5, from_bgp_community_list=community_list
+        )
+        routes = b"""prefix,large_communities
+10.0.0.0/24,4200000000:0:666
+10.0.1.0/24,4200000000:0:667
+"""
+        policy = get_policy(route_policy.pk)
+        columns = normalize_columns(read_routes(BytesIO(routes)))
+
+        assert simulate_iterative(policy, columns)["accepted"] == 1
+        assert simulate_vectorized(policy, columns) == simulate_iterative(policy, columns)
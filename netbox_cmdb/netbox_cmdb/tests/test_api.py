@@ -1,12 +1,26 @@
+import json
+import uuid
+
 from dcim.models.devices import Device, DeviceRole, DeviceType, Manufacturer
 from dcim.models.sites import Site
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from extras.choices import ObjectChangeActionChoices
+from extras.models import ObjectChange
+from ipam.models.ip import IPAddress
 from netbox.config import get_config
 from rest_framework import status
+from users.models import ObjectPermission
 from utilities.testing import APITestCase
 
-from netbox_cmdb.models.prefix_list import PrefixList
+from netbox_cmdb.models.bgp import ASN, BGPPeerGroup, DeviceBGPSession
+from netbox_cmdb.models.bgp_community_list import BGPCommunityList, BGPCommunityListTerm
+from netbox_cmdb.models.prefix_list import PrefixList, PrefixListTerm
+from netbox_cmdb.models.route_policy import RoutePolicy, RoutePolicyTerm
 
 # Test cases taken from unmerged PR https://github.com/netbox-community/netbox/pull/10764/
 # except that we test it against a view from the CMDB
@@ -136,3 +150,542 @@ class APICursorPaginationTestCase(APITestCase):
             self.initial_record_count + 1,
         )
         self.assertIsNone(page_2_response.data["next"])
+
+
+class IdempotencyKeyTestCase(APITestCase):
+    user_permissions = ("netbox_cmdb.add_asn", "netbox_cmdb.view_asn")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.url = reverse("plugins-api:netbox_cmdb-api:asns-available-asn")
+        cls.data = {"organization_name": "org-test", "min_asn": 64512, "max_asn": 64520}
+
+    def test_retry_is_replayed(self):
+        header = {**self.header, "HTTP_IDEMPOTENCY_KEY": str(uuid.uuid4())}
+        first = self.client.post(self.url, self.data, format="json", **header)
+        second = self.client.post(self.url, self.data, format="json", **header)
+
+        self.assertHttpStatus(first, status.HTTP_201_CREATED)
+        self.assertHttpStatus(second, status.HTTP_201_CREATED)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(ASN.objects.count(), 1)
+
+    def test_key_reused_with_another_payload(self):
+        header = {**self.header, "HTTP_IDEMPOTENCY_KEY": str(uuid.uuid4())}
+        self.client.post(self.url, self.data, format="json", **header)
+        response = self.client.post(
+            self.url, {**self.data, "organization_name": "other"}, format="json", **header
+        )
+
+        self.assertHttpStatus(response, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(ASN.objects.count(), 1)
+
+
+class IfMatchTestCase(APITestCase):
+    user_permissions = ("netbox_cmdb.change_asn", "netbox_cmdb.view_asn")
+
+    def setUp(self):
+        super().setUp()
+        self.asn = ASN.objects.create(number=64512, organization_name="org-test")
+        self.url = reverse("plugins-api:netbox_cmdb-api:asn-detail", kwargs={"pk": self.asn.pk})
+
+    def test_stale_write_is_rejected(self):
+        etag = self.client.get(self.url, **self.header)["ETag"]
+        first = self.client.put(
+            self.url,
+            {"number": 64512, "organization_name": "org-a"},
+            format="json",
+            HTTP_IF_MATCH=etag,
+            **self.header,
+        )
+        second = self.client.put(
+            self.url,
+            {"number": 64512, "organization_name": "org-b"},
+            format="json",
+            HTTP_IF_MATCH=etag,
+            **self.header,
+        )
+
+        self.assertHttpStatus(first, status.HTTP_200_OK)
+        self.assertNotEqual(first["ETag"], etag)
+        self.assertHttpStatus(second, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(ASN.objects.get(pk=self.asn.pk).organization_name, "org-a")
+
+    def test_conditional_get(self):
+        list_url = reverse("plugins-api:netbox_cmdb-api:asn-list")
+        for url in (self.url, list_url):
+            etag = self.client.get(url, **self.header)["ETag"]
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **self.header)
+            self.assertHttpStatus(response, status.HTTP_304_NOT_MODIFIED)
+
+        list_etag = self.client.get(list_url, **self.header)["ETag"]
+        ASN.objects.create(number=64513, organization_name="org-other")
+        response = self.client.get(list_url, HTTP_IF_NONE_MATCH=list_etag, **self.header)
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], list_etag)
+
+
+class PrefixListOptimizeTestCase(APITestCase):
+    user_permissions = ("netbox_cmdb.change_prefixlist", "netbox_cmdb.view_prefixlist")
+
+    def setUp(self):
+        super().setUp()
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        device = Device.objects.create(
+            name="router-test", device_role=device_role, device_type=device_type, site=site
+        )
+        self.prefix_list = PrefixList.objects.create(name="PF-TEST", device=device)
+        for sequence, prefix in ((5, "10.0.0.0/25"), (10, "10.0.0.128/25"), (15, "10.0.0.0/26")):
+            PrefixListTerm.objects.create(
+                prefix_list=self.prefix_list, sequence=sequence, prefix=prefix
+            )
+        self.url = reverse(
+            "plugins-api:netbox_cmdb-api:prefixlist-optimize", kwargs={"pk": self.prefix_list.pk}
+        )
+
+    def test_preview(self):
+        response = self.client.get(self.url, **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(response.data["terms_before"], 3)
+        self.assertEqual(response.data["terms_after"], 2)
+        self.assertFalse(response.data["applied"])
+        self.assertEqual(self.prefix_list.prefix_list_term.count(), 3)
+
+    def test_apply(self):
+        response = self.client.put(self.url, **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertTrue(response.data["applied"])
+        self.assertEqual(
+            [
+                (term.sequence, str(term.prefix), term.ge, term.le)
+                for term in self.prefix_list.prefix_list_term.all()
+            ],
+            [(5, "10.0.0.0/24", 25, 25), (10, "10.0.0.0/26", None, None)],
+        )
+
+        # the replaced and the new terms are both in the changelog
+        changes = ObjectChange.objects.filter(
+            changed_object_type=ContentType.objects.get_for_model(PrefixListTerm)
+        )
+        self.assertEqual(changes.filter(action=ObjectChangeActionChoices.ACTION_DELETE).count(), 3)
+        self.assertEqual(changes.filter(action=ObjectChangeActionChoices.ACTION_CREATE).count(), 2)
+
+        response = self.client.put(self.url, **self.header)
+        self.assertTrue(response.data["unchanged"])
+        self.assertFalse(response.data["applied"])
+
+    def _optimize_host_routes(self, count):
+        prefix_list = PrefixList.objects.create(name=f"PF-{count}", device=self.prefix_list.device)
+        # host routes, aggregated into a single term
+        PrefixListTerm.objects.bulk_create(
+            PrefixListTerm(
+                prefix_list=prefix_list,
+                sequence=index + 1,
+                prefix=f"10.0.{index // 256}.{index % 256}/32",
+            )
+            for index in range(count)
+        )
+        url = reverse(
+            "plugins-api:netbox_cmdb-api:prefixlist-optimize", kwargs={"pk": prefix_list.pk}
+        )
+        response = self.client.put(url, **self.header)
+        self.assertTrue(response.data["applied"])
+        self.assertEqual(prefix_list.prefix_list_term.count(), 1)
+
+    def test_queries_do_not_depend_on_terms(self):
+        with CaptureQueriesContext(connection) as context:
+            self._optimize_host_routes(16)
+
+        # the terms are bulk created by the test in a single query as well
+        with self.assertNumQueries(len(context.captured_queries)):
+            self._optimize_host_routes(512)
+
+    def test_term_written_outside_of_the_api(self):
+        url = reverse(
+            "plugins-api:netbox_cmdb-api:prefixlist-detail", kwargs={"pk": self.prefix_list.pk}
+        )
+        etag = self.client.get(url, **self.header)["ETag"]
+
+        # as an admin inline or a clone would, without updating the prefix list itself
+        PrefixListTerm.objects.create(
+            prefix_list=self.prefix_list, sequence=20, prefix="10.1.0.0/24"
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag, **self.header)
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+        response = self.client.put(self.url, HTTP_IF_MATCH=etag, **self.header)
+        self.assertHttpStatus(response, status.HTTP_412_PRECONDITION_FAILED)
+
+
+class PrefixListSetOperationTestCase(APITestCase):
+    user_permissions = ("netbox_cmdb.add_prefixlist", "netbox_cmdb.view_prefixlist")
+
+    def setUp(self):
+        super().setUp()
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        self.devices = [
+            Device.objects.create(
+                name=name, device_role=device_role, device_type=device_type, site=site
+            )
+            for name in ("router1", "router2")
+        ]
+        for device, prefixes in zip(
+            self.devices, (("10.0.0.0/24", "10.0.1.0/24"), ("10.0.1.0/24",))
+        ):
+            prefix_list = PrefixList.objects.create(name="PL-A", device=device)
+            for sequence, prefix in enumerate(prefixes, 1):
+                PrefixListTerm.objects.create(
+                    prefix_list=prefix_list, sequence=sequence * 5, prefix=prefix
+                )
+        self.url = reverse("plugins-api:netbox_cmdb-api:prefix-lists-set-operation")
+
+    def test_difference(self):
+        data = {
+            "operation": "difference",
+            "prefix_lists": [
+                {"device": {"name": "router1"}, "name": "PL-A"},
+                {"device": {"name": "router2"}, "name": "PL-A"},
+            ],
+        }
+        response = self.client.post(self.url, data, format="json", **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["terms"],
+            [{"sequence": 5, "prefix": "10.0.0.0/24", "ge": None, "le": None}],
+        )
+
+    def test_save_as(self):
+        data = {
+            "operation": "union",
+            "prefix_lists": [{"id": prefix_list.pk} for prefix_list in PrefixList.objects.all()],
+            "save_as": {"device": {"name": "router2"}, "name": "PL-B"},
+        }
+        response = self.client.post(self.url, data, format="json", **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_201_CREATED)
+        prefix_list = PrefixList.objects.get(pk=response.data["id"])
+        self.assertEqual(prefix_list.device, self.devices[1])
+        self.assertEqual(
+            [(str(term.prefix), term.ge, term.le) for term in prefix_list.prefix_list_term.all()],
+            [("10.0.0.0/23", 24, 24)],
+        )
+        self.assertTrue(
+            ObjectChange.objects.filter(
+                changed_object_type=ContentType.objects.get_for_model(PrefixListTerm),
+                action=ObjectChangeActionChoices.ACTION_CREATE,
+            ).exists()
+        )
+
+
+class BGPCommunityListMatchTestCase(APITestCase):
+    user_permissions = ("netbox_cmdb.view_bgpcommunitylist",)
+
+    def setUp(self):
+        super().setUp()
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        device = Device.objects.create(
+            name="router-test", device_role=device_role, device_type=device_type, site=site
+        )
+        self.community_list = BGPCommunityList.objects.create(name="CL-TEST", device=device)
+        BGPCommunityListTerm.objects.create(
+            bgp_community_list=self.community_list, sequence=5, community="64512:*"
+        )
+        self.url = reverse("plugins-api:netbox_cmdb-api:bgp-community-lists-match")
+
+    def test_match(self):
+        data = {"communities": ["64512:10", "64513:10"]}
+        response = self.client.post(self.url, data, format="json", **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(
+            [[cl["id"] for cl in result["bgp_community_lists"]] for result in response.data],
+            [[self.community_list.pk], []],
+        )
+
+    def test_match_get(self):
+        response = self.client.get(f"{self.url}?community=64512:10", **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]["bgp_community_lists"][0]["name"], "CL-TEST")
+
+
+class WhereUsedTestCase(APITestCase):
+    user_permissions = ("netbox_cmdb.view_prefixlist", "netbox_cmdb.view_bgpsession")
+
+    def setUp(self):
+        super().setUp()
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        device = Device.objects.create(
+            name="router-test", device_role=device_role, device_type=device_type, site=site
+        )
+        prefix_list = PrefixList.objects.create(name="PF-TEST", device=device)
+        route_policy = RoutePolicy.objects.create(name="RP-TEST", device=device)
+        RoutePolicyTerm.objects.create(
+            route_policy=route_policy, sequence=5, from_prefix_list=prefix_list
+        )
+        self.url = reverse(
+            "plugins-api:netbox_cmdb-api:prefixlist-where-used", kwargs={"pk": prefix_list.pk}
+        )
+
+    def test_where_used(self):
+        response = self.client.get(self.url, **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(response.data["counts"]["route_policy_terms"], 1)
+        self.assertEqual(response.data["counts"]["route_policies"], 1)
+        self.assertEqual(response.data["bgp_sessions"]["count"], 0)
+        self.assertEqual(response.data["bgp_sessions"]["results"], [])
+
+
+class DeleteCheckTestCase(APITestCase):
+    user_permissions = ("netbox_cmdb.view_asn",)
+
+    def setUp(self):
+        super().setUp()
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        device = Device.objects.create(
+            name="router-test", device_role=device_role, device_type=device_type, site=site
+        )
+        self.used = ASN.objects.create(number=1, organization_name="used")
+        self.unused = ASN.objects.create(number=2, organization_name="unused")
+        route_policy = RoutePolicy.objects.create(name="RP-TEST", device=device)
+        RoutePolicyTerm.objects.create(
+            route_policy=route_policy, sequence=5, set_as_path_prepend_asn=self.used
+        )
+        self.url = reverse("plugins-api:netbox_cmdb-api:asn-delete-check")
+
+    def test_delete_check(self):
+        response = self.client.get(
+            f"{self.url}?id={self.used.pk}&id={self.unused.pk}", **self.header
+        )
+
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual(response.data["deletable"], [self.unused.pk])
+        self.assertEqual(
+            response.data["blocked"],
+            [
+                {
+                    "id": self.used.pk,
+                    "display": "1",
+                    "blockers": [
+                        {
+                            "model": "netbox_cmdb.routepolicyterm",
+                            "field": "set_as_path_prepend_asn",
+                            "count": 1,
+                        }
+                    ],
+                }
+            ],
+        )
+
+
+class DeviceBGPSessionEffectiveTestCase(APITestCase):
+    user_permissions = ("netbox_cmdb.view_devicebgpsession",)
+
+    def setUp(self):
+        super().setUp()
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        device = Device.objects.create(
+            name="router-test", device_role=device_role, device_type=device_type, site=site
+        )
+        asn = ASN.objects.create(number=65001, organization_name="router-test")
+        peer_group = BGPPeerGroup.objects.create(
+            name="PG-TEST", device=device, local_asn=asn, remote_asn=asn
+        )
+        for index in range(1, 4):
+            DeviceBGPSession.objects.create(
+                device=device,
+                local_address=IPAddress.objects.create(address=f"10.0.0.{index}/32"),
+                peer_group=peer_group,
+            )
+        self.url = reverse("plugins-api:netbox_cmdb-api:device-bgp-sessions-effective")
+
+    def test_effective(self):
+        response = self.client.get(f"{self.url}?device=router-test&limit=2", **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(response.data["count"], 3)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertEqual(
+            response.data["results"][0]["local_asn"], {"value": 65001, "level": "peer_group"}
+        )
+
+
+class RoutePolicyCloneTestCase(APITestCase):
+    user_permissions = (
+        "dcim.view_device",
+        "netbox_cmdb.add_routepolicy",
+        "netbox_cmdb.add_prefixlist",
+        "netbox_cmdb.add_bgpcommunitylist",
+    )
+
+    def setUp(self):
+        super().setUp()
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        self.devices = [
+            Device.objects.create(
+                name=f"router-test{index}",
+                device_role=device_role,
+                device_type=device_type,
+                site=site,
+            )
+            for index in range(3)
+        ]
+        prefix_list = PrefixList.objects.create(name="PF-TEST", device=self.devices[0])
+        route_policy = RoutePolicy.objects.create(name="RP-TEST", device=self.devices[0])
+        RoutePolicyTerm.objects.create(
+            route_policy=route_policy, sequence=5, from_prefix_list=prefix_list
+        )
+        self.url = reverse(
+            "plugins-api:netbox_cmdb-api:routepolicy-clone", kwargs={"pk": route_policy.pk}
+        )
+
+    def test_clone(self):
+        response = self.client.post(
+            self.url,
+            {"devices": [device.pk for device in self.devices[1:]]},
+            format="json",
+            **self.header,
+        )
+
+        self.assertHttpStatus(response, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [clone["device"]["name"] for clone in response.data], ["router-test1", "router-test2"]
+        )
+        self.assertEqual(RoutePolicy.objects.filter(name="RP-TEST").count(), 3)
+        self.assertEqual(PrefixList.objects.filter(name="PF-TEST").count(), 3)
+        # the clones and their terms are in the changelog, although they are bulk created
+        self.assertEqual(
+            ObjectChange.objects.filter(
+                changed_object_type__in=ContentType.objects.get_for_models(
+                    RoutePolicy, RoutePolicyTerm, PrefixList
+                ).values(),
+                action=ObjectChangeActionChoices.ACTION_CREATE,
+            ).count(),
+            6,
+        )
+
+    def test_object_permissions(self):
+        # route policies can only be added on the first two devices
+        ObjectPermission.objects.filter(
+            object_types=ContentType.objects.get_for_model(RoutePolicy)
+        ).update(constraints={"device__name__in": ["router-test0", "router-test1"]})
+
+        response = self.client.post(
+            self.url,
+            {"devices": [device.pk for device in self.devices[1:]]},
+            format="json",
+            **self.header,
+        )
+
+        self.assertHttpStatus(response, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(RoutePolicy.objects.count(), 1)
+        self.assertEqual(PrefixList.objects.count(), 1)
+
+    def test_conflict(self):
+        response = self.client.post(
+            self.url, {"devices": [self.devices[0].pk]}, format="json", **self.header
+        )
+
+        self.assertHttpStatus(response, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(RoutePolicy.objects.count(), 1)
+
+
+class RoutePolicyEvaluateTestCase(APITestCase):
+    user_permissions = ("netbox_cmdb.view_routepolicy",)
+
+    def setUp(self):
+        super().setUp()
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        device = Device.objects.create(
+            name="router-test", device_role=device_role, device_type=device_type, site=site
+        )
+        self.route_policy = RoutePolicy.objects.create(name="RP-TEST", device=device)
+        RoutePolicyTerm.objects.create(
+            route_policy=self.route_policy, sequence=5, from_local_pref=100, set_metric=50
+        )
+        self.url = reverse(
+            "plugins-api:netbox_cmdb-api:routepolicy-evaluate", kwargs={"pk": self.route_policy.pk}
+        )
+
+    def test_evaluate(self):
+        data = {"routes": [{"prefix": "10.0.0.0/24", "local_pref": 100}, {"prefix": "10.0.1.0/24"}]}
+        response = self.client.post(self.url, data, format="json", **self.header)
+
+        self.assertHttpStatus(response, status.HTTP_200_OK)
+        self.assertEqual(
+            [(result["decision"], result["sequence"]) for result in response.data],
+            [("permit", 5), ("deny", None)],
+        )
+        self.assertEqual(response.data[0]["route"]["metric"], 50)
+
+    def test_simulate_unsaved_policy(self):
+        url = reverse(
+            "plugins-api:netbox_cmdb-api:routepolicy-simulate", kwargs={"pk": self.route_policy.pk}
+        )
+        policy = {
+            "name": "RP-TEST",
+            "device": {"name": "router-test"},
+            "terms": [{"sequence": 5, "decision": "deny", "from_local_pref": 100}],
+        }
+        for data, accepted in ((None, 1), (policy, 0)):
+            payload = {
+                "routes": SimpleUploadedFile("routes.csv", b"prefix,local_pref\n10.0.0.0/24,100\n")
+            }
+            if data is not None:
+                payload["policy"] = json.dumps(data)
+            response = self.client.post(url, payload, format="multipart", **self.header)
+
+            self.assertHttpStatus(response, status.HTTP_200_OK)
+            self.assertEqual(response.data["accepted"], accepted)
+
+        # the simulated terms are not saved
+        self.assertEqual(
+            list(self.route_policy.route_policy_term.values_list("decision", flat=True)), ["permit"]
+        )
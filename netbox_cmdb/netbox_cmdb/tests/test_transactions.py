@@ -0,0 +1,31 @@
+from django.db import transaction
+from django.test import TestCase
+
+from netbox_cmdb.transactions import CommitBatch
+
+
+class CommitBatchTestCase(TestCase):
+    def test_single_callback(self):
+        handled = []
+        batch = CommitBatch(handled.append)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            batch.add({1})
+            batch.add({1, 2})
+
+        assert len(callbacks) == 1
+        assert handled == [{1, 2}]
+
+    def test_rollback(self):
+        handled = []
+        batch = CommitBatch(handled.append)
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    batch.add({1})
+                    raise ValueError()
+            except ValueError:
+                pass
+            batch.add({2})
+
+        # the ids of the rolled back transaction are not handled
+        assert handled == [{2}]
@@ -0,0 +1,122 @@
+from dcim.models.devices import Device, DeviceRole, DeviceType, Manufacturer
+from dcim.models.sites import Site
+from django.test import TestCase
+from ipam.models.ip import IPAddress
+
+from netbox_cmdb.models.bgp import ASN, AfiSafi, BGPPeerGroup, BGPSession, DeviceBGPSession
+from netbox_cmdb.models.bgp_community_list import BGPCommunityList
+from netbox_cmdb.models.prefix_list import PrefixList
+from netbox_cmdb.models.route_policy import RoutePolicy, RoutePolicyTerm
+from netbox_cmdb.where_used import impacted_by
+
+
+def counts(obj):
+    return {kind: queryset.count() for kind, queryset in impacted_by(obj).items()}
+
+
+def session_ids(obj):
+    return sorted(impacted_by(obj)["bgp_sessions"].values_list("pk", flat=True))
+
+
+class WhereUsedTestCase(TestCase):
+    def setUp(self):
+        site = Site.objects.create(name="SiteTest", slug="site-test")
+        manufacturer = Manufacturer.objects.create(name="test", slug="test")
+        device_type = DeviceType.objects.create(
+            manufacturer=manufacturer, model="model-test", slug="model-test"
+        )
+        device_role = DeviceRole.objects.create(name="role-test", slug="role-test")
+        device1 = Device.objects.create(
+            name="router-test1", device_role=device_role, device_type=device_type, site=site
+        )
+        device2 = Device.objects.create(
+            name="router-test2", device_role=device_role, device_type=device_type, site=site
+        )
+        self.asn1 = ASN.objects.create(number=1, organization_name="router-test1")
+        self.asn2 = ASN.objects.create(number=2, organization_name="router-test2")
+        self.asn3 = ASN.objects.create(number=3, organization_name="prepended")
+
+        self.prefix_list = PrefixList.objects.create(name="PF-TEST", device=device1)
+        self.community_list = BGPCommunityList.objects.create(name="CL-TEST", device=device1)
+        route_policy_in = RoutePolicy.objects.create(name="RP-IN", device=device1)
+        RoutePolicyTerm.objects.create(
+            route_policy=route_policy_in, sequence=5, from_prefix_list=self.prefix_list
+        )
+        self.route_policy_out = RoutePolicy.objects.create(name="RP-OUT", device=device1)
+        RoutePolicyTerm.objects.create(
+            route_policy=self.route_policy_out,
+            sequence=5,
+            from_bgp_community_list=self.community_list,
+            set_as_path_prepend_asn=self.asn3,
+        )
+
+        # the outgoing policy applies to session1 through its peer group
+        peer_group = BGPPeerGroup.objects.create(
+            name="PG-TEST",
+            device=device1,
+            remote_asn=self.asn2,
+            route_policy_out=self.route_policy_out,
+        )
+        device_sessions = []
+        for index, (device, asn) in enumerate(
+            [(device1, self.asn1), (device2, self.asn2)] * 2, start=1
+        ):
+            device_sessions.append(
+                DeviceBGPSession.objects.create(
+                    device=device,
+                    local_asn=asn,
+                    local_address=IPAddress.objects.create(address=f"10.0.0.{index}/32"),
+                    peer_group=peer_group if index == 1 else None,
+                )
+            )
+        self.session1 = BGPSession.objects.create(
+            peer_a=device_sessions[0], peer_b=device_sessions[1]
+        )
+        # the incoming policy applies to session2 through an AFI/SAFI
+        self.session2 = BGPSession.objects.create(
+            peer_a=device_sessions[2], peer_b=device_sessions[3]
+        )
+        AfiSafi.objects.create(
+            device_bgp_session=device_sessions[2],
+            afi_safi_name="ipv4-unicast",
+            route_policy_in=route_policy_in,
+        )
+
+    def test_prefix_list(self):
+        assert counts(self.prefix_list) == {
+            "route_policy_terms": 1,
+            "route_policies": 1,
+            "peer_groups": 0,
+            "afi_safis": 1,
+            "device_bgp_sessions": 1,
+            "bgp_sessions": 1,
+        }
+        assert session_ids(self.prefix_list) == [self.session2.pk]
+
+    def test_community_list(self):
+        assert counts(self.community_list)["peer_groups"] == 1
+        assert session_ids(self.community_list) == [self.session1.pk]
+
+    def test_route_policy(self):
+        assert counts(self.route_policy_out) == {
+            "peer_groups": 1,
+            "afi_safis": 0,
+            "device_bgp_sessions": 1,
+            "bgp_sessions": 1,
+        }
+        assert session_ids(self.route_policy_out) == [self.session1.pk]
+
+    def test_asn(self):
+        assert counts(self.asn3)["route_policies"] == 1
+        assert session_ids(self.asn3) == [self.session1.pk]
+
+        assert counts(self.asn2) == {
+            "route_policy_terms": 0,
+            "route_policies": 0,
+            "bgp_globals": 0,
+            "peer_groups": 1,
+            "afi_safis": 0,
+            "device_bgp_sessions": 3,
+            "bgp_sessions": 2,
+        }
+        assert session_ids(self.asn2) == [self.session1.pk, self.session2.pk]
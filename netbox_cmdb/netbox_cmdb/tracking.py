@@ -0,0 +1,51 @@
+"""Resolution of the device owning a CMDB object, used to track the changes per device."""
+
+from django.core.exceptions import ObjectDoesNotExist
+
+from netbox_cmdb.models.bgp import AfiSafi, BGPGlobal, BGPPeerGroup, DeviceBGPSession
+from netbox_cmdb.models.bgp_community_list import BGPCommunityList, BGPCommunityListTerm
+from netbox_cmdb.models.interface import DeviceInterface, LogicalInterface
+from netbox_cmdb.models.prefix_list import PrefixList, PrefixListTerm
+from netbox_cmdb.models.route_policy import RoutePolicy, RoutePolicyTerm
+
+# path of attributes leading from an object to the id of its device
+DEVICE_PATHS = {
+    BGPGlobal: ("device_id",),
+    BGPPeerGroup: ("device_id",),
+    DeviceBGPSession: ("device_id",),
+    AfiSafi: ("device_bgp_session", "device_id"),
+    RoutePolicy: ("device_id",),
+    RoutePolicyTerm: ("route_policy", "device_id"),
+    PrefixList: ("device_id",),
+    PrefixListTerm: ("prefix_list", "device_id"),
+    BGPCommunityList: ("device_id",),
+    BGPCommunityListTerm: ("bgp_community_list", "device_id"),
+    DeviceInterface: ("device_id",),
+    LogicalInterface: ("parent_interface", "device_id"),
+}
+
+
+def get_device_id(instance):
+    """Return the id of the device owning `instance`, or None if it can't be resolved.
+
+    The parent of a child object may already be gone when the child is deleted in a cascade.
+    """
+    obj = instance
+    try:
+        for attr in DEVICE_PATHS[type(instance)]:
+            obj = getattr(obj, attr)
+            if obj is None:
+                return None
+    except ObjectDoesNotExist:
+        return None
+    return obj
+
+
+def get_stored_device_id(instance):
+    """Return the device id currently stored in the database for an object with a device field.
+
+    Used before a save, to also track the device an object is moved away from.
+    """
+    if instance.pk is None or DEVICE_PATHS[type(instance)] != ("device_id",):
+        return None
+    return type(instance).objects.filter(pk=instance.pk).values_list("device_id", flat=True).first()
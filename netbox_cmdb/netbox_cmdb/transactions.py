@@ -0,0 +1,44 @@
+"""Work collected during a transaction and done once, when it commits."""
+
+import threading
+
+from django.db import transaction
+
+
+class CommitBatch:
+    """Ids collected during a transaction, passed to `callback` once the transaction commits.
+
+    A single callback is registered per transaction, whatever the number of added ids. The ids
+    of a transaction that rolls back are dropped with it, as Django drops its callbacks. Outside
+    of a transaction, the ids are handled at once.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+        self._local = threading.local()
+
+    def add(self, ids):
+        pending = getattr(self._local, "pending", None)
+        if pending is None or pending.done or not self._is_registered(pending):
+            pending = self._local.pending = _Pending(self.callback)
+            pending.ids.update(ids)
+            transaction.on_commit(pending)
+        else:
+            pending.ids.update(ids)
+
+    @staticmethod
+    def _is_registered(pending):
+        # the callbacks of the transaction are cleared when it commits or rolls back
+        return any(entry[1] is pending for entry in transaction.get_connection().run_on_commit)
+
+
+class _Pending:
+    def __init__(self, callback):
+        self.callback = callback
+        self.ids = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        if self.ids:
+            self.callback(self.ids)
@@ -5,10 +5,12 @@ from netbox.views.generic import ObjectChangeLogView, ObjectJournalView
 
 from netbox_cmdb.models.bgp import *
 from netbox_cmdb.views import (
+    ASNBulkDeleteView,
     ASNDeleteView,
     ASNEditView,
     ASNListView,
     ASNView,
+    BGPPeerGroupBulkDeleteView,
     BGPPeerGroupDeleteView,
     BGPPeerGroupEditView,
     BGPPeerGroupListView,
@@ -24,6 +26,7 @@ urlpatterns = [
     # ASN
     path("asn/", ASNListView.as_view(), name="asn_list"),
     path("asn/add/", ASNEditView.as_view(), name="asn_add"),
+    path("asn/delete/", ASNBulkDeleteView.as_view(), name="asn_bulk_delete"),
     path("asn/<int:pk>/", ASNView.as_view(), name="asn"),
     path("asn/<int:pk>/edit/", ASNEditView.as_view(), name="asn_edit"),
     path("asn/<int:pk>/delete/", ASNDeleteView.as_view(), name="asn_delete"),
@@ -69,6 +72,9 @@ urlpatterns = [
     # Peer Group
     path("peer-group/", BGPPeerGroupListView.as_view(), name="bgppeergroup_list"),
     path("peer-group/add/", BGPPeerGroupEditView.as_view(), name="bgppeergroup_add"),
+    path(
+        "peer-group/delete/", BGPPeerGroupBulkDeleteView.as_view(), name="bgppeergroup_bulk_delete"
+    ),
     path("peer-group/<int:pk>/", BGPPeerGroupView.as_view(), name="bgppeergroup"),
     path(
         "peer-group/<int:pk>/edit/",
@@ -1,5 +1,8 @@
 """Views."""
 
+from django.contrib import messages
+from django.core.exceptions import ValidationError
+from django.shortcuts import redirect
 from netbox.views.generic import (
     ObjectDeleteView,
     ObjectEditView,
@@ -7,6 +10,8 @@ from netbox.views.generic import (
     ObjectView,
 )
 from netbox.views.generic.bulk_views import BulkDeleteView
+
+from netbox_cmdb.bgp.effective import INHERITED_FIELDS, effective_rows, to_config
 from netbox_cmdb.filtersets import (
     ASNFilterSet,
     BGPPeerGroupFilterSet,
@@ -19,9 +24,52 @@ from netbox_cmdb.forms import (
     BGPSessionForm,
 )
 from netbox_cmdb.models.bgp import ASN, BGPPeerGroup, BGPSession, DeviceBGPSession
+from netbox_cmdb.protection import find_blockers
 from netbox_cmdb.tables import ASNTable, BGPPeerGroupTable, BGPSessionTable
 
 
+class ProtectedBulkDeleteView(BulkDeleteView):
+    """Bulk delete view leaving out, before confirmation, the objects protected from deletion."""
+
+    def post(self, request, **kwargs):
+        if request.POST.get("_all"):
+            queryset = self.queryset.model.objects.all()
+            if self.filterset is not None:
+                queryset = self.filterset(request.GET, queryset).qs
+            pks = queryset.values_list("pk", flat=True)
+        else:
+            pks = request.POST.getlist("pk")
+            if not pks:
+                # the parent view warns that nothing is selected
+                return super().post(request, **kwargs)
+            try:
+                pks = self.get_form()().fields["pk"].clean(pks).values_list("pk", flat=True)
+            except ValidationError as error:
+                # the parent view would look up malformed pks as they are
+                messages.error(request, " ".join(error.messages))
+                return redirect(self.get_return_url(request))
+
+        pks = list(pks)
+        blockers = find_blockers(self.queryset.model, pks)
+        if blockers:
+            self.queryset = self.queryset.exclude(pk__in=blockers)
+            if "_confirm" not in request.POST:
+                for obj in self.queryset.model.objects.filter(pk__in=blockers).order_by("pk"):
+                    used_by = ", ".join(
+                        f"{blocker['count']} {blocker['model']} ({blocker['field']})"
+                        for blocker in blockers[obj.pk]
+                    )
+                    messages.warning(request, f"{obj} is left out, it is used by {used_by}.")
+
+            # the parent view builds the confirmation form from the posted pks, which must then
+            # all be in the narrowed queryset for the confirmation to validate
+            post = request.POST.copy()
+            post.pop("_all", None)
+            post.setlist("pk", [str(pk) for pk in pks if pk not in blockers])
+            request.POST = post
+        return super().post(request, **kwargs)
+
+
 ## ASN views
 class ASNListView(ObjectListView):
     queryset = ASN.objects.all()
@@ -39,6 +87,12 @@ class ASNDeleteView(ObjectDeleteView):
     queryset = ASN.objects.all()
 
 
+class ASNBulkDeleteView(ProtectedBulkDeleteView):
+    queryset = ASN.objects.all()
+    filterset = ASNFilterSet
+    table = ASNTable
+
+
 class ASNView(ObjectView):
     queryset = ASN.objects.all()
     template_name = "netbox_cmdb/asn.html"
@@ -60,7 +114,7 @@ class BGPSessionEditView(ObjectEditView):
     form = BGPSessionForm
 
 
-class BGPSessionBulkDeleteView(BulkDeleteView):
+class BGPSessionBulkDeleteView(ProtectedBulkDeleteView):
     queryset = BGPSession.objects.all()
     filterset = BGPSessionFilterSet
     table = BGPSessionTable
@@ -84,9 +138,24 @@ class BGPSessionView(ObjectView):
             peer_a_afi_safis = instance.peer_a.afi_safis.all()
         if instance.peer_b.afi_safis is not None:
             peer_b_afi_safis = instance.peer_b.afi_safis.all()
+        # the effective configuration of both peers, resolved in a single query
+        configs = {
+            row["id"]: to_config(row)
+            for row in effective_rows(
+                DeviceBGPSession.objects.filter(pk__in=[instance.peer_a_id, instance.peer_b_id])
+            )
+        }
+        effective_config = [
+            (
+                field.replace("_", " ").capitalize(),
+                [configs[instance.peer_a_id][field], configs[instance.peer_b_id][field]],
+            )
+            for field in INHERITED_FIELDS
+        ]
         return {
             "peer_a_afi_safis": peer_a_afi_safis,
             "peer_b_afi_safis": peer_b_afi_safis,
+            "effective_config": effective_config,
         }
 
 
@@ -115,6 +184,12 @@ class BGPPeerGroupDeleteView(ObjectDeleteView):
     queryset = BGPPeerGroup.objects.all()
 
 
+class BGPPeerGroupBulkDeleteView(ProtectedBulkDeleteView):
+    queryset = BGPPeerGroup.objects.all()
+    filterset = BGPPeerGroupFilterSet
+    table = BGPPeerGroupTable
+
+
 class BGPPeerGroupView(ObjectView):
     queryset = BGPPeerGroup.objects.all()
     template_name = "netbox_cmdb/bgppeergroup.html"
@@ -0,0 +1,75 @@
+"""Where-used: the objects impacted by a change of a prefix list, community list, policy or ASN.
+
+References are followed down to the BGP sessions:
+- prefix and community lists are matched by route policy terms, so used by their route policies,
+  and shared lists by the terms matching the lists referencing them,
+- an ASN is prepended by route policy terms, and is the ASN of BGP globals, peer groups and
+  device BGP sessions,
+- route policies are applied by AFI/SAFIs, peer groups and device BGP sessions,
+- device BGP sessions use their peer group and their AFI/SAFIs, and are the peers of BGP sessions.
+
+Each level is a subquery of the next one, so that the objects of any level are counted or listed
+in a single query, whatever the length of the chain.
+"""
+
+from django.db.models import Q
+
+from netbox_cmdb.models.bgp import (
+    ASN,
+    AfiSafi,
+    BGPGlobal,
+    BGPPeerGroup,
+    BGPSession,
+    DeviceBGPSession,
+)
+from netbox_cmdb.models.bgp_community_list import BGPCommunityList
+from netbox_cmdb.models.prefix_list import PrefixList
+from netbox_cmdb.models.route_policy import RoutePolicy, RoutePolicyTerm
+
+# the field of route policy terms referencing each kind of object
+TERM_FIELDS = {
+    PrefixList: "from_prefix_list",
+    BGPCommunityList: "from_bgp_community_list",
+    ASN: "set_as_path_prepend_asn",
+}
+
+
+def _applying(route_policies):
+    return Q(route_policy_in__in=route_policies) | Q(route_policy_out__in=route_policies)
+
+
+def impacted_by(obj):
+    """Return the querysets of the objects using `obj`, directly or not, by kind."""
+    used = {}
+    if isinstance(obj, RoutePolicy):
+        route_policies = RoutePolicy.objects.filter(pk=obj.pk).values("pk")
+    else:
+        terms = Q(**{TERM_FIELDS[type(obj)]: obj})
+        if isinstance(obj, (PrefixList, BGPCommunityList)):
+            # a shared list is also used through the lists referencing it
+            terms |= Q(**{f"{TERM_FIELDS[type(obj)]}__definition": obj})
+        used["route_policy_terms"] = RoutePolicyTerm.objects.filter(terms)
+        used["route_policies"] = RoutePolicy.objects.filter(
+            pk__in=used["route_policy_terms"].values("route_policy_id")
+        )
+        route_policies = used["route_policies"].values("pk")
+
+    peer_groups = _applying(route_policies)
+    device_bgp_sessions = _applying(route_policies)
+    if isinstance(obj, ASN):
+        used["bgp_globals"] = BGPGlobal.objects.filter(local_asn=obj)
+        peer_groups |= Q(local_asn=obj) | Q(remote_asn=obj)
+        device_bgp_sessions |= Q(local_asn=obj)
+
+    used["peer_groups"] = BGPPeerGroup.objects.filter(peer_groups)
+    used["afi_safis"] = AfiSafi.objects.filter(_applying(route_policies))
+    used["device_bgp_sessions"] = DeviceBGPSession.objects.filter(
+        device_bgp_sessions
+        | Q(peer_group__in=used["peer_groups"].values("pk"))
+        | Q(pk__in=used["afi_safis"].values("device_bgp_session_id"))
+    )
+    device_bgp_session_ids = used["device_bgp_sessions"].values("pk")
+    used["bgp_sessions"] = BGPSession.objects.filter(
+        Q(peer_a__in=device_bgp_session_ids) | Q(peer_b__in=device_bgp_session_ids)
+    )
+    return used
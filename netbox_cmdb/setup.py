@@ -25,6 +25,8 @@ setup(
     description="Netbox CMDB plugin",
     author="Criteo",
     install_requires=[],
+    # vectorized route policy simulation, and Arrow route files
+    extras_require={"simulation": ["numpy", "pyarrow"]},
     packages=find_namespace_packages(),
     package_data={"netbox_cmdb.templates.netbox_cmdb": ["*.html"]},
     zip_safe=False,